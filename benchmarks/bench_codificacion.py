@@ -0,0 +1,107 @@
+"""Compara tamaño y velocidad de los codecs JSON y binario de contextos.
+
+Uso: ``python benchmarks/bench_codificacion.py [mensajes] [repeticiones]``.
+"""
+
+from __future__ import annotations
+
+import sys
+import timeit
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from autobot.codificacion import (  # noqa: E402
+    CodecBinario,
+    CodecJSON,
+    decodificar_cabecera,
+    decodificar_mensaje,
+)
+from autobot.models import (  # noqa: E402
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    MensajeConversacion,
+    PersonalidadCliente,
+)
+from autobot.scenarios import ESCENARIOS_OBRA  # noqa: E402
+
+
+def construir_sesion(mensajes: int) -> ContextoConversacion:
+    inicio = datetime(2026, 1, 1, tzinfo=UTC)
+    return ContextoConversacion(
+        sesion_id="bench",
+        configuracion=ConfiguracionSimulacion(
+            personalidad=PersonalidadCliente.ENOJADO_IMPACIENTE,
+            canal=CanalComunicacion.CHAT,
+            escenario=ESCENARIOS_OBRA[0],
+            timestamp_inicio=inicio,
+        ),
+        estado_actual="en_progreso",
+        historial=[
+            MensajeConversacion(
+                turno=turno,
+                rol="cliente" if turno % 2 else "agente",
+                contenido=f"Mensaje {turno}: necesito saber cuándo llega el pedido.",
+                timestamp=inicio + timedelta(seconds=17 * turno),
+            )
+            for turno in range(1, mensajes + 1)
+        ],
+        datos_clave_mencionados={"numero_pedido": True},
+    )
+
+
+def _mejor_ms(funcion, repeticiones: int) -> float:
+    return 1000 * min(timeit.repeat(funcion, number=1, repeat=repeticiones))
+
+
+def medir(codec, contexto: ContextoConversacion, repeticiones: int) -> dict:
+    cabecera = codec.codificar_cabecera(contexto)
+    mensajes = [codec.codificar_mensaje(m) for m in contexto.historial]
+
+    def codificar() -> None:
+        codec.codificar_cabecera(contexto)
+        for mensaje in contexto.historial:
+            codec.codificar_mensaje(mensaje)
+
+    def decodificar() -> None:
+        decodificar_cabecera(cabecera)
+        for mensaje in mensajes:
+            decodificar_mensaje(mensaje)
+
+    def tamano(valor) -> int:
+        return len(valor.encode("utf-8") if isinstance(valor, str) else valor)
+
+    return {
+        "bytes": tamano(cabecera) + sum(tamano(m) for m in mensajes),
+        "codificar_ms": _mejor_ms(codificar, repeticiones),
+        "decodificar_ms": _mejor_ms(decodificar, repeticiones),
+    }
+
+
+def main() -> None:
+    mensajes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    contexto = construir_sesion(mensajes)
+    resultados = {
+        nombre: medir(codec, contexto, repeticiones)
+        for nombre, codec in (("json", CodecJSON()), ("binario", CodecBinario()))
+    }
+    print(f"Sesión de {mensajes} mensajes, mejor de {repeticiones} repeticiones")
+    print(f"{'codec':<10}{'bytes':>10}{'codificar ms':>16}{'decodificar ms':>18}")
+    for nombre, datos in resultados.items():
+        print(
+            f"{nombre:<10}{datos['bytes']:>10}{datos['codificar_ms']:>16.3f}"
+            f"{datos['decodificar_ms']:>18.3f}"
+        )
+    base, compacto = resultados["json"], resultados["binario"]
+    print(
+        f"binario/json: tamaño {compacto['bytes'] / base['bytes']:.2f}x, "
+        f"codificar {compacto['codificar_ms'] / base['codificar_ms']:.2f}x, "
+        f"decodificar {compacto['decodificar_ms'] / base['decodificar_ms']:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
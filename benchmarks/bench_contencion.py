@@ -0,0 +1,128 @@
+"""Mide reintentos de ``cas`` con varios escritores sobre la misma sesión.
+
+Cada escritor es un hilo con su propio ``GestorContexto``, como lo serían
+procesos distintos: no comparten locks y solo se coordinan mediante la versión
+de la sesión. Una latencia artificial por operación emula un almacenamiento
+en red y ensancha la ventana entre la lectura y el ``cas``.
+
+Uso: ``python benchmarks/bench_contencion.py [operaciones] [latencia_ms]``.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from autobot.context import (  # noqa: E402
+    AlmacenamientoEnMemoria,
+    ConflictoConcurrencia,
+    GestorContexto,
+)
+from autobot.models import (  # noqa: E402
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    PersonalidadCliente,
+)
+from autobot.scenarios import ESCENARIOS_OBRA  # noqa: E402
+
+
+class AlmacenamientoConLatencia(AlmacenamientoEnMemoria):
+    def __init__(self, latencia: float) -> None:
+        super().__init__()
+        self.latencia = latencia
+
+    def get(self, clave: str):
+        time.sleep(self.latencia)
+        return super().get(clave)
+
+    def lrange(self, clave: str, inicio: int, fin: int):
+        time.sleep(self.latencia)
+        return super().lrange(clave, inicio, fin)
+
+    def cas(self, *args, **kwargs):
+        time.sleep(self.latencia)
+        return super().cas(*args, **kwargs)
+
+
+def medir(escritores: int, operaciones: int, latencia: float) -> dict:
+    almacenamiento = AlmacenamientoConLatencia(latencia)
+    GestorContexto(almacenamiento).inicializar_contexto(
+        ContextoConversacion(
+            sesion_id="disputada",
+            configuracion=ConfiguracionSimulacion(
+                personalidad=PersonalidadCliente.PROFESIONAL_DIRECTO,
+                canal=CanalComunicacion.CHAT,
+                escenario=ESCENARIOS_OBRA[0],
+                timestamp_inicio=datetime.now(UTC),
+            ),
+            estado_actual="en_progreso",
+        )
+    )
+    gestores = [
+        GestorContexto(almacenamiento, max_reintentos=64) for _ in range(escritores)
+    ]
+    agotadas = 0
+
+    def trabajar(gestor: GestorContexto, numero: int) -> None:
+        nonlocal agotadas
+        for _ in range(operaciones):
+            try:
+                gestor.actualizar(
+                    "disputada",
+                    lambda contexto: contexto.emociones_cliente.append(f"e{numero}"),
+                )
+            except ConflictoConcurrencia:
+                agotadas += 1
+
+    hilos = [
+        threading.Thread(target=trabajar, args=(gestor, numero))
+        for numero, gestor in enumerate(gestores)
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    escrituras = sum(g.estadisticas_escrituras()["escrituras"] for g in gestores)
+    conflictos = sum(g.estadisticas_escrituras()["conflictos"] for g in gestores)
+    final = GestorContexto(almacenamiento).obtener_contexto("disputada")
+    if len(final.emociones_cliente) != escrituras:
+        raise AssertionError("Se perdieron actualizaciones confirmadas")
+    return {
+        "escrituras_s": escrituras / segundos,
+        "reintentos_por_escritura": conflictos / escrituras if escrituras else 0.0,
+        "tasa_reintentos": conflictos / (escrituras + conflictos),
+        "agotadas": agotadas,
+    }
+
+
+def main() -> None:
+    operaciones = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    latencia_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    print(
+        f"{operaciones} actualizaciones por escritor, latencia {latencia_ms} ms"
+        " por operación"
+    )
+    print(
+        f"{'escritores':>10}{'escrituras/s':>14}{'reintentos/esc':>16}"
+        f"{'tasa':>8}{'agotadas':>10}"
+    )
+    for escritores in (1, 2, 4, 8):
+        datos = medir(escritores, operaciones, latencia_ms / 1000)
+        print(
+            f"{escritores:>10}{datos['escrituras_s']:>14.0f}"
+            f"{datos['reintentos_por_escritura']:>16.2f}"
+            f"{datos['tasa_reintentos']:>8.2f}{datos['agotadas']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Mide los bytes que retiene en memoria cada mensaje de una sesión en uso.
+
+Compara una réplica de la dataclass anterior (con ``__dict__``, ``metadatos``
+propio y ``datetime`` con zona horaria) contra ``MensajeConversacion`` con
+``__slots__`` decodificado desde JSON y desde el formato binario, que guarda
+las marcas UTC compactas. Cada mensaje se decodifica, se agrega a una sesión
+con ``GestorContexto.agregar_mensaje`` (que lo codifica y lo conserva en la
+caché) y se vuelve a codificar en ambos formatos; recién entonces se mide
+todo lo alcanzable desde los mensajes, contando una sola vez lo compartido
+(por ejemplo, los roles internados).
+
+Uso: ``python benchmarks/bench_memoria.py [mensajes]``.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from autobot.codificacion import (  # noqa: E402
+    CodecBinario,
+    CodecJSON,
+    decodificar_mensaje,
+)
+from autobot.context import AlmacenamientoEnMemoria, GestorContexto  # noqa: E402
+from autobot.models import (  # noqa: E402
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    MensajeConversacion,
+    PersonalidadCliente,
+)
+from autobot.scenarios import ESCENARIOS_OBRA  # noqa: E402
+
+INICIO = datetime(2026, 1, 1, tzinfo=UTC)
+CODECS = (CodecJSON(), CodecBinario())
+
+
+@dataclass
+class MensajeAnterior:
+    turno: int
+    rol: str
+    contenido: str
+    timestamp: datetime
+    metadatos: Dict[str, str] = field(default_factory=dict)
+
+
+def _anterior(codificado: str) -> MensajeAnterior:
+    entrada = json.loads(codificado)
+    return MensajeAnterior(
+        turno=entrada["turno"],
+        rol=entrada["rol"],
+        contenido=entrada["contenido"],
+        timestamp=datetime.fromisoformat(entrada["timestamp"]),
+        metadatos=entrada.get("metadatos", {}),
+    )
+
+
+def generar(mensajes: int) -> List[MensajeConversacion]:
+    return [
+        MensajeConversacion(
+            turno=turno,
+            rol="cliente" if turno % 2 else "agente",
+            contenido=f"Mensaje {turno}: necesito saber cuándo llega el pedido.",
+            timestamp=INICIO + timedelta(seconds=17 * turno),
+        )
+        for turno in range(1, mensajes + 1)
+    ]
+
+
+def usar(mensajes: list) -> None:
+    """Recorre los mensajes como una sesión activa: los agrega y los codifica.
+
+    La réplica anterior ya trae ``metadatos`` propio, así que no cambia.
+    """
+
+    if not isinstance(mensajes[0], MensajeConversacion):
+        return
+    for codec in CODECS:
+        for mensaje in mensajes:
+            codec.codificar_mensaje(mensaje)
+    gestor = GestorContexto(AlmacenamientoEnMemoria(), codec=CodecBinario())
+    gestor.inicializar_contexto(
+        ContextoConversacion(
+            sesion_id="medicion",
+            configuracion=ConfiguracionSimulacion(
+                personalidad=PersonalidadCliente.PROFESIONAL_DIRECTO,
+                canal=CanalComunicacion.CHAT,
+                escenario=ESCENARIOS_OBRA[0],
+                timestamp_inicio=INICIO,
+            ),
+            estado_actual="en_progreso",
+        )
+    )
+    for mensaje in mensajes:
+        gestor.agregar_mensaje("medicion", mensaje)
+
+
+def bytes_por_mensaje(mensajes: list) -> float:
+    """Tamaño de todo lo alcanzable desde los mensajes, sin repetir objetos."""
+
+    vistos = set()
+    pendientes = list(mensajes)
+    total = 0
+    while pendientes:
+        objeto = pendientes.pop()
+        if id(objeto) in vistos or isinstance(objeto, type):
+            continue
+        vistos.add(id(objeto))
+        total += sys.getsizeof(objeto)
+        pendientes.extend(gc.get_referents(objeto))
+    return total / len(mensajes)
+
+
+def medir(decodificar: Callable, codificados: list) -> tuple:
+    mensajes = [decodificar(codificado) for codificado in codificados]
+    decodificado = bytes_por_mensaje(mensajes)
+    usar(mensajes)
+    return decodificado, bytes_por_mensaje(mensajes)
+
+
+def main() -> None:
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    originales = generar(cantidad)
+    json_, binario = ([c.codificar_mensaje(m) for m in originales] for c in CODECS)
+    resultados = {
+        "anterior": medir(_anterior, json_),
+        "slots (JSON)": medir(decodificar_mensaje, json_),
+        "slots+marca": medir(decodificar_mensaje, binario),
+    }
+    print(f"{cantidad} mensajes decodificados, agregados a una sesión y codificados")
+    print(f"{'modelo':<14}{'decodificado':>14}{'en uso':>10}{'relativo':>10}")
+    base = resultados["anterior"][1]
+    for nombre, (decodificado, en_uso) in resultados.items():
+        print(f"{nombre:<14}{decodificado:>14.1f}{en_uso:>10.1f}{en_uso / base:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Compara los serializadores generados con ``asdict`` más ``json.dumps``.
+
+Mide una sesión con su historial completo y un ``ResultadoEvaluacion`` con
+criterios y evidencias, en ambas direcciones. La deserialización de
+referencia es la que hacía ``_contexto_desde_dict`` a mano.
+
+Uso: ``python benchmarks/bench_serializacion.py [mensajes] [repeticiones]``.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from dataclasses import asdict
+from datetime import UTC, datetime, timedelta
+from enum import Enum
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from autobot.models import (  # noqa: E402
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    CriterioEvaluacion,
+    EscenarioObra,
+    EvidenciaEvaluacion,
+    MensajeConversacion,
+    PersonalidadCliente,
+    ResultadoEvaluacion,
+)
+from autobot.scenarios import ESCENARIOS_OBRA  # noqa: E402
+from autobot.serializacion import a_dict, desde_dict  # noqa: E402
+
+
+def construir_sesion(mensajes: int) -> ContextoConversacion:
+    inicio = datetime(2026, 1, 1, tzinfo=UTC)
+    return ContextoConversacion(
+        sesion_id="bench",
+        configuracion=ConfiguracionSimulacion(
+            personalidad=PersonalidadCliente.ENOJADO_IMPACIENTE,
+            canal=CanalComunicacion.CHAT,
+            escenario=ESCENARIOS_OBRA[0],
+            timestamp_inicio=inicio,
+        ),
+        estado_actual="en_progreso",
+        historial=[
+            MensajeConversacion(
+                turno=turno,
+                rol="cliente" if turno % 2 else "agente",
+                contenido=f"Mensaje {turno}: necesito saber cuándo llega el pedido.",
+                timestamp=inicio + timedelta(seconds=17 * turno),
+            )
+            for turno in range(1, mensajes + 1)
+        ],
+        datos_clave_mencionados={"numero_pedido": True},
+    )
+
+
+def construir_resultado() -> ResultadoEvaluacion:
+    return ResultadoEvaluacion(
+        sesion_id="bench",
+        timestamp_evaluacion=datetime(2026, 1, 1, 12, tzinfo=UTC),
+        personalidad_cliente=PersonalidadCliente.ENOJADO_IMPACIENTE,
+        canal=CanalComunicacion.CHAT,
+        escenario=ESCENARIOS_OBRA[0],
+        criterios=[
+            CriterioEvaluacion(
+                nombre=f"criterio_{numero}",
+                puntaje=4,
+                peso=0.2,
+                justificacion="Respuesta adecuada al cliente",
+                evidencias=[
+                    EvidenciaEvaluacion(
+                        f"criterio_{numero}", turno, "Lo siento", "positivo"
+                    )
+                    for turno in range(1, 6)
+                ],
+            )
+            for numero in range(5)
+        ],
+        puntaje_global=80.0,
+        fortalezas=["Empatía", "Claridad"],
+        oportunidades_mejora=["Confirmar datos"],
+        recomendaciones=["Resumir acuerdos"],
+        metricas={"turnos_hasta_empatia": 2.0, "tiempo_respuesta": None},
+        resumen_ejecutivo="Buen desempeño general.",
+    )
+
+
+def _contexto_a_mano(payload: dict) -> ContextoConversacion:
+    configuracion = payload["configuracion"]
+    return ContextoConversacion(
+        sesion_id=payload["sesion_id"],
+        configuracion=ConfiguracionSimulacion(
+            personalidad=PersonalidadCliente(configuracion["personalidad"]),
+            canal=CanalComunicacion(configuracion["canal"]),
+            escenario=EscenarioObra(**configuracion["escenario"]),
+            duracion_maxima=configuracion.get("duracion_maxima", 20),
+            nivel_dificultad=configuracion.get("nivel_dificultad", 0.7),
+            timestamp_inicio=datetime.fromisoformat(configuracion["timestamp_inicio"]),
+        ),
+        historial=[
+            MensajeConversacion(
+                turno=entrada["turno"],
+                rol=entrada["rol"],
+                contenido=entrada["contenido"],
+                timestamp=datetime.fromisoformat(entrada["timestamp"]),
+                metadatos=entrada.get("metadatos") or None,
+            )
+            for entrada in payload.get("historial", [])
+        ],
+        estado_actual=payload["estado_actual"],
+        datos_clave_mencionados=payload.get("datos_clave_mencionados", {}),
+        emociones_cliente=payload.get("emociones_cliente", []),
+    )
+
+
+def _valor_json(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, Enum):
+        return valor.value
+    raise TypeError(f"Tipo no serializable: {type(valor)!r}")
+
+
+def _mejor_ms(funcion, repeticiones: int) -> float:
+    return 1000 * min(timeit.repeat(funcion, number=1, repeat=repeticiones))
+
+
+def main() -> None:
+    mensajes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    contexto = construir_sesion(mensajes)
+    resultado = construir_resultado()
+    payload = json.loads(json.dumps(a_dict(contexto)))
+
+    mediciones = {
+        "contexto a JSON": (
+            lambda: json.dumps(asdict(contexto), default=_valor_json),
+            lambda: json.dumps(a_dict(contexto)),
+        ),
+        "resultado a JSON": (
+            lambda: json.dumps(asdict(resultado), default=_valor_json),
+            lambda: json.dumps(a_dict(resultado)),
+        ),
+        "contexto desde dict": (
+            lambda: _contexto_a_mano(payload),
+            lambda: desde_dict(ContextoConversacion, payload),
+        ),
+    }
+    print(f"Sesión de {mensajes} mensajes, mejor de {repeticiones} repeticiones")
+    print(f"{'operación':<22}{'referencia ms':>15}{'generado ms':>13}{'mejora':>9}")
+    for nombre, (referencia, generado) in mediciones.items():
+        base = _mejor_ms(referencia, repeticiones)
+        rapido = _mejor_ms(generado, repeticiones)
+        print(f"{nombre:<22}{base:>15.3f}{rapido:>13.3f}{base / rapido:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ para evaluar el desempeño de agentes de servicio al cliente.
 """
 
 import json
+import os
 import random
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
@@ -566,7 +567,8 @@ Puntaje General: {puntajes['puntaje_general']:.1f}/100
 class EvaluadorChatbot:
     """Chatbot principal que coordina la evaluación"""
     
-    def __init__(self):
+    def __init__(self, directorio_informes: str = "."):
+        self.directorio_informes = directorio_informes
         self.estado = "ESPERANDO"  # ESPERANDO, EN_PRUEBA, FINALIZADO
         self.cliente: Optional[ClienteSimulado] = None
         self.evaluador: Optional[Evaluador] = None
@@ -740,7 +742,9 @@ La prueba continúa. Escriba su siguiente respuesta o use /finalizar.
         
         # Guardar JSON en archivo
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"evaluacion_{timestamp}.json"
+        filename = os.path.join(
+            self.directorio_informes, f"evaluacion_{timestamp}.json"
+        )
         
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(informe_json, f, ensure_ascii=False, indent=2)
@@ -1,30 +1,47 @@
 """Módulo principal del sistema Autobot."""
 
-codex/add-documentation-for-chatbot-evaluation-system-vvbk9l
 from . import (
+    almacenamiento,
+    cache,
+    coalescencia,
+    codificacion,
     commands,
     context,
     demo,
+    especulacion,
     evaluation,
+    heuristicas,
+    instrumentacion,
+    lote,
+    metricas,
     models,
+    persistencia,
     personalities,
+    presupuesto,
     scenarios,
+    serializacion,
     web_demo,
 )
-=======
-from . import commands, context, demo, evaluation, models, personalities, scenarios
-main
 
 __all__ = [
+    "almacenamiento",
+    "cache",
+    "coalescencia",
+    "codificacion",
     "commands",
     "context",
     "demo",
+    "especulacion",
     "evaluation",
+    "heuristicas",
+    "instrumentacion",
+    "lote",
+    "metricas",
     "models",
+    "persistencia",
     "personalities",
+    "presupuesto",
     "scenarios",
-codex/add-documentation-for-chatbot-evaluation-system-vvbk9l
+    "serializacion",
     "web_demo",
-=======
-main
 ]
@@ -0,0 +1,469 @@
+"""Almacenamiento asíncrono de sesiones y cliente del protocolo de Redis.
+
+``GestorContextoAsincrono`` espera un objeto que cumpla
+``AlmacenamientoAsincrono``: las mismas operaciones que el almacenamiento
+síncrono con prefijo ``a`` (``aget``, ``asetex``, ``amget``, ``acas``...) y un
+método ``pipeline`` que agrupa varios comandos en un único viaje de ida y
+vuelta.
+
+Se ofrecen dos implementaciones: ``AdaptadorAsincrono``, que envuelve un
+almacenamiento síncrono en memoria sin bloquear el bucle de eventos, y
+``AlmacenamientoRESP``, que habla el protocolo RESP de Redis con un *pool* de
+conexiones y envía los comandos de cada tubería en una sola escritura.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+Valor = Union[str, bytes]
+Comando = Tuple[Any, ...]
+
+_lock_semilla = threading.Lock()
+_ultima_semilla = 0
+
+
+class ErrorRESP(RuntimeError):
+    """Respuesta de error enviada por el servidor (``-ERR ...``)."""
+
+
+class Tuberia:
+    """Acumula comandos y los ejecuta juntos con ``ejecutar``.
+
+    Cada método devuelve la propia tubería para poder encadenar llamadas; los
+    resultados llegan en el mismo orden en que se agregaron los comandos.
+    """
+
+    def __init__(
+        self, ejecutor: Callable[[Sequence[Comando]], Awaitable[List[Any]]]
+    ) -> None:
+        self._ejecutor = ejecutor
+        self._comandos: List[Comando] = []
+
+    def __len__(self) -> int:
+        return len(self._comandos)
+
+    def get(self, clave: str) -> "Tuberia":
+        return self._agregar("GET", clave)
+
+    def mget(self, *claves: str) -> "Tuberia":
+        return self._agregar("MGET", *claves)
+
+    def setex(self, clave: str, ttl: int, valor: Valor) -> "Tuberia":
+        return self._agregar("SETEX", clave, ttl, valor)
+
+    def rpush(self, clave: str, *valores: Valor) -> "Tuberia":
+        return self._agregar("RPUSH", clave, *valores)
+
+    def lrange(self, clave: str, inicio: int, fin: int) -> "Tuberia":
+        return self._agregar("LRANGE", clave, inicio, fin)
+
+    def llen(self, clave: str) -> "Tuberia":
+        return self._agregar("LLEN", clave)
+
+    def incr(self, clave: str) -> "Tuberia":
+        return self._agregar("INCR", clave)
+
+    def delete(self, *claves: str) -> "Tuberia":
+        return self._agregar("DEL", *claves)
+
+    def expire(self, clave: str, ttl: int) -> "Tuberia":
+        return self._agregar("EXPIRE", clave, ttl)
+
+    async def ejecutar(self) -> List[Any]:
+        """Envía los comandos pendientes y devuelve sus resultados."""
+
+        comandos, self._comandos = self._comandos, []
+        if not comandos:
+            return []
+        return await self._ejecutor(comandos)
+
+    def _agregar(self, *comando: Any) -> "Tuberia":
+        self._comandos.append(comando)
+        return self
+
+
+class AlmacenamientoAsincrono(Protocol):
+    """Contrato asíncrono equivalente al almacenamiento de ``GestorContexto``."""
+
+    async def aget(self, clave: str) -> Optional[Valor]: ...
+
+    async def amget(self, *claves: str) -> List[Optional[Valor]]: ...
+
+    async def asetex(self, clave: str, ttl: int, valor: Valor) -> None: ...
+
+    async def arpush(self, clave: str, *valores: Valor) -> int: ...
+
+    async def alrange(self, clave: str, inicio: int, fin: int) -> List[Valor]: ...
+
+    async def allen(self, clave: str) -> int: ...
+
+    async def aincr(self, clave: str) -> int: ...
+
+    async def adelete(self, *claves: str) -> int: ...
+
+    async def aexpire(self, clave: str, ttl: int) -> bool: ...
+
+    async def acas(
+        self,
+        clave_version: str,
+        esperada: Optional[int],
+        ttl: int,
+        valores: Optional[Dict[str, Valor]] = None,
+        listas: Optional[Dict[str, Sequence[Valor]]] = None,
+    ) -> Optional[int]: ...
+
+    def pipeline(self) -> Tuberia: ...
+
+
+class _OperacionesAsincronas(ABC):
+    """Implementa las operaciones sueltas como tuberías de un solo comando."""
+
+    async def aget(self, clave: str) -> Optional[Valor]:
+        return await self._unico("GET", clave)
+
+    async def amget(self, *claves: str) -> List[Optional[Valor]]:
+        if not claves:
+            return []
+        return await self._unico("MGET", *claves)
+
+    async def asetex(self, clave: str, ttl: int, valor: Valor) -> None:
+        await self._unico("SETEX", clave, ttl, valor)
+
+    async def arpush(self, clave: str, *valores: Valor) -> int:
+        return await self._unico("RPUSH", clave, *valores)
+
+    async def alrange(self, clave: str, inicio: int, fin: int) -> List[Valor]:
+        return await self._unico("LRANGE", clave, inicio, fin)
+
+    async def allen(self, clave: str) -> int:
+        return await self._unico("LLEN", clave)
+
+    async def aincr(self, clave: str) -> int:
+        return await self._unico("INCR", clave)
+
+    async def adelete(self, *claves: str) -> int:
+        return await self._unico("DEL", *claves)
+
+    async def aexpire(self, clave: str, ttl: int) -> bool:
+        return bool(await self._unico("EXPIRE", clave, ttl))
+
+    def pipeline(self) -> Tuberia:
+        return Tuberia(self._ejecutar)
+
+    async def _unico(self, *comando: Any) -> Any:
+        return (await self._ejecutar([comando]))[0]
+
+    @abstractmethod
+    async def _ejecutar(self, comandos: Sequence[Comando]) -> List[Any]:
+        """Ejecuta los comandos en orden y devuelve sus resultados."""
+
+
+class AdaptadorAsincrono(_OperacionesAsincronas):
+    """Expone un almacenamiento síncrono con la interfaz asíncrona.
+
+    Pensado para almacenamientos en memoria como ``AlmacenamientoEnMemoria``,
+    cuyas operaciones no bloquean: se ejecutan directamente en el bucle de
+    eventos, sin hilos auxiliares.
+    """
+
+    _METODOS: Dict[str, str] = {
+        "GET": "get",
+        "SETEX": "setex",
+        "RPUSH": "rpush",
+        "LRANGE": "lrange",
+        "LLEN": "llen",
+        "INCR": "incr",
+        "DEL": "delete",
+        "EXPIRE": "expire",
+    }
+
+    def __init__(self, almacenamiento) -> None:
+        self.almacenamiento = almacenamiento
+
+    async def acas(
+        self,
+        clave_version: str,
+        esperada: Optional[int],
+        ttl: int,
+        valores: Optional[Dict[str, Valor]] = None,
+        listas: Optional[Dict[str, Sequence[Valor]]] = None,
+    ) -> Optional[int]:
+        """Delega en el ``cas`` atómico del almacenamiento envuelto."""
+
+        return self.almacenamiento.cas(clave_version, esperada, ttl, valores, listas)
+
+    async def _ejecutar(self, comandos: Sequence[Comando]) -> List[Any]:
+        resultados: List[Any] = []
+        for nombre, *argumentos in comandos:
+            if nombre == "MGET":
+                resultados.append([self.almacenamiento.get(c) for c in argumentos])
+            else:
+                metodo = getattr(self.almacenamiento, self._METODOS[nombre])
+                resultados.append(metodo(*argumentos))
+        return resultados
+
+
+class AlmacenamientoRESP(_OperacionesAsincronas):
+    """Cliente asíncrono de Redis (o compatible) con *pool* y *pipelining*.
+
+    Mantiene hasta ``tamano_pool`` conexiones abiertas y las reutiliza entre
+    comandos. Una tubería se escribe completa antes de leer las respuestas, así
+    que cuesta un único viaje de ida y vuelta sin importar cuántos comandos
+    contenga. Los valores se devuelven como ``bytes``; los codecs de
+    ``autobot.codificacion`` los aceptan tal cual.
+
+    El *pool* queda ligado al bucle de eventos que lo usa; si el cliente se
+    reutiliza desde otro (por ejemplo, en un nuevo ``asyncio.run``), las
+    conexiones anteriores se descartan y se abren otras en el bucle actual.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        puerto: int = 6379,
+        tamano_pool: int = 8,
+        base_datos: int = 0,
+        timeout: float | None = 5.0,
+    ) -> None:
+        if tamano_pool < 1:
+            raise ValueError("tamano_pool debe ser al menos 1")
+        self._host = host
+        self._puerto = puerto
+        self._base_datos = base_datos
+        self._timeout = timeout
+        self._tamano_pool = tamano_pool
+        self._libres: List[_ConexionRESP] = []
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        self.conexiones_abiertas = 0
+
+    async def acas(
+        self,
+        clave_version: str,
+        esperada: Optional[int],
+        ttl: int,
+        valores: Optional[Dict[str, Valor]] = None,
+        listas: Optional[Dict[str, Sequence[Valor]]] = None,
+    ) -> Optional[int]:
+        """Escribe en una transacción ``MULTI`` vigilada con ``WATCH``.
+
+        La versión se vigila y se compara con ``esperada`` en un primer viaje;
+        el segundo envía las escrituras, ``INCR`` de la versión (o ``SETEX`` de
+        ``semilla_version`` si no existía) y ``EXEC``. Si otro cliente modificó
+        la versión entretanto, Redis descarta la transacción y se devuelve
+        ``None``, igual que ante una versión distinta. Un comando encolado que
+        falla (por ejemplo, con ``WRONGTYPE``) se lanza como ``ErrorRESP``;
+        Redis no revierte los demás comandos de la transacción.
+        """
+
+        async with self._conexion() as conexion:
+            _, actual = await self._enviar(
+                conexion, [("WATCH", clave_version), ("GET", clave_version)]
+            )
+            if (None if actual is None else int(actual)) != esperada:
+                await self._enviar(conexion, [("UNWATCH",)])
+                return None
+            comandos: List[Comando] = [("MULTI",)]
+            for clave, valor in (valores or {}).items():
+                comandos.append(("SETEX", clave, ttl, valor))
+            for clave, elementos in (listas or {}).items():
+                if elementos:
+                    comandos.append(("RPUSH", clave, *elementos))
+                comandos.append(("EXPIRE", clave, ttl))
+            if actual is None:
+                semilla = semilla_version()
+                comandos.append(("SETEX", clave_version, ttl, semilla))
+            else:
+                comandos.append(("INCR", clave_version))
+                comandos.append(("EXPIRE", clave_version, ttl))
+            comandos.append(("EXEC",))
+            resultados = (await self._enviar(conexion, comandos))[-1]
+        if resultados is None:
+            return None
+        for resultado in resultados:
+            if isinstance(resultado, ErrorRESP):
+                raise resultado
+        return semilla if actual is None else int(resultados[-2])
+
+    async def cerrar(self) -> None:
+        """Cierra las conexiones inactivas del *pool*."""
+
+        if self._bucle is not asyncio.get_running_loop():
+            self._descartar_pool()
+            return
+        libres, self._libres = self._libres, []
+        for conexion in libres:
+            await conexion.cerrar()
+
+    async def _ejecutar(self, comandos: Sequence[Comando]) -> List[Any]:
+        async with self._conexion() as conexion:
+            return await self._enviar(conexion, comandos)
+
+    async def _enviar(
+        self, conexion: "_ConexionRESP", comandos: Sequence[Comando]
+    ) -> List[Any]:
+        respuestas = await asyncio.wait_for(conexion.ejecutar(comandos), self._timeout)
+        for respuesta in respuestas:
+            if isinstance(respuesta, ErrorRESP):
+                raise respuesta
+        return respuestas
+
+    @asynccontextmanager
+    async def _conexion(self) -> AsyncIterator["_ConexionRESP"]:
+        bucle = asyncio.get_running_loop()
+        if self._bucle is not bucle:
+            self._descartar_pool()
+            self._bucle = bucle
+            self._semaforo = asyncio.Semaphore(self._tamano_pool)
+        async with self._semaforo:
+            conexion = self._libres.pop() if self._libres else await self._abrir()
+            try:
+                yield conexion
+            except BaseException:
+                # Una respuesta a medio leer desincroniza el flujo: se descarta.
+                self.conexiones_abiertas -= 1
+                await conexion.cerrar()
+                raise
+            if self._bucle is bucle:
+                self._libres.append(conexion)
+            else:
+                self.conexiones_abiertas -= 1
+                conexion.descartar()
+
+    def _descartar_pool(self) -> None:
+        """Suelta las conexiones libres de un bucle de eventos anterior."""
+
+        libres, self._libres = self._libres, []
+        for conexion in libres:
+            conexion.descartar()
+        self.conexiones_abiertas -= len(libres)
+
+    async def _abrir(self) -> "_ConexionRESP":
+        lector, escritor = await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._puerto), self._timeout
+        )
+        conexion = _ConexionRESP(lector, escritor)
+        self.conexiones_abiertas += 1
+        if self._base_datos:
+            (respuesta,) = await conexion.ejecutar([("SELECT", self._base_datos)])
+            if isinstance(respuesta, ErrorRESP):
+                await conexion.cerrar()
+                raise respuesta
+        return conexion
+
+
+class _ConexionRESP:
+    __slots__ = ("_lector", "_escritor")
+
+    def __init__(
+        self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter
+    ) -> None:
+        self._lector = lector
+        self._escritor = escritor
+
+    async def ejecutar(self, comandos: Sequence[Comando]) -> List[Any]:
+        self._escritor.write(b"".join(codificar_comando(*c) for c in comandos))
+        await self._escritor.drain()
+        return [await leer_respuesta(self._lector) for _ in comandos]
+
+    def descartar(self) -> None:
+        """Corta la conexión sin usar su bucle de eventos, que puede estar cerrado."""
+
+        conector = self._escritor.get_extra_info("socket")
+        if conector is not None:
+            try:
+                conector.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    async def cerrar(self) -> None:
+        self._escritor.close()
+        try:
+            await self._escritor.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+def codificar_comando(*argumentos: Any) -> bytes:
+    """Serializa un comando como arreglo RESP de cadenas *bulk*."""
+
+    partes = [b"*%d\r\n" % len(argumentos)]
+    for argumento in argumentos:
+        if isinstance(argumento, str):
+            argumento = argumento.encode("utf-8")
+        elif isinstance(argumento, int):
+            argumento = str(argumento).encode("ascii")
+        elif not isinstance(argumento, (bytes, bytearray)):
+            raise TypeError(f"Argumento RESP no soportado: {type(argumento)!r}")
+        partes.append(b"$%d\r\n%s\r\n" % (len(argumento), argumento))
+    return b"".join(partes)
+
+
+def semilla_version() -> int:
+    """Valor inicial de un contador de versión que todavía no existe.
+
+    Son los microsegundos de la hora actual, estrictamente crecientes dentro
+    del proceso. Si ``version:<id>`` vence o se desaloja, el contador nuevo
+    arranca por encima de cualquier valor anterior y una caché que guardó una
+    versión vieja no vuelve a coincidir con datos distintos.
+    """
+
+    global _ultima_semilla
+    with _lock_semilla:
+        _ultima_semilla = max(time.time_ns() // 1000, _ultima_semilla + 1)
+        return _ultima_semilla
+
+
+async def leer_respuesta(lector: asyncio.StreamReader) -> Any:
+    """Lee una respuesta RESP; los errores se devuelven como ``ErrorRESP``."""
+
+    linea = await lector.readuntil(b"\r\n")
+    tipo, contenido = linea[:1], linea[1:-2]
+    if tipo == b"+":
+        return contenido.decode("utf-8")
+    if tipo == b"-":
+        return ErrorRESP(contenido.decode("utf-8"))
+    if tipo == b":":
+        return int(contenido)
+    if tipo == b"$":
+        longitud = int(contenido)
+        if longitud < 0:
+            return None
+        return (await lector.readexactly(longitud + 2))[:-2]
+    if tipo == b"*":
+        cantidad = int(contenido)
+        if cantidad < 0:
+            return None
+        return [await leer_respuesta(lector) for _ in range(cantidad)]
+    raise ValueError(f"Respuesta RESP inválida: {linea!r}")
+
+
+__all__ = [
+    "AdaptadorAsincrono",
+    "AlmacenamientoAsincrono",
+    "AlmacenamientoRESP",
+    "ErrorRESP",
+    "Tuberia",
+    "codificar_comando",
+    "leer_respuesta",
+    "semilla_version",
+]
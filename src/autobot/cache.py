@@ -0,0 +1,238 @@
+"""Caché de veredictos del LLM direccionada por contenido."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .models import EvidenciaEvaluacion
+
+if TYPE_CHECKING:
+    from .evaluation import DefinicionCriterio, VeredictoCriterio
+
+_EntradaVeredicto = Tuple[int, str, Tuple[Tuple[str, int, str, str], ...]]
+
+_LOTE_ACCESOS = 64
+
+
+def clave_veredicto(
+    nombre: str,
+    definicion: "DefinicionCriterio",
+    transcripcion: str,
+    temperatura: float,
+    max_tokens: int,
+) -> str:
+    """Calcula el hash que identifica un veredicto para una entrada concreta."""
+
+    material = json.dumps(
+        [
+            nombre,
+            definicion.peso,
+            definicion.descripcion,
+            [[nivel, texto] for nivel, texto in sorted(definicion.escala.items())],
+            list(definicion.indicadores_positivos),
+            list(definicion.indicadores_negativos),
+            transcripcion,
+            temperatura,
+            max_tokens,
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CacheVeredictos:
+    """Guarda veredictos por criterio en memoria (LRU) y opcionalmente en disco.
+
+    El nivel en disco es una base SQLite que sobrevive a reinicios; cuando supera
+    ``capacidad_disco`` descarta las entradas usadas hace más tiempo. Los
+    accesos a disco se registran en memoria y se escriben por lotes, y el
+    número de filas se lleva en un contador para no contar la tabla en cada
+    escritura.
+    """
+
+    def __init__(
+        self,
+        capacidad: int = 1024,
+        ruta_disco: str | Path | None = None,
+        capacidad_disco: int = 100_000,
+    ) -> None:
+        if capacidad < 1 or capacidad_disco < 1:
+            raise ValueError("La capacidad de la caché debe ser un entero positivo")
+        self._capacidad = capacidad
+        self._capacidad_disco = capacidad_disco
+        self._memoria: "OrderedDict[str, _EntradaVeredicto]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._estadisticas: Dict[str, int] = {
+            "aciertos": 0,
+            "aciertos_disco": 0,
+            "fallos": 0,
+            "desalojos": 0,
+            "desalojos_disco": 0,
+        }
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._ultimo_acceso = 0
+        self._entradas_disco = 0
+        self._accesos_pendientes: Dict[str, int] = {}
+        if ruta_disco is not None:
+            self._conexion = sqlite3.connect(str(ruta_disco), check_same_thread=False)
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS veredictos ("
+                "clave TEXT PRIMARY KEY, valor TEXT NOT NULL, acceso INTEGER NOT NULL)"
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_veredictos_acceso "
+                "ON veredictos (acceso)"
+            )
+            self._conexion.commit()
+            self._ultimo_acceso, self._entradas_disco = self._conexion.execute(
+                "SELECT COALESCE(MAX(acceso), 0), COUNT(*) FROM veredictos"
+            ).fetchone()
+
+    def obtener(self, clave: str) -> Optional["VeredictoCriterio"]:
+        """Devuelve el veredicto almacenado o ``None`` si no existe."""
+
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                self._memoria.move_to_end(clave)
+                self._estadisticas["aciertos"] += 1
+                return _a_veredicto(entrada)
+
+            entrada = self._leer_disco(clave)
+            if entrada is None:
+                self._estadisticas["fallos"] += 1
+                return None
+            self._estadisticas["aciertos"] += 1
+            self._estadisticas["aciertos_disco"] += 1
+            self._guardar_memoria(clave, entrada)
+            return _a_veredicto(entrada)
+
+    def guardar(self, clave: str, veredicto: "VeredictoCriterio") -> None:
+        """Registra un veredicto en todos los niveles disponibles."""
+
+        puntaje, justificacion, evidencias = veredicto
+        entrada: _EntradaVeredicto = (
+            puntaje,
+            justificacion,
+            tuple(
+                (
+                    evidencia.criterio,
+                    evidencia.turno,
+                    evidencia.extracto,
+                    evidencia.impacto,
+                )
+                for evidencia in evidencias
+            ),
+        )
+        with self._lock:
+            self._guardar_memoria(clave, entrada)
+            self._escribir_disco(clave, entrada)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Expone contadores de aciertos, fallos, desalojos y tamaño."""
+
+        with self._lock:
+            datos = dict(self._estadisticas)
+            datos["entradas_memoria"] = len(self._memoria)
+            if self._conexion is not None:
+                datos["entradas_disco"] = self._entradas_disco
+            return datos
+
+    def cerrar(self) -> None:
+        """Libera la conexión con el nivel en disco, si existe."""
+
+        with self._lock:
+            if self._conexion is not None:
+                self._volcar_accesos()
+                self._conexion.commit()
+                self._conexion.close()
+                self._conexion = None
+
+    def _tick(self) -> int:
+        """Reloj lógico que ordena los accesos al nivel en disco."""
+
+        self._ultimo_acceso += 1
+        return self._ultimo_acceso
+
+    def _guardar_memoria(self, clave: str, entrada: _EntradaVeredicto) -> None:
+        self._memoria[clave] = entrada
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self._capacidad:
+            self._memoria.popitem(last=False)
+            self._estadisticas["desalojos"] += 1
+
+    def _leer_disco(self, clave: str) -> Optional[_EntradaVeredicto]:
+        if self._conexion is None:
+            return None
+        fila = self._conexion.execute(
+            "SELECT valor FROM veredictos WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        # Basta con que el orden sea aproximado: se escribe junto con la próxima
+        # inserción o al acumular un lote.
+        self._accesos_pendientes[clave] = self._tick()
+        if len(self._accesos_pendientes) >= _LOTE_ACCESOS:
+            self._volcar_accesos()
+            self._conexion.commit()
+        puntaje, justificacion, evidencias = json.loads(fila[0])
+        return puntaje, justificacion, tuple(tuple(item) for item in evidencias)
+
+    def _escribir_disco(self, clave: str, entrada: _EntradaVeredicto) -> None:
+        if self._conexion is None:
+            return
+        self._accesos_pendientes.pop(clave, None)
+        self._volcar_accesos()
+        valor = json.dumps(entrada, ensure_ascii=False)
+        acceso = self._tick()
+        if self._conexion.execute(
+            "INSERT OR IGNORE INTO veredictos (clave, valor, acceso) VALUES (?, ?, ?)",
+            (clave, valor, acceso),
+        ).rowcount:
+            self._entradas_disco += 1
+        else:
+            self._conexion.execute(
+                "UPDATE veredictos SET valor = ?, acceso = ? WHERE clave = ?",
+                (valor, acceso, clave),
+            )
+        exceso = self._entradas_disco - self._capacidad_disco
+        if exceso > 0:
+            self._conexion.execute(
+                "DELETE FROM veredictos WHERE clave IN ("
+                "SELECT clave FROM veredictos ORDER BY acceso LIMIT ?)",
+                (exceso,),
+            )
+            self._entradas_disco -= exceso
+            self._estadisticas["desalojos_disco"] += exceso
+        self._conexion.commit()
+
+    def _volcar_accesos(self) -> None:
+        """Escribe los accesos registrados desde el último volcado, sin confirmar."""
+
+        if self._accesos_pendientes:
+            self._conexion.executemany(
+                "UPDATE veredictos SET acceso = ? WHERE clave = ?",
+                [(acceso, clave) for clave, acceso in self._accesos_pendientes.items()],
+            )
+            self._accesos_pendientes.clear()
+
+
+def _a_veredicto(entrada: _EntradaVeredicto) -> "VeredictoCriterio":
+    puntaje, justificacion, evidencias = entrada
+    lista: List[EvidenciaEvaluacion] = [
+        EvidenciaEvaluacion(
+            criterio=criterio, turno=turno, extracto=extracto, impacto=impacto
+        )
+        for criterio, turno, extracto, impacto in evidencias
+    ]
+    return puntaje, justificacion, lista
+
+
+__all__ = ["CacheVeredictos", "clave_veredicto"]
@@ -0,0 +1,106 @@
+"""Coalescencia de evaluaciones duplicadas en curso (*single-flight*)."""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from .evaluation import AnalizadorConversacion
+from .models import ContextoConversacion, PuntoControlEvaluacion, ResultadoEvaluacion
+
+T = TypeVar("T")
+
+
+class CoalescedorEvaluaciones:
+    """Comparte una única evaluación entre solicitudes idénticas simultáneas.
+
+    Dos solicitudes son idénticas si apuntan a la misma sesión con la misma
+    cantidad de turnos. La primera ejecuta la evaluación y las demás esperan su
+    resultado (o su error). El estado se protege con un ``threading.Lock`` y el
+    resultado se publica en un ``concurrent.futures.Future``, así que también
+    se coalescen solicitudes de hilos con bucles de eventos distintos, como
+    ocurre en ``ThreadingHTTPServer``. Cancelar a un solicitante no cancela la
+    evaluación compartida.
+    """
+
+    def __init__(self, analizador: AnalizadorConversacion) -> None:
+        self._analizador = analizador
+        self._lock = threading.Lock()
+        self._en_curso: Dict[Hashable, concurrent.futures.Future] = {}
+        self._estadisticas: Dict[str, int] = {
+            "solicitudes": 0,
+            "ejecutadas": 0,
+            "coalescidas": 0,
+        }
+
+    async def evaluar_conversacion(
+        self, contexto: ContextoConversacion
+    ) -> ResultadoEvaluacion:
+        """Equivalente coalescido de ``AnalizadorConversacion.evaluar_conversacion``."""
+
+        return await self._compartir(
+            ("completa", contexto.sesion_id, len(contexto.historial)),
+            lambda: self._analizador.evaluar_conversacion(contexto),
+        )
+
+    async def evaluar_incremental(
+        self,
+        contexto: ContextoConversacion,
+        punto_control: Optional[PuntoControlEvaluacion] = None,
+    ) -> Tuple[ResultadoEvaluacion, PuntoControlEvaluacion]:
+        """Equivalente coalescido de ``AnalizadorConversacion.evaluar_incremental``."""
+
+        desde = None if punto_control is None else punto_control.turnos_evaluados
+        return await self._compartir(
+            ("incremental", contexto.sesion_id, len(contexto.historial), desde),
+            lambda: self._analizador.evaluar_incremental(contexto, punto_control),
+        )
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Solicitudes recibidas, evaluaciones ejecutadas y llamadas coalescidas."""
+
+        with self._lock:
+            datos = dict(self._estadisticas)
+            datos["en_curso"] = len(self._en_curso)
+            return datos
+
+    async def _compartir(
+        self, clave: Hashable, fabrica: Callable[[], Awaitable[T]]
+    ) -> T:
+        with self._lock:
+            self._estadisticas["solicitudes"] += 1
+            futuro = self._en_curso.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = concurrent.futures.Future()
+                self._en_curso[clave] = futuro
+                self._estadisticas["ejecutadas"] += 1
+            else:
+                self._estadisticas["coalescidas"] += 1
+
+        if lider:
+            tarea = asyncio.ensure_future(fabrica())
+            tarea.add_done_callback(
+                lambda terminada: self._publicar(clave, futuro, terminada)
+            )
+        return await asyncio.shield(asyncio.wrap_future(futuro))
+
+    def _publicar(
+        self,
+        clave: Hashable,
+        futuro: concurrent.futures.Future,
+        tarea: asyncio.Future,
+    ) -> None:
+        with self._lock:
+            self._en_curso.pop(clave, None)
+        if tarea.cancelled():
+            futuro.cancel()
+        elif tarea.exception() is not None:
+            futuro.set_exception(tarea.exception())
+        else:
+            futuro.set_result(tarea.result())
+
+
+__all__ = ["CoalescedorEvaluaciones"]
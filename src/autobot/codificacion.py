@@ -0,0 +1,386 @@
+"""Formatos de serialización de los contextos almacenados por ``GestorContexto``.
+
+Se ofrecen dos codecs intercambiables: ``CodecJSON``, el formato histórico, y
+``CodecBinario``, un formato compacto versionado. Las funciones
+``decodificar_cabecera`` y ``decodificar_mensaje`` reconocen ambos, de modo que
+una sesión escrita con un formato puede leerse y extenderse con el otro
+mientras dura la migración.
+
+Los escenarios del catálogo se guardan como referencia ``(id, versión)`` y al
+leerse se resuelven contra ``RegistroEscenarios``, que comparte una instancia
+por escenario; los escenarios ad hoc se siguen guardando completos.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, Iterable, List, Protocol, Tuple, Union
+
+from .models import (
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    EscenarioObra,
+    MensajeConversacion,
+    PersonalidadCliente,
+)
+from .scenarios import REGISTRO_ESCENARIOS, RegistroEscenarios
+from .serializacion import a_dict, desde_dict, serializador
+
+Codificado = Union[str, bytes]
+
+MAGIA_BINARIA = b"\xabA"
+VERSION_FORMATO_BINARIO = 2
+_VERSIONES_BINARIAS_LEGIBLES: FrozenSet[int] = frozenset({1, 2})
+_TIPO_CABECERA = ord("C")
+_TIPO_MENSAJE = ord("M")
+
+# Los ordinales forman parte del formato: solo pueden agregarse valores al final.
+_ROLES: Tuple[str, ...] = ("cliente", "agente")
+_ESTADOS: Tuple[str, ...] = ("iniciando", "en_progreso", "resolviendo", "finalizado")
+_COMPLEJIDADES: Tuple[str, ...] = ("baja", "media", "alta")
+_PERSONALIDADES: Tuple[PersonalidadCliente, ...] = tuple(PersonalidadCliente)
+_CANALES: Tuple[CanalComunicacion, ...] = tuple(CanalComunicacion)
+_ORDINAL_LIBRE = 0xFF
+_ESCENARIO_REFERENCIA = 0
+_ESCENARIO_EMBEBIDO = 1
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ENCABEZADO = struct.Struct("<2sBB")
+_MARCA_TIEMPO = struct.Struct("<qh")
+_REAL = struct.Struct("<d")
+
+
+class CodecContexto(Protocol):
+    """Convierte la cabecera y los mensajes de una sesión a su forma almacenada.
+
+    La cabecera nunca incluye el historial: los mensajes se codifican por
+    separado para el registro de la sesión.
+    """
+
+    def codificar_cabecera(self, contexto: ContextoConversacion) -> Codificado:
+        """Serializa los metadatos del contexto, sin el historial."""
+
+    def codificar_mensaje(self, mensaje: MensajeConversacion) -> Codificado:
+        """Serializa un mensaje individual."""
+
+    def decodificar_cabecera(self, datos: Codificado) -> ContextoConversacion:
+        """Decodifica una cabecera resolviendo escenarios en el registro del codec."""
+
+
+class CodecJSON:
+    """Formato JSON legible con marcas de tiempo ISO-8601."""
+
+    def __init__(self, registro: RegistroEscenarios | None = None) -> None:
+        self._registro = registro or REGISTRO_ESCENARIOS
+
+    def codificar_cabecera(self, contexto: ContextoConversacion) -> str:
+        cabecera = _cabecera_a_dict(contexto)
+        referencia = self._registro.referencia(contexto.configuracion.escenario)
+        if referencia is not None:
+            cabecera["configuracion"]["escenario"] = {
+                "ref": referencia[0],
+                "version_catalogo": referencia[1],
+            }
+        return json.dumps(cabecera)
+
+    def codificar_mensaje(self, mensaje: MensajeConversacion) -> str:
+        return json.dumps(a_dict(mensaje), ensure_ascii=False)
+
+    def decodificar_cabecera(self, datos: Codificado) -> ContextoConversacion:
+        return decodificar_cabecera(datos, self._registro)
+
+
+class CodecBinario:
+    """Formato binario compacto con versión de esquema.
+
+    Cada valor empieza con ``MAGIA_BINARIA``, un byte de tipo y la versión del
+    esquema. Las marcas de tiempo se guardan como microsegundos desde la época
+    más el desfase horario en minutos, los enumerados y literales como
+    ordinales de un byte y las cadenas con su longitud como prefijo (varint).
+    Las fechas sin zona horaria se interpretan como UTC.
+    """
+
+    def __init__(self, registro: RegistroEscenarios | None = None) -> None:
+        self._registro = registro or REGISTRO_ESCENARIOS
+
+    def codificar_cabecera(self, contexto: ContextoConversacion) -> bytes:
+        configuracion = contexto.configuracion
+        escenario = configuracion.escenario
+        salida = bytearray(
+            _ENCABEZADO.pack(MAGIA_BINARIA, _TIPO_CABECERA, VERSION_FORMATO_BINARIO)
+        )
+        _escribir_cadena(salida, contexto.sesion_id)
+        salida.append(_PERSONALIDADES.index(configuracion.personalidad))
+        salida.append(_CANALES.index(configuracion.canal))
+        _escribir_fecha(salida, configuracion.timestamp_inicio)
+        _escribir_entero(salida, configuracion.duracion_maxima)
+        salida += _REAL.pack(configuracion.nivel_dificultad)
+        _escribir_ordinal(salida, _ESTADOS, contexto.estado_actual)
+        referencia = self._registro.referencia(escenario)
+        if referencia is not None:
+            salida.append(_ESCENARIO_REFERENCIA)
+            _escribir_cadena(salida, referencia[0])
+            _escribir_entero(salida, referencia[1])
+        else:
+            salida.append(_ESCENARIO_EMBEBIDO)
+            _escribir_cadena(salida, escenario.id)
+            _escribir_cadena(salida, escenario.titulo)
+            _escribir_cadena(salida, escenario.descripcion)
+            _escribir_ordinal(salida, _COMPLEJIDADES, escenario.complejidad)
+            _escribir_cadena(salida, escenario.area)
+            _escribir_cadenas(salida, escenario.palabras_clave)
+            _escribir_cadena(salida, escenario.solucion_esperada)
+            _escribir_entero(salida, escenario.tiempo_estimado_resolucion)
+        _escribir_entero(salida, len(contexto.datos_clave_mencionados))
+        for clave, valor in contexto.datos_clave_mencionados.items():
+            _escribir_cadena(salida, clave)
+            salida.append(1 if valor else 0)
+        _escribir_cadenas(salida, contexto.emociones_cliente)
+        return bytes(salida)
+
+    def codificar_mensaje(self, mensaje: MensajeConversacion) -> bytes:
+        salida = bytearray(
+            _ENCABEZADO.pack(MAGIA_BINARIA, _TIPO_MENSAJE, VERSION_FORMATO_BINARIO)
+        )
+        _escribir_entero(salida, mensaje.turno)
+        _escribir_ordinal(salida, _ROLES, mensaje.rol)
+        _escribir_fecha(salida, mensaje.timestamp)
+        _escribir_cadena(salida, mensaje.contenido)
+        metadatos = mensaje.metadatos if mensaje._tiene_metadatos() else {}
+        _escribir_entero(salida, len(metadatos))
+        for clave, valor in metadatos.items():
+            _escribir_cadena(salida, clave)
+            _escribir_cadena(salida, valor)
+        return bytes(salida)
+
+    def decodificar_cabecera(self, datos: Codificado) -> ContextoConversacion:
+        return decodificar_cabecera(datos, self._registro)
+
+
+CODECS: Dict[str, CodecContexto] = {"json": CodecJSON(), "binario": CodecBinario()}
+
+
+def decodificar_cabecera(
+    datos: Codificado, registro: RegistroEscenarios | None = None
+) -> ContextoConversacion:
+    """Decodifica una cabecera en cualquiera de los formatos soportados.
+
+    Las sesiones JSON del formato anterior traen el historial embebido; en ese
+    caso se devuelve en ``historial``.
+    """
+
+    registro = registro or REGISTRO_ESCENARIOS
+    if isinstance(datos, (bytes, bytearray)) and datos[:2] == MAGIA_BINARIA:
+        lector = _Lector(datos, _TIPO_CABECERA)
+        sesion_id = lector.cadena()
+        personalidad = _PERSONALIDADES[lector.byte()]
+        canal = _CANALES[lector.byte()]
+        timestamp_inicio = lector.fecha()
+        duracion_maxima = lector.entero()
+        nivel_dificultad = lector.real()
+        estado_actual = lector.ordinal(_ESTADOS)
+        if lector.version >= 2 and lector.byte() == _ESCENARIO_REFERENCIA:
+            escenario = registro.resolver(lector.cadena(), lector.entero())
+        else:
+            escenario = registro.compartir(
+                EscenarioObra(
+                    id=lector.cadena(),
+                    titulo=lector.cadena(),
+                    descripcion=lector.cadena(),
+                    complejidad=lector.ordinal(_COMPLEJIDADES),
+                    area=lector.cadena(),
+                    palabras_clave=lector.cadenas(),
+                    solucion_esperada=lector.cadena(),
+                    tiempo_estimado_resolucion=lector.entero(),
+                )
+            )
+        datos_clave = {
+            lector.cadena(): bool(lector.byte()) for _ in range(lector.entero())
+        }
+        return ContextoConversacion(
+            sesion_id=sesion_id,
+            configuracion=ConfiguracionSimulacion(
+                personalidad=personalidad,
+                canal=canal,
+                escenario=escenario,
+                timestamp_inicio=timestamp_inicio,
+                duracion_maxima=duracion_maxima,
+                nivel_dificultad=nivel_dificultad,
+            ),
+            estado_actual=estado_actual,
+            datos_clave_mencionados=datos_clave,
+            emociones_cliente=lector.cadenas(),
+        )
+    if isinstance(datos, (bytes, bytearray)):
+        datos = datos.decode("utf-8")
+    return _contexto_desde_dict(json.loads(datos), registro)
+
+
+def decodificar_mensaje(datos: Union[Codificado, Dict]) -> MensajeConversacion:
+    """Decodifica un mensaje binario, JSON o ya convertido a diccionario.
+
+    Las marcas de tiempo binarias en UTC se guardan con ``marca_compacta``.
+    """
+
+    if isinstance(datos, (bytes, bytearray)) and datos[:2] == MAGIA_BINARIA:
+        lector = _Lector(datos, _TIPO_MENSAJE)
+        turno = lector.entero()
+        rol = lector.ordinal(_ROLES)
+        timestamp = lector.fecha()
+        contenido = lector.cadena()
+        metadatos = {lector.cadena(): lector.cadena() for _ in range(lector.entero())}
+        return MensajeConversacion(
+            turno=turno,
+            rol=rol,
+            contenido=contenido,
+            timestamp=timestamp,
+            metadatos=metadatos or None,
+            marca_compacta=timestamp.utcoffset() == timedelta(0),
+        )
+    if isinstance(datos, (bytes, bytearray)):
+        datos = datos.decode("utf-8")
+    entrada = json.loads(datos) if isinstance(datos, str) else datos
+    return desde_dict(MensajeConversacion, entrada)
+
+
+def _cabecera_a_dict(contexto: ContextoConversacion) -> Dict:
+    """Metadatos de la sesión sin el historial, listos para ``json.dumps``."""
+
+    return serializador(ContextoConversacion, excluir=("historial",))(contexto)
+
+
+def _contexto_desde_dict(
+    payload: Dict, registro: RegistroEscenarios
+) -> ContextoConversacion:
+    configuracion = payload["configuracion"]
+    escenario = configuracion["escenario"]
+    if "ref" in escenario:
+        escenario = registro.resolver(escenario["ref"], escenario["version_catalogo"])
+    else:
+        escenario = registro.compartir(desde_dict(EscenarioObra, escenario))
+    return desde_dict(
+        ContextoConversacion,
+        {**payload, "configuracion": {**configuracion, "escenario": escenario}},
+    )
+
+
+def _escribir_entero(salida: bytearray, valor: int) -> None:
+    """Escribe un entero no negativo como varint LEB128."""
+
+    if valor < 0:
+        raise ValueError(f"No se puede codificar un entero negativo: {valor}")
+    while True:
+        byte = valor & 0x7F
+        valor >>= 7
+        if valor:
+            salida.append(byte | 0x80)
+        else:
+            salida.append(byte)
+            return
+
+
+def _escribir_cadena(salida: bytearray, texto: str) -> None:
+    codificado = texto.encode("utf-8")
+    _escribir_entero(salida, len(codificado))
+    salida += codificado
+
+
+def _escribir_cadenas(salida: bytearray, textos: Iterable[str]) -> None:
+    textos = list(textos)
+    _escribir_entero(salida, len(textos))
+    for texto in textos:
+        _escribir_cadena(salida, texto)
+
+
+def _escribir_ordinal(salida: bytearray, valores: Tuple[str, ...], valor: str) -> None:
+    """Escribe el ordinal del literal o, si no es conocido, el texto completo."""
+
+    try:
+        salida.append(valores.index(valor))
+    except ValueError:
+        salida.append(_ORDINAL_LIBRE)
+        _escribir_cadena(salida, valor)
+
+
+def _escribir_fecha(salida: bytearray, momento: datetime) -> None:
+    desfase = momento.utcoffset()
+    if desfase is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+        desfase = timedelta(0)
+    microsegundos = (momento - _EPOCA) // timedelta(microseconds=1)
+    salida += _MARCA_TIEMPO.pack(microsegundos, int(desfase.total_seconds() // 60))
+
+
+class _Lector:
+    """Cursor de lectura sobre un valor binario con encabezado verificado."""
+
+    __slots__ = ("_datos", "_posicion", "version")
+
+    def __init__(self, datos: bytes, tipo: int) -> None:
+        if datos[2] != tipo:
+            raise ValueError(f"Tipo de registro binario inesperado: {datos[2]}")
+        if datos[3] not in _VERSIONES_BINARIAS_LEGIBLES:
+            raise ValueError(f"Versión de formato binario no soportada: {datos[3]}")
+        self.version = datos[3]
+        self._datos = bytes(datos)
+        self._posicion = _ENCABEZADO.size
+
+    def byte(self) -> int:
+        valor = self._datos[self._posicion]
+        self._posicion += 1
+        return valor
+
+    def entero(self) -> int:
+        byte = self._datos[self._posicion]
+        self._posicion += 1
+        if byte < 0x80:
+            return byte
+        resultado = byte & 0x7F
+        desplazamiento = 7
+        while True:
+            byte = self.byte()
+            resultado |= (byte & 0x7F) << desplazamiento
+            if byte < 0x80:
+                return resultado
+            desplazamiento += 7
+
+    def real(self) -> float:
+        (valor,) = _REAL.unpack_from(self._datos, self._posicion)
+        self._posicion += _REAL.size
+        return valor
+
+    def cadena(self) -> str:
+        longitud = self.entero()
+        inicio = self._posicion
+        self._posicion += longitud
+        return self._datos[inicio : self._posicion].decode("utf-8")
+
+    def cadenas(self) -> List[str]:
+        return [self.cadena() for _ in range(self.entero())]
+
+    def ordinal(self, valores: Tuple[str, ...]) -> str:
+        indice = self.byte()
+        return self.cadena() if indice == _ORDINAL_LIBRE else valores[indice]
+
+    def fecha(self) -> datetime:
+        microsegundos, minutos = _MARCA_TIEMPO.unpack_from(self._datos, self._posicion)
+        self._posicion += _MARCA_TIEMPO.size
+        momento = _EPOCA + timedelta(microseconds=microsegundos)
+        if minutos == 0:
+            return momento
+        return momento.astimezone(timezone(timedelta(minutes=minutos)))
+
+
+__all__ = [
+    "CODECS",
+    "CodecBinario",
+    "CodecContexto",
+    "CodecJSON",
+    "MAGIA_BINARIA",
+    "VERSION_FORMATO_BINARIO",
+    "decodificar_cabecera",
+    "decodificar_mensaje",
+]
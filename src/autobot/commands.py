@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import inspect
 import random
 from datetime import UTC, datetime
 
-from .context import GestorContexto
+from .cache import CacheVeredictos
+from .coalescencia import CoalescedorEvaluaciones
+from .context import GestorContexto, GestorContextoAsincrono
+from .especulacion import EvaluadorEspeculativo
 from .evaluation import AnalizadorConversacion, RubricaEvaluacion
 from .models import (
     CanalComunicacion,
@@ -18,25 +22,40 @@ from .scenarios import ESCENARIOS_OBRA
 
 
 class SistemaComandos:
-    """Procesa comandos administrativos recibidos durante la simulación."""
+    """Procesa comandos administrativos recibidos durante la simulación.
+
+    Acepta tanto ``GestorContexto`` como ``GestorContextoAsincrono``; con el
+    segundo, el acceso al almacenamiento no bloquea el bucle de eventos. Si se
+    indica ``resultados`` (por ejemplo, ``AlmacenamientoSQLite``), cada
+    evaluación final se persiste con ``resultados.guardar_resultado``. Tras
+    ``/finalizar`` la sesión queda en estado ``finalizado``.
+    """
 
     def __init__(
-        self, gestor_contexto: GestorContexto, analizador: AnalizadorConversacion
+        self,
+        gestor_contexto: GestorContexto | GestorContextoAsincrono,
+        analizador: AnalizadorConversacion | CoalescedorEvaluaciones,
+        especulador: EvaluadorEspeculativo | None = None,
+        resultados=None,
     ) -> None:
         self._gestor_contexto = gestor_contexto
         self._analizador = analizador
+        self._especulador = especulador
+        self._resultados = resultados
 
     async def procesar(self, comando: str, sesion_id: str) -> str:
         """Despacha la ejecución del comando solicitado."""
 
         comando_normalizado = comando.strip().lower()
         if comando_normalizado == "comenzar test":
-            return self._iniciar_simulacion(sesion_id)
+            return await self._iniciar_simulacion(sesion_id)
+        if comando_normalizado == "/evaluar":
+            return await self._evaluar_parcial(sesion_id)
         if comando_normalizado == "/finalizar":
             return await self._finalizar_simulacion(sesion_id)
         raise ValueError(f"Comando no reconocido: {comando}")
 
-    def _iniciar_simulacion(self, sesion_id: str) -> str:
+    async def _iniciar_simulacion(self, sesion_id: str) -> str:
         personalidad = random.choice(list(PersonalidadCliente))
         canal = random.choice(list(CanalComunicacion))
         escenario = random.choice(ESCENARIOS_OBRA)
@@ -52,7 +71,7 @@ class SistemaComandos:
             configuracion=configuracion,
             estado_actual="iniciando",
         )
-        self._gestor_contexto.inicializar_contexto(contexto)
+        await _esperar(self._gestor_contexto.inicializar_contexto(contexto))
 
         perfil = PERFILES_PERSONALIDAD.get(personalidad)
         mensaje_inicial = (
@@ -70,9 +89,37 @@ class SistemaComandos:
             f"{mensaje_inicial}"
         )
 
+    async def _evaluar_parcial(self, sesion_id: str) -> str:
+        """Evalúa los turnos nuevos y guarda un punto de control reanudable."""
+
+        contexto = await _esperar(self._gestor_contexto.obtener_contexto(sesion_id))
+        resultado, punto_control = await self._analizador.evaluar_incremental(
+            contexto,
+            await _esperar(self._gestor_contexto.obtener_punto_control(sesion_id)),
+        )
+        await _esperar(self._gestor_contexto.guardar_punto_control(punto_control))
+        return self._formatear_informe(resultado)
+
     async def _finalizar_simulacion(self, sesion_id: str) -> str:
-        contexto = self._gestor_contexto.obtener_contexto(sesion_id)
-        resultado = await self._analizador.evaluar_conversacion(contexto)
+        contexto = await _esperar(self._gestor_contexto.obtener_contexto(sesion_id))
+        if self._especulador is not None:
+            resultado = await self._especulador.obtener_resultado(contexto)
+        else:
+            punto_control = await _esperar(
+                self._gestor_contexto.obtener_punto_control(sesion_id)
+            )
+            if punto_control is None:
+                resultado = await self._analizador.evaluar_conversacion(contexto)
+            else:
+                resultado, punto_control = await self._analizador.evaluar_incremental(
+                    contexto, punto_control
+                )
+                await _esperar(
+                    self._gestor_contexto.guardar_punto_control(punto_control)
+                )
+        if self._resultados is not None:
+            await _esperar(self._resultados.guardar_resultado(resultado))
+        await _esperar(self._gestor_contexto.actualizar(sesion_id, _marcar_finalizada))
         return self._formatear_informe(resultado)
 
     @staticmethod
@@ -97,8 +144,39 @@ class SistemaComandos:
         )
 
 
-def construir_sistema_comandos(gestor: GestorContexto, llm_client) -> SistemaComandos:
-    """Facilita la creación del sistema de comandos con dependencias configuradas."""
+def _marcar_finalizada(contexto: ContextoConversacion) -> None:
+    contexto.estado_actual = "finalizado"
+
 
-    analizador = AnalizadorConversacion(llm_client, RubricaEvaluacion())
-    return SistemaComandos(gestor, analizador)
+async def _esperar(valor):
+    """Admite por igual resultados de gestores síncronos y asíncronos."""
+
+    return await valor if inspect.isawaitable(valor) else valor
+
+
+def construir_sistema_comandos(
+    gestor: GestorContexto | GestorContextoAsincrono,
+    llm_client,
+    cache: CacheVeredictos | None = None,
+    especulativo: bool = False,
+    coalescente: bool = False,
+    resultados=None,
+) -> SistemaComandos:
+    """Facilita la creación del sistema de comandos con dependencias configuradas.
+
+    Con ``especulativo=True`` cada turno del agente dispara una pre-evaluación
+    en segundo plano que ``/finalizar`` reutiliza. Con ``coalescente=True`` las
+    evaluaciones repetidas de la misma sesión en curso comparten un resultado.
+    ``resultados`` recibe cada evaluación final (ver ``SistemaComandos``).
+    """
+
+    analizador = AnalizadorConversacion(llm_client, RubricaEvaluacion(), cache=cache)
+    especulador = None
+    if especulativo:
+        especulador = EvaluadorEspeculativo(analizador)
+        gestor.suscribir(especulador.al_agregar_mensaje)
+    if coalescente:
+        return SistemaComandos(
+            gestor, CoalescedorEvaluaciones(analizador), especulador, resultados
+        )
+    return SistemaComandos(gestor, analizador, especulador, resultados)
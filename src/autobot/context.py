@@ -2,143 +2,1495 @@
 
 from __future__ import annotations
 
+import asyncio
+import heapq
 import json
+import math
+import operator
+import random
 import re
-from dataclasses import asdict
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import replace
 from datetime import UTC, datetime
-from enum import Enum
-from typing import Dict, Iterable, List, Optional
+from typing import (
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from .models import ContextoConversacion, MensajeConversacion
+from .almacenamiento import AlmacenamientoAsincrono, semilla_version
+from .codificacion import (
+    CodecContexto,
+    CodecJSON,
+    decodificar_mensaje,
+)
+from .models import (
+    ContextoConversacion,
+    MensajeConversacion,
+    MetadatosSesion,
+    PuntoControlEvaluacion,
+)
+from .serializacion import a_dict, desde_dict
+
+TTL_CONTEXTO = 86400
+
+ObservadorMensajes = Callable[[ContextoConversacion, MensajeConversacion], None]
+PreparacionEscritura = Callable[
+    [ContextoConversacion], Tuple[ContextoConversacion, List[MensajeConversacion]]
+]
+
+
+class ConflictoConcurrencia(RuntimeError):
+    """Otros escritores modificaron la sesión en todos los reintentos."""
 
 
 class GestorContexto:
-    """Mantiene el estado de la conversación con soporte de almacenamiento externo."""
+    """Mantiene el estado de la conversación con soporte de almacenamiento externo.
+
+    Cada sesión ocupa dos claves: una cabecera con los metadatos
+    (``contexto:<id>``) y una lista de mensajes codificados por separado
+    (``mensajes:<id>``) a la que solo se agregan elementos. El almacenamiento
+    debe ofrecer, además de ``get``/``setex``, las operaciones de Redis
+    ``rpush``, ``lrange``, ``llen``, ``delete``, ``expire`` e ``incr``.
+
+    Los contextos decodificados se conservan en una caché LRU de hasta
+    ``capacidad_cache`` sesiones. Cada escritura incrementa un contador de
+    versión en el almacenamiento (``version:<id>``) y una entrada solo se usa
+    si su versión coincide con la almacenada, así que las escrituras de otros
+    procesos la invalidan. Con ``capacidad_cache=0`` la caché se desactiva.
+
+    ``codec`` define el formato en que se escriben cabecera y mensajes (JSON
+    por defecto o ``CodecBinario``); la lectura reconoce ambos formatos.
+
+    Las escrituras de una sesión se serializan con el lock que devuelve
+    ``almacenamiento.bloqueo(sesion_id)`` (``AlmacenamientoParticionado`` lo
+    comparte entre todos los gestores del proceso) o, si el almacenamiento no
+    lo ofrece, con locks propios del gestor repartidos por franjas. Si el
+    almacenamiento ofrece ``transaccion()`` (como ``AlmacenamientoSQLite``),
+    las escrituras de cada operación se confirman juntas. Entre
+    procesos, la cabecera solo se reescribe con ``cas`` sobre la versión
+    leída: si otro escritor se adelantó, se relee la sesión y se reintenta
+    hasta ``max_reintentos`` veces antes de lanzar ``ConflictoConcurrencia``.
+    """
 
-    def __init__(self, almacenamiento, ventana_contexto: int = 10) -> None:
+    def __init__(
+        self,
+        almacenamiento,
+        ventana_contexto: int = 10,
+        capacidad_cache: int = 256,
+        codec: CodecContexto | None = None,
+        max_reintentos: int = 8,
+    ) -> None:
+        if capacidad_cache < 0:
+            raise ValueError("capacidad_cache no puede ser negativa")
         self._almacenamiento = almacenamiento
+        self._codec = codec or CodecJSON()
         self._ventana_contexto = ventana_contexto
+        self._observadores: List[ObservadorMensajes] = []
+        self._cache = _CacheContextos(capacidad_cache)
+        self._reintentos = _ControlReintentos(max_reintentos)
+        self._bloqueo: Callable[[str], threading.RLock] = (
+            getattr(almacenamiento, "bloqueo", None) or _BloqueosPorSesion()
+        )
+        self._transaccion: Callable[[], ContextManager] = (
+            getattr(almacenamiento, "transaccion", None) or nullcontext
+        )
+
+    def suscribir(self, observador: ObservadorMensajes) -> None:
+        """Registra una función que se invoca tras persistir cada mensaje."""
+
+        self._observadores.append(observador)
 
     def agregar_mensaje(self, sesion_id: str, mensaje: MensajeConversacion) -> None:
-        """Agrega un mensaje al historial y actualiza los datos persistidos."""
+        """Agrega un mensaje al historial y actualiza los datos persistidos.
+
+        El costo no depende de la longitud de la sesión: el mensaje se agrega
+        al final de la lista y la cabecera solo se reescribe si el mensaje del
+        cliente aporta datos clave nuevos. El historial completo únicamente se
+        decodifica cuando hay observadores suscritos.
+        """
+
+        with self._bloqueo(sesion_id):
+            version = self._leer_version(sesion_id)
+            cacheado = self._cache.obtener(sesion_id, version)
+            cabecera = cacheado
+            if cabecera is None:
+                cabecera = self._leer_cabecera(sesion_id)
+                if cabecera.historial:
+                    self._migrar_formato_anterior(sesion_id, cabecera)
+            datos_clave = dict(cabecera.datos_clave_mencionados)
+            escrita = version
 
-        contexto = self.obtener_contexto(sesion_id)
-        contexto.historial.append(mensaje)
+            if version is None or (
+                mensaje.rol == "cliente"
+                and self._extraer_datos_clave(datos_clave, mensaje.contenido)
+            ):
+                nueva_version, escrita, cabecera, _ = self._escribir_versionado(
+                    sesion_id,
+                    version,
+                    cabecera,
+                    _preparar_datos_clave(mensaje),
+                    lambda: self._leer_version_y_cabecera(sesion_id),
+                )
+                datos_clave = cabecera.datos_clave_mencionados
+            else:
+                clave_mensajes = _clave_mensajes(sesion_id)
+                with self._transaccion():
+                    self._almacenamiento.rpush(
+                        clave_mensajes, self._codec.codificar_mensaje(mensaje)
+                    )
+                    self._almacenamiento.expire(clave_mensajes, TTL_CONTEXTO)
+                    self._almacenamiento.expire(_clave(sesion_id), TTL_CONTEXTO)
+                    nueva_version = self._incrementar_version(sesion_id)
 
-        if mensaje.rol == "cliente":
-            self._extraer_datos_clave(contexto, mensaje.contenido)
+            if (
+                cacheado is not None
+                and escrita == version
+                and nueva_version == version + 1
+            ):
+                cacheado.historial.append(mensaje)
+                cacheado.datos_clave_mencionados = dict(datos_clave)
+                self._cache.guardar(sesion_id, cacheado, nueva_version)
+            else:
+                self._cache.descartar(sesion_id)
 
-        self._guardar_contexto(sesion_id, contexto)
+        if self._observadores:
+            contexto = self.obtener_contexto(sesion_id)
+            for observador in self._observadores:
+                observador(contexto, mensaje)
 
     def obtener_contexto(self, sesion_id: str) -> ContextoConversacion:
-        """Recupera el contexto desde el almacenamiento o crea uno vacío."""
+        """Recupera el contexto desde el almacenamiento o crea uno vacío.
+
+        Devuelve una copia independiente: modificarla no altera la caché.
+        """
+
+        version = self._leer_version(sesion_id)
+        cacheado = self._cache.obtener(sesion_id, version)
+        if cacheado is not None:
+            return _copiar_contexto(cacheado)
+
+        contexto = self._leer_cabecera(sesion_id)
+        if contexto.historial:
+            return contexto
+        contexto.historial = [
+            decodificar_mensaje(codificado)
+            for codificado in self._almacenamiento.lrange(
+                _clave_mensajes(sesion_id), 0, -1
+            )
+        ]
+        if version is not None:
+            self._cache.guardar(sesion_id, _copiar_contexto(contexto), version)
+        return contexto
+
+    def estadisticas_cache(self) -> Dict[str, float]:
+        """Aciertos, fallos, invalidaciones y desalojos de la caché de contextos."""
+
+        return self._cache.estadisticas()
+
+    def estadisticas_escrituras(self) -> Dict[str, float]:
+        """Escrituras con ``cas``, conflictos reintentados y reintentos agotados."""
 
-        datos = self._almacenamiento.get(self._clave(sesion_id))
-        if datos is None:
-            raise KeyError(f"No existe contexto para la sesión {sesion_id!r}")
+        return self._reintentos.estadisticas()
+
+    def obtener_mensajes_recientes(
+        self, sesion_id: str, cantidad: Optional[int] = None
+    ) -> List[MensajeConversacion]:
+        """Decodifica solo los últimos ``cantidad`` mensajes de la sesión.
+
+        Por defecto devuelve la ventana de contexto configurada.
+        """
+
+        cantidad = self._ventana_contexto if cantidad is None else cantidad
+        if cantidad <= 0:
+            return []
+        cacheado = self._cache.obtener(sesion_id, self._leer_version(sesion_id))
+        if cacheado is not None:
+            return cacheado.historial[-cantidad:]
+        cabecera = self._leer_cabecera(sesion_id)
+        if cabecera.historial:
+            return cabecera.historial[-cantidad:]
+        return [
+            decodificar_mensaje(codificado)
+            for codificado in self._almacenamiento.lrange(
+                _clave_mensajes(sesion_id), -cantidad, -1
+            )
+        ]
 
-        if isinstance(datos, bytes):
-            datos = datos.decode("utf-8")
-        payload = json.loads(datos)
-        return _contexto_desde_dict(payload)
+    def obtener_historial(self, sesion_id: str) -> Sequence[MensajeConversacion]:
+        """Historial de la sesión que decodifica los mensajes a medida que se leen.
+
+        Si la sesión está en caché devuelve una copia de su lista; si no, un
+        ``HistorialDiferido``, donde ``historial[-n:]`` solo lee y decodifica
+        los ``n`` mensajes finales.
+        """
+
+        cacheado = self._cache.obtener(sesion_id, self._leer_version(sesion_id))
+        if cacheado is not None:
+            return list(cacheado.historial)
+        cabecera = self._leer_cabecera(sesion_id)
+        if cabecera.historial:
+            return cabecera.historial
+        return HistorialDiferido(self._almacenamiento, _clave_mensajes(sesion_id))
+
+    def obtener_metadatos(self, sesion_id: str) -> MetadatosSesion:
+        """Configuración, estado y datos clave de la sesión sin leer mensajes."""
+
+        cacheado = self._cache.obtener(sesion_id, self._leer_version(sesion_id))
+        if cacheado is not None:
+            return _metadatos(cacheado, len(cacheado.historial))
+        cabecera = self._leer_cabecera(sesion_id)
+        if cabecera.historial:
+            return _metadatos(cabecera, len(cabecera.historial))
+        total = self._almacenamiento.llen(_clave_mensajes(sesion_id))
+        return _metadatos(cabecera, total)
+
+    def contar_mensajes(self, sesion_id: str) -> int:
+        """Cantidad de mensajes de la sesión sin decodificar ninguno."""
+
+        cabecera = self._leer_cabecera(sesion_id)
+        if cabecera.historial:
+            return len(cabecera.historial)
+        return self._almacenamiento.llen(_clave_mensajes(sesion_id))
 
     def obtener_contexto_para_llm(self, sesion_id: str) -> str:
         """Construye una representación textual de los últimos turnos."""
 
-        contexto = self.obtener_contexto(sesion_id)
-        mensajes_recientes = contexto.historial[-self._ventana_contexto :]
-        lineas: List[str] = ["# HISTORIAL DE CONVERSACIÓN:"]
-        for mensaje in mensajes_recientes:
-            rol = "TÚ (Cliente)" if mensaje.rol == "cliente" else "AGENTE"
-            lineas.append(f"[Turno {mensaje.turno}] {rol}:\n{mensaje.contenido}\n")
-        return "\n".join(lineas)
+        return _formatear_para_llm(self.obtener_mensajes_recientes(sesion_id))
 
     def inicializar_contexto(self, contexto: ContextoConversacion) -> None:
-        """Persiste un contexto recién creado."""
+        """Persiste un contexto recién creado, reemplazando uno anterior."""
+
+        sesion_id = contexto.sesion_id
+        clave_mensajes = _clave_mensajes(sesion_id)
+        with self._bloqueo(sesion_id), self._transaccion():
+            self._almacenamiento.delete(clave_mensajes)
+            if contexto.historial:
+                self._almacenamiento.rpush(
+                    clave_mensajes,
+                    *map(self._codec.codificar_mensaje, contexto.historial),
+                )
+                self._almacenamiento.expire(clave_mensajes, TTL_CONTEXTO)
+            self._guardar_cabecera(sesion_id, contexto)
+            version = self._reiniciar_version(sesion_id)
+            self._cache.guardar(sesion_id, _copiar_contexto(contexto), version)
 
-        self._guardar_contexto(contexto.sesion_id, contexto)
+    def actualizar(
+        self,
+        sesion_id: str,
+        funcion: Callable[[ContextoConversacion], Optional[ContextoConversacion]],
+    ) -> ContextoConversacion:
+        """Aplica ``funcion`` al contexto como una única escritura atómica.
 
-    def _guardar_contexto(self, sesion_id: str, contexto: ContextoConversacion) -> None:
-        payload = json.dumps(asdict(contexto), default=_serializar_valor)
-        self._almacenamiento.setex(self._clave(sesion_id), 86400, payload)
+        ``funcion`` recibe una copia del contexto y puede modificarla o devolver
+        otra. Se persisten la cabecera y los mensajes agregados al final del
+        historial. Las demás escrituras sobre la misma sesión esperan a que
+        termine, mientras que las de otras sesiones siguen en paralelo. Si otro
+        proceso modifica la sesión entretanto, ``funcion`` se vuelve a aplicar
+        sobre el contexto fresco, así que no debe tener efectos externos.
+        """
+
+        def cargar() -> Tuple[Optional[int], ContextoConversacion]:
+            version = self._leer_version(sesion_id)
+            return version, self.obtener_contexto(sesion_id)
+
+        with self._bloqueo(sesion_id):
+            version = self._leer_version(sesion_id)
+            if self._cache.obtener(sesion_id, version) is None:
+                cabecera = self._leer_cabecera(sesion_id)
+                if cabecera.historial:
+                    self._migrar_formato_anterior(sesion_id, cabecera)
+            nueva_version, _, contexto, nuevos = self._escribir_versionado(
+                sesion_id, *cargar(), _preparar_actualizacion(funcion), cargar
+            )
+            self._cache.guardar(sesion_id, _copiar_contexto(contexto), nueva_version)
+
+        for mensaje in nuevos:
+            for observador in self._observadores:
+                observador(_copiar_contexto(contexto), mensaje)
+        return _copiar_contexto(contexto)
+
+    def guardar_punto_control(self, punto_control: PuntoControlEvaluacion) -> None:
+        """Persiste el estado de una evaluación incremental junto a la sesión."""
+
+        self._almacenamiento.setex(
+            _clave_punto_control(punto_control.sesion_id),
+            TTL_CONTEXTO,
+            _codificar_punto_control(punto_control),
+        )
+
+    def obtener_punto_control(self, sesion_id: str) -> Optional[PuntoControlEvaluacion]:
+        """Recupera el último punto de control de evaluación, si existe."""
+
+        datos = self._almacenamiento.get(_clave_punto_control(sesion_id))
+        return None if datos is None else _decodificar_punto_control(datos)
+
+    def _leer_version(self, sesion_id: str) -> Optional[int]:
+        version = self._almacenamiento.get(_clave_version(sesion_id))
+        return None if version is None else int(version)
+
+    def _incrementar_version(self, sesion_id: str) -> int:
+        clave = _clave_version(sesion_id)
+        version = self._almacenamiento.incr(clave)
+        if version == 1:
+            # La versión venció entre la lectura y el incremento: un contador
+            # que reinicia en 1 podría repetir una versión ya cacheada.
+            return self._reiniciar_version(sesion_id)
+        self._almacenamiento.expire(clave, TTL_CONTEXTO)
+        return version
+
+    def _reiniciar_version(self, sesion_id: str) -> int:
+        version = semilla_version()
+        self._almacenamiento.setex(
+            _clave_version(sesion_id), TTL_CONTEXTO, str(version)
+        )
+        return version
+
+    def _leer_version_y_cabecera(
+        self, sesion_id: str
+    ) -> Tuple[Optional[int], ContextoConversacion]:
+        return self._leer_version(sesion_id), self._leer_cabecera(sesion_id)
+
+    def _escribir_versionado(
+        self,
+        sesion_id: str,
+        version: Optional[int],
+        base: ContextoConversacion,
+        preparar: PreparacionEscritura,
+        recargar: Callable[[], Tuple[Optional[int], ContextoConversacion]],
+    ) -> Tuple[int, Optional[int], ContextoConversacion, List[MensajeConversacion]]:
+        """Escribe con ``cas`` y, ante un conflicto, reintenta sobre datos frescos.
+
+        Devuelve la versión nueva, la versión sobre la que se escribió, la
+        cabecera guardada y los mensajes agregados.
+        """
+
+        for intento in range(self._reintentos.maximo + 1):
+            if intento:
+                time.sleep(self._reintentos.pausa(intento))
+                version, base = recargar()
+            cabecera, nuevos = preparar(base)
+            nueva_version = self._almacenamiento.cas(
+                *_argumentos_cas(self._codec, sesion_id, version, cabecera, nuevos)
+            )
+            if nueva_version is not None:
+                self._reintentos.registrar(intento)
+                return nueva_version, version, cabecera, nuevos
+        self._reintentos.registrar(intento, agotado=True)
+        raise ConflictoConcurrencia(
+            f"La sesión {sesion_id!r} cambió en {intento + 1} intentos seguidos"
+        )
+
+    def _leer_cabecera(self, sesion_id: str) -> ContextoConversacion:
+        """Decodifica la cabecera; solo el formato anterior trae historial."""
+
+        return _decodificar_cabecera_existente(
+            sesion_id, self._almacenamiento.get(_clave(sesion_id)), self._codec
+        )
+
+    def _guardar_cabecera(
+        self, sesion_id: str, contexto: ContextoConversacion
+    ) -> None:
+        payload = self._codec.codificar_cabecera(contexto)
+        self._almacenamiento.setex(_clave(sesion_id), TTL_CONTEXTO, payload)
+
+    def _migrar_formato_anterior(
+        self, sesion_id: str, cabecera: ContextoConversacion
+    ) -> None:
+        """Pasa una sesión con el historial embebido al registro de mensajes."""
+
+        clave_mensajes = _clave_mensajes(sesion_id)
+        with self._transaccion():
+            self._almacenamiento.delete(clave_mensajes)
+            self._almacenamiento.rpush(
+                clave_mensajes,
+                *map(self._codec.codificar_mensaje, cabecera.historial),
+            )
+            cabecera.historial = []
+            self._guardar_cabecera(sesion_id, cabecera)
 
     @staticmethod
-    def _extraer_datos_clave(contexto: ContextoConversacion, texto: str) -> None:
-        """Extrae identificadores relevantes a partir de la conversación."""
+    def _extraer_datos_clave(datos_clave: Dict[str, bool], texto: str) -> bool:
+        """Extrae identificadores relevantes e informa si aportó alguno nuevo."""
 
+        previos = len(datos_clave)
         if re.findall(r"#[\w-]+", texto):
-            contexto.datos_clave_mencionados["numero_pedido"] = True
+            datos_clave["numero_pedido"] = True
 
         if any(palabra in texto.lower() for palabra in ("hace", "días", "semanas")):
-            contexto.datos_clave_mencionados["fecha_problema"] = True
+            datos_clave["fecha_problema"] = True
+        return len(datos_clave) != previos
 
-    @staticmethod
-    def _clave(sesion_id: str) -> str:
-        return f"contexto:{sesion_id}"
+
+class GestorContextoAsincrono:
+    """Variante de ``GestorContexto`` para almacenamientos asíncronos.
+
+    Usa el mismo formato de claves, la misma caché versionada y los mismos
+    codecs que ``GestorContexto``, así que ambos pueden compartir sesiones. El
+    almacenamiento debe cumplir ``AlmacenamientoAsincrono``: las escrituras de
+    cada operación se agrupan en una tubería para pagar un solo viaje de ida y
+    vuelta, y la lectura completa pide cabecera y mensajes juntos. Las
+    reescrituras de la cabecera usan ``acas`` con los mismos reintentos que
+    ``GestorContexto``.
+    """
+
+    def __init__(
+        self,
+        almacenamiento: AlmacenamientoAsincrono,
+        ventana_contexto: int = 10,
+        capacidad_cache: int = 256,
+        codec: CodecContexto | None = None,
+        max_reintentos: int = 8,
+    ) -> None:
+        if capacidad_cache < 0:
+            raise ValueError("capacidad_cache no puede ser negativa")
+        self._almacenamiento = almacenamiento
+        self._codec = codec or CodecJSON()
+        self._ventana_contexto = ventana_contexto
+        self._observadores: List[ObservadorMensajes] = []
+        self._cache = _CacheContextos(capacidad_cache)
+        self._reintentos = _ControlReintentos(max_reintentos)
+
+    def suscribir(self, observador: ObservadorMensajes) -> None:
+        """Registra una función que se invoca tras persistir cada mensaje."""
+
+        self._observadores.append(observador)
+
+    async def agregar_mensaje(
+        self, sesion_id: str, mensaje: MensajeConversacion
+    ) -> None:
+        """Equivalente asíncrono de ``GestorContexto.agregar_mensaje``.
+
+        Con la sesión en caché cuesta dos viajes: leer la versión y una
+        tubería con todas las escrituras.
+        """
+
+        version = await self._leer_version(sesion_id)
+        cacheado = self._cache.obtener(sesion_id, version)
+        if cacheado is not None:
+            cabecera = cacheado
+        else:
+            cabecera = await self._leer_cabecera(sesion_id)
+            if cabecera.historial:
+                await self._migrar_formato_anterior(sesion_id, cabecera)
+        datos_clave = dict(cabecera.datos_clave_mencionados)
+        escrita = version
+
+        if version is None or (
+            mensaje.rol == "cliente"
+            and GestorContexto._extraer_datos_clave(datos_clave, mensaje.contenido)
+        ):
+            nueva_version, escrita, cabecera, _ = await self._escribir_versionado(
+                sesion_id,
+                version,
+                cabecera,
+                _preparar_datos_clave(mensaje),
+                lambda: self._leer_version_y_cabecera(sesion_id),
+            )
+            datos_clave = cabecera.datos_clave_mencionados
+        else:
+            clave_mensajes = _clave_mensajes(sesion_id)
+            clave_version = _clave_version(sesion_id)
+            tuberia = self._almacenamiento.pipeline()
+            tuberia.rpush(clave_mensajes, self._codec.codificar_mensaje(mensaje))
+            tuberia.expire(clave_mensajes, TTL_CONTEXTO)
+            tuberia.expire(_clave(sesion_id), TTL_CONTEXTO)
+            tuberia.incr(clave_version).expire(clave_version, TTL_CONTEXTO)
+            nueva_version = int((await tuberia.ejecutar())[-2])
+            if nueva_version == 1:
+                nueva_version = semilla_version()
+                await self._almacenamiento.asetex(
+                    clave_version, TTL_CONTEXTO, str(nueva_version)
+                )
+
+        if cacheado is not None and escrita == version and nueva_version == version + 1:
+            cacheado.historial.append(mensaje)
+            cacheado.datos_clave_mencionados = dict(datos_clave)
+            self._cache.guardar(sesion_id, cacheado, nueva_version)
+        else:
+            self._cache.descartar(sesion_id)
+
+        if self._observadores:
+            contexto = await self.obtener_contexto(sesion_id)
+            for observador in self._observadores:
+                observador(contexto, mensaje)
+
+    async def obtener_contexto(self, sesion_id: str) -> ContextoConversacion:
+        """Recupera el contexto completo; devuelve una copia independiente."""
+
+        version = await self._leer_version(sesion_id)
+        cacheado = self._cache.obtener(sesion_id, version)
+        if cacheado is not None:
+            return _copiar_contexto(cacheado)
+
+        datos, mensajes = await (
+            self._almacenamiento.pipeline()
+            .get(_clave(sesion_id))
+            .lrange(_clave_mensajes(sesion_id), 0, -1)
+            .ejecutar()
+        )
+        contexto = _decodificar_cabecera_existente(sesion_id, datos, self._codec)
+        if contexto.historial:
+            return contexto
+        contexto.historial = [decodificar_mensaje(m) for m in mensajes]
+        if version is not None:
+            self._cache.guardar(sesion_id, _copiar_contexto(contexto), version)
+        return contexto
+
+    def estadisticas_cache(self) -> Dict[str, float]:
+        """Aciertos, fallos, invalidaciones y desalojos de la caché de contextos."""
+
+        return self._cache.estadisticas()
+
+    def estadisticas_escrituras(self) -> Dict[str, float]:
+        """Escrituras con ``acas``, conflictos reintentados y reintentos agotados."""
+
+        return self._reintentos.estadisticas()
+
+    async def obtener_mensajes_recientes(
+        self, sesion_id: str, cantidad: Optional[int] = None
+    ) -> List[MensajeConversacion]:
+        """Decodifica solo los últimos ``cantidad`` mensajes de la sesión."""
+
+        cantidad = self._ventana_contexto if cantidad is None else cantidad
+        if cantidad <= 0:
+            return []
+        cacheado = self._cache.obtener(
+            sesion_id, await self._leer_version(sesion_id)
+        )
+        if cacheado is not None:
+            return cacheado.historial[-cantidad:]
+        datos, mensajes = await (
+            self._almacenamiento.pipeline()
+            .get(_clave(sesion_id))
+            .lrange(_clave_mensajes(sesion_id), -cantidad, -1)
+            .ejecutar()
+        )
+        cabecera = _decodificar_cabecera_existente(sesion_id, datos, self._codec)
+        if cabecera.historial:
+            return cabecera.historial[-cantidad:]
+        return [decodificar_mensaje(m) for m in mensajes]
+
+    async def contar_mensajes(self, sesion_id: str) -> int:
+        """Cantidad de mensajes de la sesión sin decodificar ninguno."""
+
+        datos, cantidad = await (
+            self._almacenamiento.pipeline()
+            .get(_clave(sesion_id))
+            .llen(_clave_mensajes(sesion_id))
+            .ejecutar()
+        )
+        cabecera = _decodificar_cabecera_existente(sesion_id, datos, self._codec)
+        return len(cabecera.historial) if cabecera.historial else cantidad
+
+    async def obtener_metadatos(self, sesion_id: str) -> MetadatosSesion:
+        """Configuración, estado y datos clave en un viaje, sin leer mensajes."""
+
+        datos, cantidad = await (
+            self._almacenamiento.pipeline()
+            .get(_clave(sesion_id))
+            .llen(_clave_mensajes(sesion_id))
+            .ejecutar()
+        )
+        cabecera = _decodificar_cabecera_existente(sesion_id, datos, self._codec)
+        return _metadatos(cabecera, len(cabecera.historial) or cantidad)
+
+    async def obtener_contexto_para_llm(self, sesion_id: str) -> str:
+        """Construye una representación textual de los últimos turnos."""
+
+        return _formatear_para_llm(await self.obtener_mensajes_recientes(sesion_id))
+
+    async def inicializar_contexto(self, contexto: ContextoConversacion) -> None:
+        """Persiste un contexto recién creado en una sola tubería."""
+
+        sesion_id = contexto.sesion_id
+        clave_mensajes = _clave_mensajes(sesion_id)
+        clave_version = _clave_version(sesion_id)
+        tuberia = self._almacenamiento.pipeline().delete(clave_mensajes)
+        if contexto.historial:
+            tuberia.rpush(
+                clave_mensajes,
+                *map(self._codec.codificar_mensaje, contexto.historial),
+            )
+            tuberia.expire(clave_mensajes, TTL_CONTEXTO)
+        tuberia.setex(
+            _clave(sesion_id), TTL_CONTEXTO, self._codec.codificar_cabecera(contexto)
+        )
+        version = semilla_version()
+        await tuberia.setex(clave_version, TTL_CONTEXTO, str(version)).ejecutar()
+        self._cache.guardar(sesion_id, _copiar_contexto(contexto), version)
+
+    async def actualizar(
+        self,
+        sesion_id: str,
+        funcion: Callable[[ContextoConversacion], Optional[ContextoConversacion]],
+    ) -> ContextoConversacion:
+        """Equivalente asíncrono de ``GestorContexto.actualizar``."""
+
+        async def cargar() -> Tuple[Optional[int], ContextoConversacion]:
+            version = await self._leer_version(sesion_id)
+            return version, await self.obtener_contexto(sesion_id)
+
+        if self._cache.obtener(sesion_id, await self._leer_version(sesion_id)) is None:
+            cabecera = await self._leer_cabecera(sesion_id)
+            if cabecera.historial:
+                await self._migrar_formato_anterior(sesion_id, cabecera)
+        nueva_version, _, contexto, nuevos = await self._escribir_versionado(
+            sesion_id, *await cargar(), _preparar_actualizacion(funcion), cargar
+        )
+        self._cache.guardar(sesion_id, _copiar_contexto(contexto), nueva_version)
+
+        for mensaje in nuevos:
+            for observador in self._observadores:
+                observador(_copiar_contexto(contexto), mensaje)
+        return _copiar_contexto(contexto)
+
+    async def guardar_punto_control(
+        self, punto_control: PuntoControlEvaluacion
+    ) -> None:
+        """Persiste el estado de una evaluación incremental junto a la sesión."""
+
+        await self._almacenamiento.asetex(
+            _clave_punto_control(punto_control.sesion_id),
+            TTL_CONTEXTO,
+            _codificar_punto_control(punto_control),
+        )
+
+    async def obtener_punto_control(
+        self, sesion_id: str
+    ) -> Optional[PuntoControlEvaluacion]:
+        """Recupera el último punto de control de evaluación, si existe."""
+
+        datos = await self._almacenamiento.aget(_clave_punto_control(sesion_id))
+        return None if datos is None else _decodificar_punto_control(datos)
+
+    async def _leer_version(self, sesion_id: str) -> Optional[int]:
+        version = await self._almacenamiento.aget(_clave_version(sesion_id))
+        return None if version is None else int(version)
+
+    async def _leer_version_y_cabecera(
+        self, sesion_id: str
+    ) -> Tuple[Optional[int], ContextoConversacion]:
+        version = await self._leer_version(sesion_id)
+        return version, await self._leer_cabecera(sesion_id)
+
+    async def _escribir_versionado(
+        self,
+        sesion_id: str,
+        version: Optional[int],
+        base: ContextoConversacion,
+        preparar: PreparacionEscritura,
+        recargar: Callable[[], Awaitable[Tuple[Optional[int], ContextoConversacion]]],
+    ) -> Tuple[int, Optional[int], ContextoConversacion, List[MensajeConversacion]]:
+        for intento in range(self._reintentos.maximo + 1):
+            if intento:
+                await asyncio.sleep(self._reintentos.pausa(intento))
+                version, base = await recargar()
+            cabecera, nuevos = preparar(base)
+            nueva_version = await self._almacenamiento.acas(
+                *_argumentos_cas(self._codec, sesion_id, version, cabecera, nuevos)
+            )
+            if nueva_version is not None:
+                self._reintentos.registrar(intento)
+                return nueva_version, version, cabecera, nuevos
+        self._reintentos.registrar(intento, agotado=True)
+        raise ConflictoConcurrencia(
+            f"La sesión {sesion_id!r} cambió en {intento + 1} intentos seguidos"
+        )
+
+    async def _leer_cabecera(self, sesion_id: str) -> ContextoConversacion:
+        datos = await self._almacenamiento.aget(_clave(sesion_id))
+        return _decodificar_cabecera_existente(sesion_id, datos, self._codec)
+
+    async def _migrar_formato_anterior(
+        self, sesion_id: str, cabecera: ContextoConversacion
+    ) -> None:
+        clave_mensajes = _clave_mensajes(sesion_id)
+        historial, cabecera.historial = cabecera.historial, []
+        await (
+            self._almacenamiento.pipeline()
+            .delete(clave_mensajes)
+            .rpush(clave_mensajes, *map(self._codec.codificar_mensaje, historial))
+            .setex(
+                _clave(sesion_id),
+                TTL_CONTEXTO,
+                self._codec.codificar_cabecera(cabecera),
+            )
+            .ejecutar()
+        )
+
+
+class HistorialDiferido(Sequence[MensajeConversacion]):
+    """Vista de solo lectura de la lista ``mensajes:<id>`` que decodifica a demanda.
+
+    Índices y rebanadas se traducen a un único ``lrange`` sobre el rango
+    pedido, así que leer la cola no transfiere ni decodifica el principio de
+    la sesión. Los mensajes ya decodificados se recuerdan y la iteración
+    avanza por bloques de ``tamano_bloque``. La longitud se consulta una vez,
+    en el primer acceso: los mensajes agregados después no aparecen.
+    """
+
+    def __init__(self, almacenamiento, clave: str, tamano_bloque: int = 64) -> None:
+        if tamano_bloque <= 0:
+            raise ValueError("tamano_bloque debe ser positivo")
+        self._almacenamiento = almacenamiento
+        self._clave = clave
+        self._tamano_bloque = tamano_bloque
+        self._longitud: Optional[int] = None
+        self._decodificados: Dict[int, MensajeConversacion] = {}
+
+    def __len__(self) -> int:
+        if self._longitud is None:
+            self._longitud = self._almacenamiento.llen(self._clave)
+        return self._longitud
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            posiciones = range(*indice.indices(len(self)))
+            if not posiciones:
+                return []
+            inicio, fin = min(posiciones), max(posiciones) + 1
+            rango = self._rango(inicio, fin)
+            return [rango[posicion - inicio] for posicion in posiciones]
+        indice = operator.index(indice)
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice de historial fuera de rango")
+        return self._rango(indice, indice + 1)[0]
+
+    def __iter__(self):
+        for inicio in range(0, len(self), self._tamano_bloque):
+            yield from self._rango(inicio, min(inicio + self._tamano_bloque, len(self)))
+
+    def __repr__(self) -> str:
+        return f"HistorialDiferido({self._clave!r}, mensajes={len(self)})"
+
+    def _rango(self, inicio: int, fin: int) -> List[MensajeConversacion]:
+        faltantes = [i for i in range(inicio, fin) if i not in self._decodificados]
+        if faltantes:
+            primero, ultimo = faltantes[0], faltantes[-1]
+            codificados = self._almacenamiento.lrange(self._clave, primero, ultimo)
+            if len(codificados) != ultimo - primero + 1:
+                raise IndexError(
+                    f"La lista {self._clave!r} se acortó durante la lectura"
+                )
+            for posicion, codificado in enumerate(codificados, primero):
+                if posicion not in self._decodificados:
+                    self._decodificados[posicion] = decodificar_mensaje(codificado)
+        return [self._decodificados[i] for i in range(inicio, fin)]
+
+
+class _CacheContextos:
+    """LRU de contextos decodificados etiquetados con la versión almacenada."""
+
+    def __init__(self, capacidad: int) -> None:
+        self._capacidad = capacidad
+        self._entradas: "OrderedDict[str, Tuple[int, ContextoConversacion]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._estadisticas: Dict[str, int] = {
+            "aciertos": 0,
+            "fallos": 0,
+            "invalidaciones": 0,
+            "desalojos": 0,
+        }
+
+    def obtener(
+        self, sesion_id: str, version: Optional[int]
+    ) -> Optional[ContextoConversacion]:
+        if self._capacidad == 0:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(sesion_id)
+            if entrada is None:
+                self._estadisticas["fallos"] += 1
+                return None
+            if version is None or entrada[0] != version:
+                del self._entradas[sesion_id]
+                self._estadisticas["invalidaciones"] += 1
+                self._estadisticas["fallos"] += 1
+                return None
+            self._entradas.move_to_end(sesion_id)
+            self._estadisticas["aciertos"] += 1
+            return entrada[1]
+
+    def guardar(
+        self, sesion_id: str, contexto: ContextoConversacion, version: int
+    ) -> None:
+        if self._capacidad == 0:
+            return
+        with self._lock:
+            self._entradas[sesion_id] = (version, contexto)
+            self._entradas.move_to_end(sesion_id)
+            while len(self._entradas) > self._capacidad:
+                self._entradas.popitem(last=False)
+                self._estadisticas["desalojos"] += 1
+
+    def descartar(self, sesion_id: str) -> None:
+        with self._lock:
+            if self._entradas.pop(sesion_id, None) is not None:
+                self._estadisticas["invalidaciones"] += 1
+
+    def estadisticas(self) -> Dict[str, float]:
+        with self._lock:
+            datos: Dict[str, float] = dict(self._estadisticas)
+            datos["entradas"] = len(self._entradas)
+        consultas = datos["aciertos"] + datos["fallos"]
+        datos["tasa_aciertos"] = datos["aciertos"] / consultas if consultas else 0.0
+        return datos
 
 
 class AlmacenamientoEnMemoria:
-    """Implementación simple que emula las operaciones esenciales de Redis."""
+    """Implementación en memoria de las operaciones esenciales de Redis.
 
-    def __init__(self) -> None:
-        self._datos: Dict[str, Dict[str, str]] = {}
+    Los TTL de ``setex`` y ``expire`` se respetan: una clave vencida se elimina
+    al accederla y, con ``intervalo_barrido`` (en segundos), también desde un
+    hilo de barrido periódico; ``barrer`` puede invocarse manualmente. Con
+    ``max_entradas`` o ``max_bytes`` se desalojan las claves usadas hace más
+    tiempo hasta respetar el límite. Los bytes cuentan la clave y el contenido
+    codificado, no la sobrecarga de los objetos de Python. A diferencia de
+    Redis con ``allkeys-lru``, las claves de una misma sesión se desalojan
+    juntas.
+    """
+
+    def __init__(
+        self,
+        max_entradas: int | None = None,
+        max_bytes: int | None = None,
+        intervalo_barrido: float | None = None,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entradas is not None and max_entradas < 1:
+            raise ValueError("max_entradas debe ser al menos 1")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes debe ser al menos 1")
+        self._datos: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._vencimientos: List[Tuple[float, str]] = []
+        self._max_entradas = max_entradas
+        self._max_bytes = max_bytes
+        self._reloj = reloj
+        self._bytes = 0
+        self._desalojos = 0
+        self._expiraciones = 0
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        if intervalo_barrido is not None:
+            if intervalo_barrido <= 0:
+                raise ValueError("intervalo_barrido debe ser positivo")
+            threading.Thread(
+                target=_barrer_periodicamente,
+                args=(weakref.ref(self), self._detener, intervalo_barrido),
+                name="barrido-almacenamiento",
+                daemon=True,
+            ).start()
 
     def get(self, clave: str) -> Optional[str]:
-        elemento = self._datos.get(clave)
-        if elemento is None:
+        with self._lock:
+            entrada = self._vigente(clave)
+            if entrada is None:
+                return None
+            if isinstance(entrada.valor, list):
+                raise TypeError(f"La clave {clave!r} contiene una lista")
+            self._datos.move_to_end(clave)
+            return entrada.valor
+
+    def set(self, clave: str, valor: str) -> None:
+        """Guarda un valor sin vencimiento."""
+
+        with self._lock:
+            self._setex(clave, None, valor)
+            self._desalojar(clave)
+
+    def setex(self, clave: str, ttl: int, valor: str) -> None:
+        if ttl <= 0:
+            raise ValueError(f"TTL inválido para {clave!r}: {ttl}")
+        with self._lock:
+            self._setex(clave, ttl, valor)
+            self._desalojar(clave)
+
+    def rpush(self, clave: str, *valores: str) -> int:
+        with self._lock:
+            longitud = self._rpush(clave, valores)
+            self._desalojar(clave)
+            return longitud
+
+    def lrange(self, clave: str, inicio: int, fin: int) -> List[str]:
+        """Devuelve los elementos entre ``inicio`` y ``fin`` inclusive, como Redis."""
+
+        with self._lock:
+            lista = self._lista(clave)
+            longitud = len(lista)
+            if inicio < 0:
+                inicio = max(longitud + inicio, 0)
+            if fin < 0:
+                fin += longitud
+                if fin < 0:
+                    return []
+            return lista[inicio : fin + 1]
+
+    def llen(self, clave: str) -> int:
+        with self._lock:
+            return len(self._lista(clave))
+
+    def incr(self, clave: str) -> int:
+        """Incrementa un contador conservando su TTL, como ``INCR`` de Redis."""
+
+        with self._lock:
+            valor = self._incr(clave)
+            self._desalojar(clave)
+            return valor
+
+    def cas(
+        self,
+        clave_version: str,
+        esperada: Optional[int],
+        ttl: int,
+        valores: Optional[Dict[str, str]] = None,
+        listas: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> Optional[int]:
+        """Escribe solo si ``clave_version`` sigue valiendo ``esperada``.
+
+        Si la versión coincide (``None`` equivale a una clave inexistente),
+        reemplaza ``valores``, agrega los elementos de ``listas`` (una lista
+        vacía solo renueva su TTL), incrementa la versión y renueva el TTL de
+        todas esas claves, todo de forma atómica. Una versión inexistente
+        arranca en ``semilla_version`` en lugar de 1. Devuelve la versión
+        nueva, o ``None`` si otro escritor la cambió primero y no se escribió
+        nada.
+        """
+
+        if ttl <= 0:
+            raise ValueError(f"TTL inválido para {clave_version!r}: {ttl}")
+        with self._lock:
+            entrada = self._vigente(clave_version)
+            actual = None if entrada is None else int(entrada.valor)
+            if actual != esperada:
+                return None
+            for clave, valor in (valores or {}).items():
+                self._setex(clave, ttl, valor)
+            for clave, elementos in (listas or {}).items():
+                if elementos:
+                    self._rpush(clave, elementos)
+                lista = self._vigente(clave)
+                if lista is not None:
+                    self._vencer_en(clave, lista, ttl)
+            if entrada is None:
+                version = semilla_version()
+                self._setex(clave_version, ttl, str(version))
+            else:
+                version = self._incr(clave_version)
+                self._vencer_en(clave_version, entrada, ttl)
+            self._desalojar(clave_version, *(valores or ()), *(listas or ()))
+            return version
+
+    def delete(self, *claves: str) -> int:
+        with self._lock:
+            return sum(self._eliminar(clave) for clave in claves)
+
+    def expire(self, clave: str, ttl: int) -> bool:
+        """Fija el TTL de una clave existente; uno no positivo la elimina."""
+
+        with self._lock:
+            entrada = self._vigente(clave)
+            if entrada is None:
+                return False
+            if ttl <= 0:
+                self._eliminar(clave)
+            else:
+                self._vencer_en(clave, entrada, ttl)
+            return True
+
+    def ttl(self, clave: str) -> float:
+        """Segundos de vida restantes; -1 si no vence y -2 si no existe, como Redis."""
+
+        with self._lock:
+            entrada = self._vigente(clave)
+            if entrada is None:
+                return -2
+            if entrada.vence == math.inf:
+                return -1
+            return entrada.vence - self._reloj()
+
+    def items(self) -> Iterable:
+        """Pares ``(clave, {"valor", "timestamp"})`` de las claves vigentes."""
+
+        with self._lock:
+            self._barrer()
+            return [
+                (
+                    clave,
+                    {
+                        "valor": entrada.valor,
+                        "timestamp": datetime.fromtimestamp(
+                            entrada.modificada, UTC
+                        ).isoformat(),
+                    },
+                )
+                for clave, entrada in self._datos.items()
+            ]
+
+    def barrer(self) -> int:
+        """Elimina las claves vencidas y devuelve cuántas eran."""
+
+        with self._lock:
+            return self._barrer()
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Tamaño actual, desalojos por límite y claves vencidas eliminadas."""
+
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "bytes": self._bytes,
+                "desalojos": self._desalojos,
+                "expiraciones": self._expiraciones,
+            }
+
+    def cerrar(self) -> None:
+        """Detiene el hilo de barrido, si se inició uno."""
+
+        self._detener.set()
+
+    def _setex(self, clave: str, ttl: Optional[float], valor: str) -> None:
+        self._eliminar(clave)
+        entrada = _Entrada(valor, len(clave) + _tamano(valor))
+        self._datos[clave] = entrada
+        self._bytes += entrada.tamano
+        if ttl is not None:
+            self._vencer_en(clave, entrada, ttl)
+
+    def _rpush(self, clave: str, valores: Sequence[str]) -> int:
+        entrada = self._vigente(clave)
+        if entrada is None:
+            entrada = self._datos[clave] = _Entrada([], len(clave))
+            self._bytes += entrada.tamano
+        elif not isinstance(entrada.valor, list):
+            raise TypeError(f"La clave {clave!r} no contiene una lista")
+        else:
+            self._datos.move_to_end(clave)
+        agregado = sum(map(_tamano, valores))
+        entrada.valor.extend(valores)
+        entrada.tamano += agregado
+        entrada.modificada = time.time()
+        self._bytes += agregado
+        return len(entrada.valor)
+
+    def _incr(self, clave: str) -> int:
+        entrada = self._vigente(clave)
+        valor = int(entrada.valor) + 1 if entrada is not None else 1
+        texto = str(valor)
+        if entrada is None:
+            entrada = self._datos[clave] = _Entrada(texto, len(clave))
+            self._bytes += entrada.tamano
+        else:
+            self._datos.move_to_end(clave)
+            self._bytes -= _tamano(entrada.valor)
+            entrada.valor = texto
+            entrada.modificada = time.time()
+        entrada.tamano = len(clave) + len(texto)
+        self._bytes += len(texto)
+        return valor
+
+    def _vigente(self, clave: str) -> Optional["_Entrada"]:
+        entrada = self._datos.get(clave)
+        if entrada is not None and entrada.vence <= self._reloj():
+            self._eliminar(clave)
+            self._expiraciones += 1
             return None
-        return elemento["valor"]
+        return entrada
 
-    def setex(self, clave: str, _ttl: int, valor: str) -> None:  # noqa: D401
-        self._datos[clave] = {
-            "valor": valor,
-            "timestamp": datetime.now(UTC).isoformat(),
-        }
+    def _lista(self, clave: str) -> List[str]:
+        entrada = self._vigente(clave)
+        if entrada is None:
+            return []
+        if not isinstance(entrada.valor, list):
+            raise TypeError(f"La clave {clave!r} no contiene una lista")
+        self._datos.move_to_end(clave)
+        return entrada.valor
+
+    def _eliminar(self, clave: str) -> bool:
+        entrada = self._datos.pop(clave, None)
+        if entrada is None:
+            return False
+        self._bytes -= entrada.tamano
+        return True
+
+    def _vencer_en(self, clave: str, entrada: "_Entrada", ttl: float) -> None:
+        entrada.vence = self._reloj() + ttl
+        heapq.heappush(self._vencimientos, (entrada.vence, clave))
+        # ``expire`` se llama en cada escritura: los vencimientos reemplazados
+        # quedan obsoletos en el heap y se compactan cuando predominan.
+        if len(self._vencimientos) > 2 * len(self._datos) + 64:
+            self._vencimientos = [
+                (entrada.vence, clave)
+                for clave, entrada in self._datos.items()
+                if entrada.vence != math.inf
+            ]
+            heapq.heapify(self._vencimientos)
+
+    def _barrer(self) -> int:
+        ahora = self._reloj()
+        eliminadas = 0
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            vence, clave = heapq.heappop(self._vencimientos)
+            entrada = self._datos.get(clave)
+            if entrada is not None and entrada.vence == vence:
+                self._eliminar(clave)
+                eliminadas += 1
+        self._expiraciones += eliminadas
+        return eliminadas
+
+    def _desalojar(self, *protegidas: str) -> None:
+        """Aplica los límites desalojando por LRU; nunca las claves recién escritas.
+
+        La cabecera, los mensajes y la versión de una sesión se desalojan
+        juntos: sin ``version:<id>`` el contador volvería a empezar mientras
+        los datos siguen presentes.
+        """
+
+        revisadas = 0
+        while revisadas < len(self._datos) and (
+            (self._max_entradas is not None and len(self._datos) > self._max_entradas)
+            or (self._max_bytes is not None and self._bytes > self._max_bytes)
+        ):
+            clave = next(iter(self._datos))
+            grupo = _claves_de_sesion(clave)
+            if any(miembro in protegidas for miembro in grupo):
+                self._datos.move_to_end(clave)
+                revisadas += 1
+                continue
+            for miembro in grupo:
+                self._desalojos += self._eliminar(miembro)
+
+
+class AlmacenamientoParticionado:
+    """Reparte las claves entre varios ``AlmacenamientoEnMemoria`` independientes.
+
+    Todas las claves de una sesión (``contexto:<id>``, ``mensajes:<id>``...)
+    caen en la misma partición, que elige el hash del identificador de sesión.
+    Cada partición tiene su propio lock, así que las operaciones de sesiones
+    distintas no compiten entre sí. ``bloqueo`` devuelve además un lock
+    reentrante por franja de sesiones con el que ``GestorContexto`` linealiza
+    las escrituras de una misma sesión. ``max_entradas`` y ``max_bytes`` se
+    reparten en partes iguales entre las particiones.
+    """
+
+    def __init__(
+        self,
+        particiones: int = 16,
+        max_entradas: int | None = None,
+        max_bytes: int | None = None,
+        intervalo_barrido: float | None = None,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if particiones < 1:
+            raise ValueError("particiones debe ser al menos 1")
+        self._particiones = [
+            AlmacenamientoEnMemoria(
+                max_entradas=_repartir(max_entradas, particiones),
+                max_bytes=_repartir(max_bytes, particiones),
+                reloj=reloj,
+            )
+            for _ in range(particiones)
+        ]
+        self._bloqueos = [threading.RLock() for _ in range(particiones)]
+        self._detener = threading.Event()
+        if intervalo_barrido is not None:
+            if intervalo_barrido <= 0:
+                raise ValueError("intervalo_barrido debe ser positivo")
+            threading.Thread(
+                target=_barrer_periodicamente,
+                args=(weakref.ref(self), self._detener, intervalo_barrido),
+                name="barrido-almacenamiento",
+                daemon=True,
+            ).start()
+
+    def bloqueo(self, sesion_id: str) -> threading.RLock:
+        """Lock de la franja a la que pertenece la sesión."""
+
+        return self._bloqueos[hash(sesion_id) % len(self._bloqueos)]
+
+    def get(self, clave: str) -> Optional[str]:
+        return self._particion(clave).get(clave)
+
+    def set(self, clave: str, valor: str) -> None:
+        self._particion(clave).set(clave, valor)
+
+    def setex(self, clave: str, ttl: int, valor: str) -> None:
+        self._particion(clave).setex(clave, ttl, valor)
+
+    def rpush(self, clave: str, *valores: str) -> int:
+        return self._particion(clave).rpush(clave, *valores)
+
+    def lrange(self, clave: str, inicio: int, fin: int) -> List[str]:
+        return self._particion(clave).lrange(clave, inicio, fin)
+
+    def llen(self, clave: str) -> int:
+        return self._particion(clave).llen(clave)
+
+    def incr(self, clave: str) -> int:
+        return self._particion(clave).incr(clave)
+
+    def delete(self, *claves: str) -> int:
+        return sum(self._particion(clave).delete(clave) for clave in claves)
+
+    def cas(
+        self,
+        clave_version: str,
+        esperada: Optional[int],
+        ttl: int,
+        valores: Optional[Dict[str, str]] = None,
+        listas: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> Optional[int]:
+        """``AlmacenamientoEnMemoria.cas`` sobre claves de una misma partición."""
+
+        particion = self._particion(clave_version)
+        for clave in (*(valores or ()), *(listas or ())):
+            if self._particion(clave) is not particion:
+                raise ValueError(f"La clave {clave!r} pertenece a otra sesión")
+        return particion.cas(clave_version, esperada, ttl, valores, listas)
+
+    def expire(self, clave: str, ttl: int) -> bool:
+        return self._particion(clave).expire(clave, ttl)
+
+    def ttl(self, clave: str) -> float:
+        return self._particion(clave).ttl(clave)
 
     def items(self) -> Iterable:
-        return self._datos.items()
+        return [
+            item for particion in self._particiones for item in particion.items()
+        ]
+
+    def barrer(self) -> int:
+        return sum(particion.barrer() for particion in self._particiones)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Suma de las estadísticas de todas las particiones."""
+
+        totales: Dict[str, int] = {}
+        for particion in self._particiones:
+            for nombre, valor in particion.estadisticas().items():
+                totales[nombre] = totales.get(nombre, 0) + valor
+        return totales
+
+    def cerrar(self) -> None:
+        """Detiene el hilo de barrido, si se inició uno."""
+
+        self._detener.set()
+
+    def _particion(self, clave: str) -> AlmacenamientoEnMemoria:
+        sesion_id = clave.partition(":")[2] or clave
+        return self._particiones[hash(sesion_id) % len(self._particiones)]
+
+
+class _BloqueosPorSesion:
+    """Locks reentrantes por franja para almacenamientos que no ofrecen ``bloqueo``."""
+
+    def __init__(self, franjas: int = 64) -> None:
+        self._bloqueos = [threading.RLock() for _ in range(franjas)]
+
+    def __call__(self, sesion_id: str) -> threading.RLock:
+        return self._bloqueos[hash(sesion_id) % len(self._bloqueos)]
+
+
+class _Entrada:
+    __slots__ = ("valor", "tamano", "vence", "modificada")
+
+    def __init__(self, valor, tamano: int) -> None:
+        self.valor = valor
+        self.tamano = tamano
+        self.vence = math.inf
+        self.modificada = time.time()
+
 
+def _tamano(valor) -> int:
+    if isinstance(valor, str):
+        return len(valor) if valor.isascii() else len(valor.encode("utf-8"))
+    return len(valor)
 
-def _serializar_valor(valor):  # noqa: D401
-    if isinstance(valor, datetime):
-        return valor.isoformat()
-    if isinstance(valor, Enum):
-        return valor.value
-    raise TypeError(f"Tipo no serializable: {type(valor)!r}")
 
+def _repartir(limite: int | None, partes: int) -> int | None:
+    return None if limite is None else max(1, -(-limite // partes))
 
-def _contexto_desde_dict(payload: Dict) -> ContextoConversacion:
-    configuracion = payload["configuracion"]
-    escenario = configuracion["escenario"]
-    from .models import (
-        CanalComunicacion,
-        ConfiguracionSimulacion,
-        EscenarioObra,
-        PersonalidadCliente,
+
+def _barrer_periodicamente(
+    referencia: "weakref.ref",
+    detener: threading.Event,
+    intervalo: float,
+) -> None:
+    # Solo una referencia débil: el hilo no impide liberar el almacenamiento.
+    while not detener.wait(intervalo):
+        almacenamiento = referencia()
+        if almacenamiento is None:
+            return
+        almacenamiento.barrer()
+        del almacenamiento
+
+
+def _preparar_datos_clave(mensaje: MensajeConversacion) -> PreparacionEscritura:
+    """Agrega ``mensaje`` y fusiona sus datos clave con los de la cabecera."""
+
+    def preparar(
+        base: ContextoConversacion,
+    ) -> Tuple[ContextoConversacion, List[MensajeConversacion]]:
+        datos_clave = dict(base.datos_clave_mencionados)
+        GestorContexto._extraer_datos_clave(datos_clave, mensaje.contenido)
+        return replace(base, datos_clave_mencionados=datos_clave), [mensaje]
+
+    return preparar
+
+
+def _preparar_actualizacion(
+    funcion: Callable[[ContextoConversacion], Optional[ContextoConversacion]],
+) -> PreparacionEscritura:
+    def preparar(
+        base: ContextoConversacion,
+    ) -> Tuple[ContextoConversacion, List[MensajeConversacion]]:
+        previos = len(base.historial)
+        resultado = funcion(base)
+        contexto = base if resultado is None else resultado
+        if contexto.sesion_id != base.sesion_id:
+            raise ValueError("actualizar no puede cambiar el sesion_id")
+        if len(contexto.historial) < previos:
+            raise ValueError("actualizar solo admite agregar mensajes al historial")
+        return contexto, contexto.historial[previos:]
+
+    return preparar
+
+
+def _argumentos_cas(
+    codec: CodecContexto,
+    sesion_id: str,
+    version: Optional[int],
+    cabecera: ContextoConversacion,
+    nuevos: List[MensajeConversacion],
+) -> Tuple:
+    # La lista va aunque no haya mensajes nuevos para que su TTL se renueve
+    # junto con el de la cabecera y la versión.
+    codificados = [codec.codificar_mensaje(mensaje) for mensaje in nuevos]
+    return (
+        _clave_version(sesion_id),
+        version,
+        TTL_CONTEXTO,
+        {_clave(sesion_id): codec.codificar_cabecera(cabecera)},
+        {_clave_mensajes(sesion_id): codificados},
     )
 
-    contexto = ContextoConversacion(
-        sesion_id=payload["sesion_id"],
-        configuracion=ConfiguracionSimulacion(
-            personalidad=PersonalidadCliente(configuracion["personalidad"]),
-            canal=CanalComunicacion(configuracion["canal"]),
-            escenario=EscenarioObra(**escenario),
-            duracion_maxima=configuracion.get("duracion_maxima", 20),
-            nivel_dificultad=configuracion.get("nivel_dificultad", 0.7),
-            timestamp_inicio=datetime.fromisoformat(configuracion["timestamp_inicio"]),
-        ),
-        historial=[
-            MensajeConversacion(
-                turno=entrada["turno"],
-                rol=entrada["rol"],
-                contenido=entrada["contenido"],
-                timestamp=datetime.fromisoformat(entrada["timestamp"]),
-                metadatos=entrada.get("metadatos", {}),
-            )
-            for entrada in payload.get("historial", [])
-        ],
-        estado_actual=payload["estado_actual"],
-        datos_clave_mencionados=payload.get("datos_clave_mencionados", {}),
-        emociones_cliente=payload.get("emociones_cliente", []),
+
+class _ControlReintentos:
+    """Límite, espera con *jitter* y contadores de las escrituras con ``cas``."""
+
+    def __init__(self, maximo: int) -> None:
+        if maximo < 0:
+            raise ValueError("max_reintentos no puede ser negativo")
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._estadisticas: Dict[str, int] = {
+            "escrituras": 0,
+            "conflictos": 0,
+            "agotadas": 0,
+        }
+
+    @staticmethod
+    def pausa(intento: int) -> float:
+        return random.uniform(0, min(0.05, 0.0005 * 2**intento))
+
+    def registrar(self, conflictos: int, agotado: bool = False) -> None:
+        with self._lock:
+            self._estadisticas["conflictos"] += conflictos + int(agotado)
+            if agotado:
+                self._estadisticas["agotadas"] += 1
+            else:
+                self._estadisticas["escrituras"] += 1
+
+    def estadisticas(self) -> Dict[str, float]:
+        with self._lock:
+            datos: Dict[str, float] = dict(self._estadisticas)
+        intentos = datos["escrituras"] + datos["conflictos"]
+        datos["tasa_reintentos"] = datos["conflictos"] / intentos if intentos else 0.0
+        return datos
+
+
+def _clave(sesion_id: str) -> str:
+    return f"contexto:{sesion_id}"
+
+
+def _clave_mensajes(sesion_id: str) -> str:
+    return f"mensajes:{sesion_id}"
+
+
+def _clave_version(sesion_id: str) -> str:
+    return f"version:{sesion_id}"
+
+
+def _clave_punto_control(sesion_id: str) -> str:
+    return f"evaluacion:{sesion_id}"
+
+
+def _claves_de_sesion(clave: str) -> Tuple[str, ...]:
+    """Cabecera, mensajes y versión de la sesión de ``clave``, o solo ``clave``."""
+
+    prefijo, _, sesion_id = clave.partition(":")
+    if prefijo not in ("contexto", "mensajes", "version"):
+        return (clave,)
+    return _clave(sesion_id), _clave_mensajes(sesion_id), _clave_version(sesion_id)
+
+
+def _copiar_contexto(contexto: ContextoConversacion) -> ContextoConversacion:
+    """Copia las colecciones mutables del contexto; los mensajes se comparten."""
+
+    return replace(
+        contexto,
+        historial=list(contexto.historial),
+        datos_clave_mencionados=dict(contexto.datos_clave_mencionados),
+        emociones_cliente=list(contexto.emociones_cliente),
     )
-    return contexto
+
+
+def _metadatos(contexto: ContextoConversacion, total_mensajes: int) -> MetadatosSesion:
+    return MetadatosSesion(
+        sesion_id=contexto.sesion_id,
+        configuracion=contexto.configuracion,
+        estado_actual=contexto.estado_actual,
+        total_mensajes=total_mensajes,
+        datos_clave_mencionados=dict(contexto.datos_clave_mencionados),
+        emociones_cliente=list(contexto.emociones_cliente),
+    )
+
+
+def _decodificar_cabecera_existente(
+    sesion_id: str, datos, codec: CodecContexto
+) -> ContextoConversacion:
+    if datos is None:
+        raise KeyError(f"No existe contexto para la sesión {sesion_id!r}")
+    return codec.decodificar_cabecera(datos)
+
+
+def _formatear_para_llm(mensajes: Iterable[MensajeConversacion]) -> str:
+    lineas: List[str] = ["# HISTORIAL DE CONVERSACIÓN:"]
+    for mensaje in mensajes:
+        rol = "TÚ (Cliente)" if mensaje.rol == "cliente" else "AGENTE"
+        lineas.append(f"[Turno {mensaje.turno}] {rol}:\n{mensaje.contenido}\n")
+    return "\n".join(lineas)
+
+
+def _codificar_punto_control(punto_control: PuntoControlEvaluacion) -> str:
+    return json.dumps(a_dict(punto_control))
+
+
+def _decodificar_punto_control(datos) -> PuntoControlEvaluacion:
+    if isinstance(datos, bytes):
+        datos = datos.decode("utf-8")
+    return desde_dict(PuntoControlEvaluacion, json.loads(datos))
@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import asyncio
+import re
 from datetime import UTC, datetime
-from typing import Iterable
+from typing import AsyncIterator, Iterable
 
+from .cache import CacheVeredictos
 from .commands import construir_sistema_comandos
 from .context import AlmacenamientoEnMemoria, GestorContexto
 from .evaluation import LLMClient
@@ -30,6 +32,28 @@ class LLMDePrueba(LLMClient):
         )
 
 
+class LLMDePruebaStreaming(LLMDePrueba):
+    """Variante de ``LLMDePrueba`` que emite la respuesta token a token."""
+
+    def __init__(self, retardo_token: float = 0.0) -> None:
+        self.retardo_token = retardo_token
+        self.tokens_emitidos = 0
+
+    async def generate_stream(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> AsyncIterator[str]:
+        """Emite la respuesta determinista en palabras, con pausa configurable."""
+
+        respuesta = await self.generate(
+            prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        for token in re.findall(r"\S+\s*|\s+", respuesta):
+            if self.retardo_token:
+                await asyncio.sleep(self.retardo_token)
+            self.tokens_emitidos += 1
+            yield token
+
+
 async def _generar_historial_demo(gestor: GestorContexto, sesion_id: str) -> None:
     """Carga un intercambio básico entre cliente y agente para la demo."""
 
@@ -73,15 +97,19 @@ async def _generar_historial_demo(gestor: GestorContexto, sesion_id: str) -> Non
         gestor.agregar_mensaje(sesion_id, mensaje)
 
 
-async def _ejecutar_demo_asincrona() -> str:
+async def _ejecutar_demo_asincrona(
+    cache: CacheVeredictos | None = None,
+    almacenamiento=None,
+    sesion_id: str = "demo-local",
+) -> str:
     """Orquesta la simulación de ejemplo completa y devuelve el informe final."""
 
-    almacenamiento = AlmacenamientoEnMemoria()
+    if almacenamiento is None:
+        almacenamiento = AlmacenamientoEnMemoria()
     gestor = GestorContexto(almacenamiento)
     llm = LLMDePrueba()
-    sistema = construir_sistema_comandos(gestor, llm)
+    sistema = construir_sistema_comandos(gestor, llm, cache)
 
-    sesion_id = "demo-local"
     inicio = await sistema.procesar("comenzar test", sesion_id)
     await _generar_historial_demo(gestor, sesion_id)
     informe = await sistema.procesar("/finalizar", sesion_id)
@@ -89,10 +117,20 @@ async def _ejecutar_demo_asincrona() -> str:
     return f"{inicio}\n\n{informe}"
 
 
-def ejecutar_demo() -> str:
-    """Ejecuta la demo en un nuevo bucle de eventos y devuelve el resultado."""
+def ejecutar_demo(
+    cache: CacheVeredictos | None = None,
+    almacenamiento=None,
+    sesion_id: str = "demo-local",
+) -> str:
+    """Ejecuta la demo en un nuevo bucle de eventos y devuelve el resultado.
+
+    Si se comparte una ``cache`` entre ejecuciones, las siguientes demos se
+    evalúan sin invocar al LLM porque la conversación es idéntica. Por defecto
+    cada demo usa un almacenamiento propio; al compartir ``almacenamiento``
+    entre demos concurrentes, cada una necesita su propio ``sesion_id``.
+    """
 
-    return asyncio.run(_ejecutar_demo_asincrona())
+    return asyncio.run(_ejecutar_demo_asincrona(cache, almacenamiento, sesion_id))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+"""Pre-evaluación especulativa en segundo plano para acelerar ``/finalizar``."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional
+
+from .evaluation import AnalizadorConversacion
+from .models import (
+    ContextoConversacion,
+    MensajeConversacion,
+    PuntoControlEvaluacion,
+    ResultadoEvaluacion,
+)
+
+
+@dataclass
+class _EstadoSesion:
+    """Trabajo especulativo en curso y último resultado completado de una sesión."""
+
+    tarea: Optional[asyncio.Task] = None
+    turnos_tarea: int = 0
+    resultado: Optional[ResultadoEvaluacion] = None
+    punto_control: Optional[PuntoControlEvaluacion] = None
+    ultimo_uso: float = 0.0
+
+
+class EvaluadorEspeculativo:
+    """Evalúa la conversación tras cada turno del agente sin bloquear al usuario.
+
+    Los trabajos esperan ``retardo`` segundos antes de llamar al LLM, de modo que
+    ceden el bucle de eventos al trabajo interactivo y se cancelan sin coste si
+    llega un turno nuevo mientras tanto. Cada trabajo parte del último punto de
+    control completado, así que solo evalúa los turnos pendientes.
+
+    El estado de las sesiones que nunca se finalizan no se acumula: se
+    conservan a lo sumo ``max_sesiones`` (las usadas más recientemente) y se
+    descartan las que llevan ``ttl`` segundos sin turnos nuevos, cancelando su
+    trabajo pendiente.
+    """
+
+    def __init__(
+        self,
+        analizador: AnalizadorConversacion,
+        retardo: float = 0.05,
+        max_sesiones: int = 256,
+        ttl: float = 1800.0,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        if retardo < 0:
+            raise ValueError("El retardo no puede ser negativo")
+        if max_sesiones < 1:
+            raise ValueError("max_sesiones debe ser al menos 1")
+        if ttl <= 0:
+            raise ValueError("El ttl debe ser positivo")
+        self._analizador = analizador
+        self._retardo = retardo
+        self._max_sesiones = max_sesiones
+        self._ttl = ttl
+        self._reloj = reloj
+        self._sesiones: "OrderedDict[str, _EstadoSesion]" = OrderedDict()
+        self._estadisticas: Dict[str, int] = {
+            "programadas": 0,
+            "canceladas": 0,
+            "fallidas": 0,
+            "aprovechadas": 0,
+            "complementadas": 0,
+            "sin_especulacion": 0,
+            "descartadas": 0,
+        }
+
+    def al_agregar_mensaje(
+        self, contexto: ContextoConversacion, mensaje: MensajeConversacion
+    ) -> None:
+        """Observador para ``GestorContexto``: programa trabajo en turnos del agente."""
+
+        if mensaje.rol == "agente":
+            self.programar(contexto)
+
+    def programar(self, contexto: ContextoConversacion) -> None:
+        """Cancela el trabajo obsoleto de la sesión y agenda uno nuevo."""
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        estado = self._sesiones.setdefault(contexto.sesion_id, _EstadoSesion())
+        self._sesiones.move_to_end(contexto.sesion_id)
+        estado.ultimo_uso = self._reloj()
+        self._depurar()
+        self._cancelar(estado)
+        instantanea = replace(contexto, historial=list(contexto.historial))
+        estado.turnos_tarea = len(instantanea.historial)
+        estado.tarea = asyncio.create_task(self._ejecutar(estado, instantanea))
+        self._estadisticas["programadas"] += 1
+
+    async def obtener_resultado(
+        self, contexto: ContextoConversacion
+    ) -> ResultadoEvaluacion:
+        """Devuelve la evaluación final reutilizando el trabajo especulativo.
+
+        Si el resultado especulativo cubre todo el historial se devuelve tal
+        cual; si cubre solo una parte se completa con los turnos restantes.
+        """
+
+        estado = self._sesiones.pop(contexto.sesion_id, None)
+        turnos = len(contexto.historial)
+        if estado is not None and estado.tarea is not None:
+            if estado.turnos_tarea == turnos and not estado.tarea.done():
+                await asyncio.wait({estado.tarea})
+            elif not estado.tarea.done():
+                self._cancelar(estado)
+
+        if estado is not None and estado.punto_control is not None:
+            if estado.punto_control.turnos_evaluados == turnos:
+                self._estadisticas["aprovechadas"] += 1
+                return estado.resultado
+            self._estadisticas["complementadas"] += 1
+            resultado, _ = await self._analizador.evaluar_incremental(
+                contexto, estado.punto_control
+            )
+            return resultado
+
+        self._estadisticas["sin_especulacion"] += 1
+        return await self._analizador.evaluar_conversacion(contexto)
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Contadores del modo especulativo y proporción de resultados útiles."""
+
+        datos: Dict[str, float] = dict(self._estadisticas)
+        datos["sesiones"] = len(self._sesiones)
+        finalizadas = (
+            self._estadisticas["aprovechadas"]
+            + self._estadisticas["complementadas"]
+            + self._estadisticas["sin_especulacion"]
+        )
+        datos["tasa_aprovechamiento"] = (
+            self._estadisticas["aprovechadas"] / finalizadas if finalizadas else 0.0
+        )
+        return datos
+
+    async def _ejecutar(
+        self, estado: _EstadoSesion, contexto: ContextoConversacion
+    ) -> None:
+        await asyncio.sleep(self._retardo)
+        try:
+            resultado, punto_control = await self._analizador.evaluar_incremental(
+                contexto, estado.punto_control
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # noqa: BLE001 - la especulación nunca debe romper el chat
+            self._estadisticas["fallidas"] += 1
+            return
+        estado.resultado = resultado
+        estado.punto_control = punto_control
+
+    def _depurar(self) -> None:
+        """Descarta las sesiones vencidas y las que exceden ``max_sesiones``."""
+
+        limite = self._reloj() - self._ttl
+        while self._sesiones:
+            sesion_id, estado = next(iter(self._sesiones.items()))
+            if len(self._sesiones) <= self._max_sesiones and estado.ultimo_uso > limite:
+                break
+            del self._sesiones[sesion_id]
+            self._cancelar(estado)
+            self._estadisticas["descartadas"] += 1
+
+    def _cancelar(self, estado: _EstadoSesion) -> None:
+        if estado.tarea is not None and not estado.tarea.done():
+            estado.tarea.cancel()
+            self._estadisticas["canceladas"] += 1
+
+
+__all__ = ["EvaluadorEspeculativo"]
@@ -2,17 +2,56 @@
 
 from __future__ import annotations
 
+import asyncio
+import copy
 import re
+import time
 from dataclasses import dataclass
 from datetime import UTC, datetime
-from typing import Dict, Iterable, List, Protocol, Tuple
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+from .cache import CacheVeredictos, clave_veredicto
+from .heuristicas import EvaluadorHeuristico
+from .instrumentacion import LIMITES_TAMANO, RegistroMetricas
+from .metricas import MotorMetricas
 from .models import (
     ContextoConversacion,
     CriterioEvaluacion,
     EvidenciaEvaluacion,
+    MensajeConversacion,
+    PuntoControlEvaluacion,
     ResultadoEvaluacion,
 )
+from .presupuesto import EnsambladorTranscripcion, estimar_tokens, renderizar_turno
+
+EstrategiaEvaluacion = Literal["por_criterio", "conjunta"]
+VeredictoCriterio = Tuple[int, str, List[EvidenciaEvaluacion]]
+
+TEMPERATURA_EVALUACION = 0.3
+MAX_TOKENS_CRITERIO = 800
+
+_PATRON_SECCION_CRITERIO = re.compile(r"^###\s*CRITERIO:\s*(\S+)\s*$", re.M)
+_PATRON_PUNTAJE = re.compile(r"PUNTAJE:\s*(\d)")
+_PATRON_EVIDENCIA = re.compile(
+    r"- Turno (\d+): \"(.+?)\" \(impacto=(positivo|negativo|neutral)\)"
+)
+
+
+class ErrorTransitorioLLM(RuntimeError):
+    """Fallo temporal del proveedor del LLM que puede reintentarse."""
 
 
 class LLMClient(Protocol):
@@ -24,6 +63,137 @@ class LLMClient(Protocol):
         """Genera una respuesta a partir de un prompt."""
 
 
+class LLMClientStreaming(LLMClient, Protocol):
+    """Cliente que además puede emitir la respuesta fragmento a fragmento.
+
+    ``generate_stream`` es opcional: el analizador lo usa cuando el cliente lo
+    implementa y recurre a ``generate`` en caso contrario.
+    """
+
+    def generate_stream(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> AsyncIterator[str]:
+        """Genera la respuesta como una secuencia asíncrona de fragmentos."""
+
+
+@dataclass
+class EventoParcial:
+    """Campo de la respuesta estructurada disponible antes de que termine."""
+
+    criterio: str
+    campo: Literal["puntaje", "justificacion", "evidencia"]
+    valor: Union[int, str, EvidenciaEvaluacion]
+
+
+class ParserIncremental:
+    """Extrae puntaje, justificación y evidencias mientras llegan los tokens.
+
+    Procesa la respuesta línea a línea y marca ``completo`` cuando, tras la
+    lista de evidencias, aparece una línea no vacía ajena al formato; a partir
+    de ese momento el resto de la generación puede descartarse. Las líneas
+    vacías dentro de la lista se ignoran, como en el parser completo.
+    """
+
+    def __init__(self, criterio: str) -> None:
+        self._criterio = criterio
+        self._pendiente = ""
+        self._puntaje: Optional[int] = None
+        self._lineas_justificacion: Optional[List[str]] = None
+        self._justificacion: Optional[str] = None
+        self._evidencias: List[EvidenciaEvaluacion] = []
+        self._en_evidencias = False
+        self.completo = False
+
+    def alimentar(self, fragmento: str) -> List[EventoParcial]:
+        """Incorpora un fragmento y devuelve los campos que quedaron completos."""
+
+        if self.completo:
+            return []
+        *lineas, self._pendiente = (self._pendiente + fragmento).split("\n")
+        eventos: List[EventoParcial] = []
+        for linea in lineas:
+            eventos.extend(self._procesar_linea(linea))
+            if self.completo:
+                break
+        else:
+            # Una línea a medio llegar que ya no puede ser evidencia cierra la
+            # lista sin esperar a su salto de línea.
+            texto = self._pendiente.lstrip()
+            if self._en_evidencias and texto and not texto.startswith("-"):
+                self.completo = self._puntaje is not None
+        return eventos
+
+    def finalizar(self) -> List[EventoParcial]:
+        """Procesa el texto pendiente una vez que terminó la generación."""
+
+        eventos: List[EventoParcial] = []
+        if not self.completo and self._pendiente:
+            eventos.extend(self._procesar_linea(self._pendiente))
+        self._pendiente = ""
+        eventos.extend(self._cerrar_justificacion())
+        return eventos
+
+    def resultado(self) -> VeredictoCriterio:
+        """Devuelve el veredicto con la misma validación que el parser completo."""
+
+        if self._puntaje is None:
+            raise ValueError(
+                f"No se encontró puntaje en la respuesta del criterio {self._criterio}"
+            )
+        if self._justificacion is None:
+            raise ValueError(
+                "No se encontró justificación en la respuesta del criterio "
+                f"{self._criterio}"
+            )
+        return self._puntaje, self._justificacion, list(self._evidencias)
+
+    def _procesar_linea(self, linea: str) -> List[EventoParcial]:
+        if self._en_evidencias:
+            coincidencia = _PATRON_EVIDENCIA.search(linea)
+            if coincidencia is not None:
+                evidencia = EvidenciaEvaluacion(
+                    criterio=self._criterio,
+                    turno=int(coincidencia.group(1)),
+                    extracto=coincidencia.group(2),
+                    impacto=coincidencia.group(3),
+                )
+                self._evidencias.append(evidencia)
+                return [EventoParcial(self._criterio, "evidencia", evidencia)]
+            texto = linea.strip()
+            if texto and not texto.startswith("-") and self._puntaje is not None:
+                self.completo = True
+            return []
+
+        eventos: List[EventoParcial] = []
+        if self._puntaje is None:
+            coincidencia = _PATRON_PUNTAJE.search(linea)
+            if coincidencia is not None:
+                self._puntaje = int(coincidencia.group(1))
+                eventos.append(
+                    EventoParcial(self._criterio, "puntaje", self._puntaje)
+                )
+
+        if self._lineas_justificacion is None:
+            indice = linea.find("JUSTIFICACION:")
+            if indice >= 0:
+                self._lineas_justificacion = [linea[indice + len("JUSTIFICACION:") :]]
+        elif linea.startswith("EVIDENCIAS:"):
+            eventos.extend(self._cerrar_justificacion())
+            self._en_evidencias = True
+        else:
+            self._lineas_justificacion.append(linea)
+        return eventos
+
+    def _cerrar_justificacion(self) -> List[EventoParcial]:
+        if self._lineas_justificacion is None or self._justificacion is not None:
+            return []
+        justificacion = "\n".join(self._lineas_justificacion).strip()
+        if not justificacion:
+            return []
+        self._justificacion = justificacion
+        return [EventoParcial(self._criterio, "justificacion", justificacion)]
+
+
 @dataclass
 class DefinicionCriterio:
     """Encapsula la configuración de un criterio de evaluación."""
@@ -33,6 +203,8 @@ class DefinicionCriterio:
     escala: Dict[int, str]
     indicadores_positivos: Iterable[str]
     indicadores_negativos: Iterable[str]
+    presupuesto_tokens: Optional[int] = None
+    marcadores: Iterable[str] = ()
 
 
 class RubricaEvaluacion:
@@ -62,6 +234,16 @@ class RubricaEvaluacion:
                     "No ofrece disculpas",
                     "Adopta un tono defensivo",
                 ],
+                marcadores=[
+                    "entiendo",
+                    "comprendo",
+                    "lamento",
+                    "disculp",
+                    "siento mucho",
+                    "perdón",
+                    "tiene razón",
+                    "es comprensible",
+                ],
             ),
             "claridad_y_comunicacion": DefinicionCriterio(
                 peso=0.15,
@@ -85,6 +267,18 @@ class RubricaEvaluacion:
                     "Falta de estructura",
                     "Bloques extensos sin separación",
                 ],
+                marcadores=[
+                    "¿entendí bien",
+                    "si entiendo bien",
+                    "para confirmar",
+                    "le confirmo",
+                    "¿es correcto",
+                    "¿correcto?",
+                    "¿le queda claro",
+                    "¿está de acuerdo",
+                    "en resumen",
+                    "resumiendo",
+                ],
             ),
             "resolucion_y_proactividad": DefinicionCriterio(
                 peso=0.20,
@@ -109,6 +303,20 @@ class RubricaEvaluacion:
                     "Sin compensación",
                     "Sin comprometer plazos",
                 ],
+                marcadores=[
+                    "voy a",
+                    "haré",
+                    "realizaré",
+                    "enviaré",
+                    "contactaré",
+                    "le propongo",
+                    "solución",
+                    "alternativa",
+                    "reprogram",
+                    "compensación",
+                    "reembolso",
+                    "queda agendado",
+                ],
             ),
         }
 
@@ -123,21 +331,120 @@ class AnalizadorConversacion:
     """Evalúa conversaciones completas para generar informes estructurados."""
 
     def __init__(
-        self, llm_client: LLMClient, rubrica: RubricaEvaluacion | None = None
+        self,
+        llm_client: LLMClient,
+        rubrica: RubricaEvaluacion | None = None,
+        *,
+        max_concurrencia: Optional[int] = None,
+        timeout_criterio: Optional[float] = None,
+        estrategia: EstrategiaEvaluacion = "por_criterio",
+        cache: CacheVeredictos | None = None,
+        al_recibir_parcial: Callable[[EventoParcial], None] | None = None,
+        heuristico: EvaluadorHeuristico | None = None,
+        umbral_confianza: float = 0.8,
+        metricas: RegistroMetricas | None = None,
     ) -> None:
+        if max_concurrencia is not None and max_concurrencia < 1:
+            raise ValueError("max_concurrencia debe ser un entero positivo")
+        if timeout_criterio is not None and timeout_criterio <= 0:
+            raise ValueError("timeout_criterio debe ser mayor que cero")
+        if not 0 <= umbral_confianza <= 1:
+            raise ValueError("umbral_confianza debe estar entre 0 y 1")
+        if estrategia not in ("por_criterio", "conjunta"):
+            raise ValueError(f"Estrategia de evaluación desconocida: {estrategia!r}")
         self._llm = llm_client
         self._rubrica = rubrica or RubricaEvaluacion()
+        self._max_concurrencia = max_concurrencia
+        self._timeout_criterio = timeout_criterio
+        self._estrategia = estrategia
+        self._cache = cache
+        self._al_recibir_parcial = al_recibir_parcial
+        self._heuristico = heuristico
+        self._umbral_confianza = umbral_confianza
+        self._metricas = metricas
+        self._motor_metricas = MotorMetricas(self._rubrica)
+
+    @property
+    def llm_client(self) -> LLMClient:
+        """Cliente LLM que utiliza el analizador."""
+
+        return self._llm
+
+    @property
+    def metricas(self) -> Optional[RegistroMetricas]:
+        """Registro donde se instrumenta cada criterio y llamada al LLM, si existe."""
+
+        return self._metricas
+
+    def con_cliente(self, llm_client: LLMClient) -> "AnalizadorConversacion":
+        """Devuelve una copia con la misma configuración y otro cliente LLM."""
+
+        copia = copy.copy(self)
+        copia._llm = llm_client
+        return copia
 
     async def evaluar_conversacion(
         self, contexto: ContextoConversacion
     ) -> ResultadoEvaluacion:
-        criterios_evaluados: List[CriterioEvaluacion] = []
-        for nombre in self._rubrica.nombres():
-            definicion = self._rubrica.obtener(nombre)
-            criterios_evaluados.append(
-                await self._evaluar_criterio(contexto, nombre, definicion)
+        criterios_evaluados = await self._evaluar_todos(
+            contexto, list(self._rubrica.nombres())
+        )
+        return self._construir_resultado(contexto, criterios_evaluados)
+
+    async def evaluar_incremental(
+        self,
+        contexto: ContextoConversacion,
+        punto_control: PuntoControlEvaluacion | None = None,
+    ) -> Tuple[ResultadoEvaluacion, PuntoControlEvaluacion]:
+        """Evalúa solo los turnos posteriores a ``punto_control``.
+
+        Cada criterio recibe su veredicto previo junto con los turnos nuevos y
+        el resultado se fusiona con el estado anterior. Sin punto de control
+        (o si el historial ya no lo contiene) se evalúa la conversación entera.
+        Las actualizaciones pasan por la heurística, la caché y la estrategia
+        configuradas, igual que ``evaluar_conversacion``. Devuelve el informe y
+        el nuevo punto de control para persistirlo.
+        """
+
+        if punto_control is not None and punto_control.sesion_id != contexto.sesion_id:
+            raise ValueError(
+                f"El punto de control es de la sesión {punto_control.sesion_id!r}, "
+                f"no de {contexto.sesion_id!r}"
             )
+        nombres = list(self._rubrica.nombres())
+        if (
+            punto_control is None
+            or punto_control.turnos_evaluados > len(contexto.historial)
+            or any(nombre not in punto_control.criterios for nombre in nombres)
+        ):
+            criterios_evaluados = await self._evaluar_todos(contexto, nombres)
+        else:
+            nuevos = contexto.historial[punto_control.turnos_evaluados :]
+            if nuevos:
+                criterios_evaluados = await self._actualizar_todos(
+                    contexto, nombres, punto_control.criterios, nuevos
+                )
+            else:
+                criterios_evaluados = [
+                    punto_control.criterios[nombre] for nombre in nombres
+                ]
 
+        nuevo_punto_control = PuntoControlEvaluacion(
+            sesion_id=contexto.sesion_id,
+            turnos_evaluados=len(contexto.historial),
+            criterios={criterio.nombre: criterio for criterio in criterios_evaluados},
+            timestamp=datetime.now(UTC),
+        )
+        return (
+            self._construir_resultado(contexto, criterios_evaluados),
+            nuevo_punto_control,
+        )
+
+    def _construir_resultado(
+        self,
+        contexto: ContextoConversacion,
+        criterios_evaluados: List[CriterioEvaluacion],
+    ) -> ResultadoEvaluacion:
         puntaje_global = sum(
             criterio.puntaje * criterio.peso * 20 for criterio in criterios_evaluados
         )
@@ -146,14 +453,7 @@ class AnalizadorConversacion:
         )
         recomendaciones = self._generar_recomendaciones(oportunidades)
 
-        metricas = {
-            "turnos_totales": len(contexto.historial),
-            "turnos_hasta_empatia": None,
-            "turnos_hasta_solucion": None,
-            "confirmaciones_entendimiento": 0,
-            "interrupciones": 0,
-            "tiempo_respuesta_promedio": 0.0,
-        }
+        metricas = self._motor_metricas.calcular(contexto)
 
         resumen = self._generar_resumen_ejecutivo(
             puntaje_global, fortalezas, oportunidades
@@ -174,33 +474,485 @@ class AnalizadorConversacion:
             resumen_ejecutivo=resumen,
         )
 
+    async def _evaluar_todos(
+        self, contexto: ContextoConversacion, nombres: Sequence[str]
+    ) -> List[CriterioEvaluacion]:
+        if self._estrategia == "conjunta":
+            return await self._evaluar_criterios_conjuntos(contexto, nombres)
+        return await self._evaluar_criterios(contexto, nombres)
+
+    async def _actualizar_todos(
+        self,
+        contexto: ContextoConversacion,
+        nombres: Sequence[str],
+        previos: Dict[str, CriterioEvaluacion],
+        nuevos: Sequence[MensajeConversacion],
+    ) -> List[CriterioEvaluacion]:
+        if self._estrategia == "conjunta":
+            return await self._actualizar_criterios_conjuntos(
+                contexto, nombres, previos, nuevos
+            )
+        return await self._en_paralelo(
+            nombres,
+            lambda nombre: self._actualizar_criterio(
+                contexto, nombre, previos[nombre], nuevos
+            ),
+        )
+
+    async def _evaluar_criterios(
+        self, contexto: ContextoConversacion, nombres: Sequence[str]
+    ) -> List[CriterioEvaluacion]:
+        """Evalúa los criterios en paralelo y los devuelve en el orden recibido.
+
+        Un error en cualquier criterio (incluido un timeout) cancela al resto de
+        las evaluaciones en curso antes de propagarse.
+        """
+
+        return await self._en_paralelo(
+            nombres,
+            lambda nombre: self._evaluar_criterio(
+                contexto, nombre, self._rubrica.obtener(nombre)
+            ),
+        )
+
+    async def _en_paralelo(
+        self,
+        nombres: Sequence[str],
+        evaluar_uno: Callable[[str], Awaitable[CriterioEvaluacion]],
+    ) -> List[CriterioEvaluacion]:
+        semaforo = asyncio.Semaphore(self._max_concurrencia or max(len(nombres), 1))
+
+        async def evaluar(nombre: str) -> CriterioEvaluacion:
+            async with semaforo:
+                return await self._con_timeout(evaluar_uno(nombre), nombre)
+
+        tareas = [asyncio.create_task(evaluar(nombre)) for nombre in nombres]
+        try:
+            return list(await asyncio.gather(*tareas))
+        except BaseException:
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            raise
+
+    async def _evaluar_criterios_conjuntos(
+        self, contexto: ContextoConversacion, nombres: Sequence[str]
+    ) -> List[CriterioEvaluacion]:
+        """Evalúa todos los criterios con una única llamada al LLM.
+
+        Los criterios cuya sección no pueda interpretarse se reevalúan con la
+        estrategia por criterio, de modo que el resultado siempre esté completo.
+        """
+
+        heuristicos: Dict[str, VeredictoCriterio] = {}
+        for nombre in nombres:
+            veredicto = self._veredicto_heuristico(contexto, nombre)
+            if veredicto is not None:
+                heuristicos[nombre] = veredicto
+
+        candidatos = [nombre for nombre in nombres if nombre not in heuristicos]
+        # La transcripción y el límite de tokens de la llamada conjunta se fijan
+        # antes de consultar la caché para que las claves reflejen la llamada real.
+        historial = self._renderizar_historial(
+            contexto, self._presupuesto_conjunto(candidatos)
+        )
+        max_tokens = MAX_TOKENS_CRITERIO * len(candidatos)
+        claves = {
+            nombre: self._clave_cache(nombre, historial, max_tokens)
+            for nombre in candidatos
+        }
+        veredictos: Dict[str, VeredictoCriterio] = {}
+        for nombre in candidatos:
+            veredicto = self._consultar_cache(claves[nombre], nombre)
+            if veredicto is not None:
+                veredictos[nombre] = veredicto
+
+        pendientes = [nombre for nombre in candidatos if nombre not in veredictos]
+        if pendientes:
+            prompt = self._construir_prompt_conjunto(
+                historial,
+                [(nombre, self._rubrica.obtener(nombre)) for nombre in pendientes],
+            )
+            inicio = time.perf_counter()
+            respuesta = await self._con_timeout(
+                self._llm.generate(
+                    prompt,
+                    temperature=TEMPERATURA_EVALUACION,
+                    max_tokens=max_tokens,
+                ),
+                "conjunto",
+            )
+            self._registrar_llamada("conjunto", prompt, respuesta, inicio)
+            nuevos = self._parsear_respuesta_conjunta(respuesta, pendientes)
+            for nombre in pendientes:
+                if nombre not in nuevos:
+                    self._contar("errores_parseo", nombre)
+            for nombre, veredicto in nuevos.items():
+                self._registrar_cache(claves[nombre], veredicto)
+            veredictos.update(nuevos)
+
+        faltantes = [
+            nombre
+            for nombre in nombres
+            if nombre not in veredictos and nombre not in heuristicos
+        ]
+        criterios = dict(
+            zip(faltantes, await self._evaluar_criterios(contexto, faltantes))
+        )
+        for nombre, veredicto in heuristicos.items():
+            criterios[nombre] = self._crear_criterio(
+                nombre, self._rubrica.obtener(nombre), veredicto, "heuristica"
+            )
+        for nombre, veredicto in veredictos.items():
+            criterios[nombre] = self._crear_criterio(
+                nombre, self._rubrica.obtener(nombre), veredicto
+            )
+        return [criterios[nombre] for nombre in nombres]
+
+    async def _con_timeout(self, corrutina, nombre: str):
+        if self._timeout_criterio is None:
+            return await corrutina
+        try:
+            return await asyncio.wait_for(corrutina, self._timeout_criterio)
+        except asyncio.TimeoutError as error:
+            raise TimeoutError(
+                f"El criterio {nombre} superó el límite de "
+                f"{self._timeout_criterio:g} segundos"
+            ) from error
+
     async def _evaluar_criterio(
         self,
         contexto: ContextoConversacion,
         nombre: str,
         definicion: DefinicionCriterio,
     ) -> CriterioEvaluacion:
-        prompt = self._construir_prompt(contexto, nombre, definicion)
-        respuesta = await self._llm.generate(prompt, temperature=0.3, max_tokens=800)
-        puntaje, justificacion, evidencias = self._parsear_respuesta(respuesta, nombre)
+        inicio = time.perf_counter()
+        veredicto = self._veredicto_heuristico(contexto, nombre)
+        if veredicto is not None:
+            self._registrar_criterio(nombre, "heuristica", inicio)
+            return self._crear_criterio(nombre, definicion, veredicto, "heuristica")
+
+        historial = self._renderizar_historial(contexto, definicion.presupuesto_tokens)
+        clave = self._clave_cache(nombre, historial, MAX_TOKENS_CRITERIO)
+        veredicto = self._consultar_cache(clave, nombre)
+        if veredicto is None:
+            prompt = self._construir_prompt(historial, nombre, definicion)
+            veredicto = await self._solicitar_veredicto(prompt, nombre)
+            self._registrar_cache(clave, veredicto)
+            self._registrar_criterio(nombre, "llm", inicio)
+        else:
+            self._registrar_criterio(nombre, "cache", inicio)
+        return self._crear_criterio(nombre, definicion, veredicto)
+
+    async def _solicitar_veredicto(self, prompt: str, nombre: str) -> VeredictoCriterio:
+        """Obtiene el veredicto de un criterio, en streaming si el cliente lo admite.
+
+        En streaming la generación se corta en cuanto el bloque estructurado está
+        completo y cada campo se notifica a ``al_recibir_parcial`` al llegar.
+        """
+
+        inicio = time.perf_counter()
+        generar_stream = getattr(self._llm, "generate_stream", None)
+        if generar_stream is None:
+            respuesta = await self._llm.generate(
+                prompt,
+                temperature=TEMPERATURA_EVALUACION,
+                max_tokens=MAX_TOKENS_CRITERIO,
+            )
+            self._registrar_llamada(nombre, prompt, respuesta, inicio)
+            try:
+                return self._parsear_respuesta(respuesta, nombre)
+            except ValueError:
+                self._contar("errores_parseo", nombre)
+                raise
+
+        parser = ParserIncremental(nombre)
+        recibidos: List[str] = []
+        flujo = generar_stream(
+            prompt,
+            temperature=TEMPERATURA_EVALUACION,
+            max_tokens=MAX_TOKENS_CRITERIO,
+        )
+        try:
+            async for fragmento in flujo:
+                recibidos.append(fragmento)
+                self._notificar_parciales(parser.alimentar(fragmento))
+                if parser.completo:
+                    break
+        finally:
+            cerrar = getattr(flujo, "aclose", None)
+            if cerrar is not None:
+                await cerrar()
+        self._registrar_llamada(nombre, prompt, "".join(recibidos), inicio)
+        self._notificar_parciales(parser.finalizar())
+        try:
+            return parser.resultado()
+        except ValueError:
+            self._contar("errores_parseo", nombre)
+            raise
+
+    def _notificar_parciales(self, eventos: List[EventoParcial]) -> None:
+        if self._al_recibir_parcial is None:
+            return
+        for evento in eventos:
+            self._al_recibir_parcial(evento)
+
+    async def _actualizar_criterios_conjuntos(
+        self,
+        contexto: ContextoConversacion,
+        nombres: Sequence[str],
+        previos: Dict[str, CriterioEvaluacion],
+        nuevos: Sequence[MensajeConversacion],
+    ) -> List[CriterioEvaluacion]:
+        """Actualiza todos los criterios con una única llamada al LLM.
+
+        Igual que en ``_evaluar_criterios_conjuntos``, las secciones que no se
+        puedan interpretar se actualizan criterio por criterio.
+        """
+
+        criterios: Dict[str, CriterioEvaluacion] = {}
+        for nombre in nombres:
+            veredicto = self._veredicto_heuristico(contexto, nombre)
+            if veredicto is not None:
+                criterios[nombre] = self._crear_criterio(
+                    nombre, self._rubrica.obtener(nombre), veredicto, "heuristica"
+                )
+
+        candidatos = [nombre for nombre in nombres if nombre not in criterios]
+        turnos = self._renderizar_turnos(nuevos, self._presupuesto_conjunto(candidatos))
+        max_tokens = MAX_TOKENS_CRITERIO * len(candidatos)
+        claves = {
+            nombre: self._clave_cache(
+                nombre, self._material_incremental(previos[nombre], turnos), max_tokens
+            )
+            for nombre in candidatos
+        }
+        veredictos: Dict[str, VeredictoCriterio] = {}
+        for nombre in candidatos:
+            veredicto = self._consultar_cache(claves[nombre], nombre)
+            if veredicto is not None:
+                veredictos[nombre] = veredicto
+
+        pendientes = [nombre for nombre in candidatos if nombre not in veredictos]
+        if pendientes:
+            prompt = self._construir_prompt_incremental_conjunto(
+                [
+                    (nombre, self._rubrica.obtener(nombre), previos[nombre])
+                    for nombre in pendientes
+                ],
+                turnos,
+            )
+            inicio = time.perf_counter()
+            respuesta = await self._con_timeout(
+                self._llm.generate(
+                    prompt,
+                    temperature=TEMPERATURA_EVALUACION,
+                    max_tokens=max_tokens,
+                ),
+                "conjunto",
+            )
+            self._registrar_llamada("conjunto", prompt, respuesta, inicio)
+            actualizados = self._parsear_respuesta_conjunta(respuesta, pendientes)
+            for nombre in pendientes:
+                if nombre not in actualizados:
+                    self._contar("errores_parseo", nombre)
+            for nombre, veredicto in actualizados.items():
+                self._registrar_cache(claves[nombre], veredicto)
+            veredictos.update(actualizados)
+
+        for nombre, veredicto in veredictos.items():
+            criterios[nombre] = self._fusionar(
+                nombre, self._rubrica.obtener(nombre), previos[nombre], veredicto
+            )
+        faltantes = [nombre for nombre in nombres if nombre not in criterios]
+        criterios.update(
+            zip(
+                faltantes,
+                await self._en_paralelo(
+                    faltantes,
+                    lambda nombre: self._actualizar_criterio(
+                        contexto, nombre, previos[nombre], nuevos
+                    ),
+                ),
+            )
+        )
+        return [criterios[nombre] for nombre in nombres]
+
+    async def _actualizar_criterio(
+        self,
+        contexto: ContextoConversacion,
+        nombre: str,
+        previo: CriterioEvaluacion,
+        nuevos: Sequence[MensajeConversacion],
+    ) -> CriterioEvaluacion:
+        inicio = time.perf_counter()
+        definicion = self._rubrica.obtener(nombre)
+        veredicto = self._veredicto_heuristico(contexto, nombre)
+        if veredicto is not None:
+            self._registrar_criterio(nombre, "heuristica", inicio)
+            return self._crear_criterio(nombre, definicion, veredicto, "heuristica")
+
+        turnos = self._renderizar_turnos(nuevos, definicion.presupuesto_tokens)
+        clave = self._clave_cache(
+            nombre, self._material_incremental(previo, turnos), MAX_TOKENS_CRITERIO
+        )
+        veredicto = self._consultar_cache(clave, nombre)
+        if veredicto is None:
+            prompt = self._construir_prompt_incremental(
+                nombre, definicion, previo, turnos
+            )
+            veredicto = await self._solicitar_veredicto(prompt, nombre)
+            self._registrar_cache(clave, veredicto)
+            self._registrar_criterio(nombre, "incremental", inicio)
+        else:
+            self._registrar_criterio(nombre, "cache", inicio)
+        return self._fusionar(nombre, definicion, previo, veredicto)
+
+    @classmethod
+    def _fusionar(
+        cls,
+        nombre: str,
+        definicion: DefinicionCriterio,
+        previo: CriterioEvaluacion,
+        veredicto: VeredictoCriterio,
+    ) -> CriterioEvaluacion:
+        """Conserva las evidencias previas y agrega las nuevas que no repiten."""
+
+        puntaje, justificacion, evidencias = veredicto
+        vistas = {
+            (evidencia.turno, evidencia.extracto) for evidencia in previo.evidencias
+        }
+        fusionadas = list(previo.evidencias) + [
+            evidencia
+            for evidencia in evidencias
+            if (evidencia.turno, evidencia.extracto) not in vistas
+        ]
+        return cls._crear_criterio(
+            nombre, definicion, (puntaje, justificacion, fusionadas)
+        )
+
+    def _registrar_criterio(self, nombre: str, origen: str, inicio: float) -> None:
+        if self._metricas is not None:
+            self._metricas.observar(
+                "criterio_segundos",
+                time.perf_counter() - inicio,
+                {"criterio": nombre, "origen": origen},
+            )
+
+    def _registrar_llamada(
+        self, nombre: str, prompt: str, respuesta: str, inicio: float
+    ) -> None:
+        """Registra latencia y tamaño de prompt y respuesta de una llamada al LLM."""
+
+        if self._metricas is None:
+            return
+        etiquetas = {"criterio": nombre}
+        self._metricas.observar(
+            "llm_llamada_segundos", time.perf_counter() - inicio, etiquetas
+        )
+        for nombre_metrica, valor in (
+            ("llm_prompt_caracteres", len(prompt)),
+            ("llm_prompt_tokens", estimar_tokens(prompt)),
+            ("llm_respuesta_caracteres", len(respuesta)),
+            ("llm_respuesta_tokens", estimar_tokens(respuesta)),
+        ):
+            self._metricas.observar(nombre_metrica, valor, etiquetas, LIMITES_TAMANO)
+        self._contar("llm_llamadas", nombre)
+
+    def _contar(self, metrica: str, nombre: str) -> None:
+        if self._metricas is not None:
+            self._metricas.incrementar(metrica, {"criterio": nombre})
+
+    def _clave_cache(
+        self, nombre: str, transcripcion: str, max_tokens: int
+    ) -> Optional[str]:
+        """Clave del veredicto para la transcripción y el límite de la llamada."""
+
+        if self._cache is None:
+            return None
+        return clave_veredicto(
+            nombre,
+            self._rubrica.obtener(nombre),
+            transcripcion,
+            TEMPERATURA_EVALUACION,
+            max_tokens,
+        )
+
+    def _consultar_cache(
+        self, clave: Optional[str], nombre: str
+    ) -> Optional[VeredictoCriterio]:
+        if self._cache is None or clave is None:
+            return None
+        veredicto = self._cache.obtener(clave)
+        self._contar(
+            "cache_aciertos" if veredicto is not None else "cache_fallos", nombre
+        )
+        return veredicto
+
+    def _registrar_cache(
+        self, clave: Optional[str], veredicto: VeredictoCriterio
+    ) -> None:
+        if self._cache is not None and clave is not None:
+            self._cache.guardar(clave, veredicto)
+
+    def _veredicto_heuristico(
+        self, contexto: ContextoConversacion, nombre: str
+    ) -> Optional[VeredictoCriterio]:
+        """Primer nivel de la cascada: solo responde si la heurística es confiable."""
+
+        if self._heuristico is None:
+            return None
+        estimacion = self._heuristico.evaluar(contexto, nombre)
+        if estimacion is None or estimacion.confianza < self._umbral_confianza:
+            return None
+        return estimacion.puntaje, estimacion.justificacion, estimacion.evidencias
+
+    @staticmethod
+    def _crear_criterio(
+        nombre: str,
+        definicion: DefinicionCriterio,
+        veredicto: VeredictoCriterio,
+        origen: Literal["llm", "heuristica"] = "llm",
+    ) -> CriterioEvaluacion:
+        puntaje, justificacion, evidencias = veredicto
         return CriterioEvaluacion(
             nombre=nombre,
             puntaje=puntaje,
             peso=definicion.peso,
             justificacion=justificacion,
             evidencias=evidencias,
+            origen=origen,
         )
 
-    @staticmethod
-    def _construir_prompt(
-        contexto: ContextoConversacion,
-        nombre: str,
-        definicion: DefinicionCriterio,
+    @classmethod
+    def _renderizar_historial(
+        cls, contexto: ContextoConversacion, presupuesto_tokens: Optional[int] = None
     ) -> str:
-        historial = "\n".join(
-            f"Turno {mensaje.turno} ({mensaje.rol}): {mensaje.contenido}"
-            for mensaje in contexto.historial
+        if presupuesto_tokens is None:
+            return "\n".join(
+                renderizar_turno(mensaje) for mensaje in contexto.historial
+            )
+        return EnsambladorTranscripcion(presupuesto_tokens).ensamblar(
+            contexto.historial, cls._turnos_relevantes(contexto)
         )
+
+    @staticmethod
+    def _turnos_relevantes(contexto: ContextoConversacion) -> List[int]:
+        """Turnos que mencionan datos del escenario y conviene priorizar."""
+
+        palabras = [
+            palabra.lower()
+            for palabra in contexto.configuracion.escenario.palabras_clave
+        ]
+        return [
+            mensaje.turno
+            for mensaje in contexto.historial
+            if "#" in mensaje.contenido
+            or any(palabra in mensaje.contenido.lower() for palabra in palabras)
+        ]
+
+    @staticmethod
+    def _describir_criterio(definicion: DefinicionCriterio) -> str:
         escala = "\n".join(
             f"{nivel}: {detalle}" for nivel, detalle in definicion.escala.items()
         )
@@ -211,11 +963,22 @@ class AnalizadorConversacion:
             f"- {texto}" for texto in definicion.indicadores_negativos
         )
         return (
-            f"Evalúa el criterio {nombre} para la siguiente conversación.\n\n"
             f"Descripción: {definicion.descripcion}\n"
             f"Escala:\n{escala}\n\n"
             f"Indicadores positivos:\n{indicadores_positivos}\n\n"
-            f"Indicadores negativos:\n{indicadores_negativos}\n\n"
+            f"Indicadores negativos:\n{indicadores_negativos}"
+        )
+
+    @classmethod
+    def _construir_prompt(
+        cls,
+        historial: str,
+        nombre: str,
+        definicion: DefinicionCriterio,
+    ) -> str:
+        return (
+            f"Evalúa el criterio {nombre} para la siguiente conversación.\n\n"
+            f"{cls._describir_criterio(definicion)}\n\n"
             f"Conversación completa:\n{historial}\n\n"
             "Responde en formato estructurado:\n"
             "PUNTAJE: <número>\n"
@@ -228,7 +991,7 @@ class AnalizadorConversacion:
     def _parsear_respuesta(
         respuesta: str, criterio: str
     ) -> Tuple[int, str, List[EvidenciaEvaluacion]]:
-        puntaje_match = re.search(r"PUNTAJE:\s*(\d)", respuesta)
+        puntaje_match = _PATRON_PUNTAJE.search(respuesta)
         if puntaje_match is None:
             raise ValueError(
                 f"No se encontró puntaje en la respuesta del criterio {criterio}"
@@ -245,10 +1008,7 @@ class AnalizadorConversacion:
         justificacion = justificacion_match.group(1).strip()
 
         evidencias: List[EvidenciaEvaluacion] = []
-        for coincidencia in re.finditer(
-            r"- Turno (\d+): \"(.+?)\" \(impacto=(positivo|negativo|neutral)\)",
-            respuesta,
-        ):
+        for coincidencia in _PATRON_EVIDENCIA.finditer(respuesta):
             evidencias.append(
                 EvidenciaEvaluacion(
                     criterio=criterio,
@@ -260,6 +1020,143 @@ class AnalizadorConversacion:
 
         return puntaje, justificacion, evidencias
 
+    @staticmethod
+    def _renderizar_turnos(
+        nuevos: Sequence[MensajeConversacion], presupuesto_tokens: Optional[int]
+    ) -> str:
+        if presupuesto_tokens is None:
+            return "\n".join(renderizar_turno(mensaje) for mensaje in nuevos)
+        return EnsambladorTranscripcion(presupuesto_tokens).ensamblar(nuevos)
+
+    @staticmethod
+    def _describir_previo(previo: CriterioEvaluacion) -> str:
+        evidencias_previas = "\n".join(
+            f'- Turno {evidencia.turno}: "{evidencia.extracto}" '
+            f"(impacto={evidencia.impacto})"
+            for evidencia in previo.evidencias
+        )
+        return (
+            f"PUNTAJE: {previo.puntaje}\n"
+            f"JUSTIFICACION: {previo.justificacion}\n"
+            f"EVIDENCIAS:\n{evidencias_previas or '- (sin evidencias)'}"
+        )
+
+    @classmethod
+    def _material_incremental(cls, previo: CriterioEvaluacion, turnos: str) -> str:
+        """Lo que determina una actualización, para la clave de la caché."""
+
+        return f"{cls._describir_previo(previo)}\n\n{turnos}"
+
+    @classmethod
+    def _construir_prompt_incremental(
+        cls,
+        nombre: str,
+        definicion: DefinicionCriterio,
+        previo: CriterioEvaluacion,
+        turnos_nuevos: str,
+    ) -> str:
+        return (
+            f"Actualiza la evaluación del criterio {nombre} con los nuevos turnos "
+            "de la conversación.\n\n"
+            f"{cls._describir_criterio(definicion)}\n\n"
+            f"Evaluación previa:\n{cls._describir_previo(previo)}\n\n"
+            f"Nuevos turnos:\n{turnos_nuevos}\n\n"
+            "Responde con la evaluación actualizada de toda la conversación en "
+            "formato estructurado, citando solo evidencias nuevas:\n"
+            "PUNTAJE: <número>\n"
+            "JUSTIFICACION: <texto>\n"
+            "EVIDENCIAS:\n"
+            '- Turno <número>: "cita literal" (impacto=<positivo|negativo|neutral>)'
+        )
+
+    @classmethod
+    def _construir_prompt_incremental_conjunto(
+        cls,
+        criterios: Sequence[Tuple[str, DefinicionCriterio, CriterioEvaluacion]],
+        turnos_nuevos: str,
+    ) -> str:
+        secciones = "\n\n".join(
+            f"## Criterio {nombre}\n{cls._describir_criterio(definicion)}\n\n"
+            f"Evaluación previa:\n{cls._describir_previo(previo)}"
+            for nombre, definicion, previo in criterios
+        )
+        return (
+            "Actualiza la evaluación de cada uno de los siguientes criterios con "
+            "los nuevos turnos de la conversación.\n\n"
+            f"{secciones}\n\n"
+            f"Nuevos turnos:\n{turnos_nuevos}\n\n"
+            "Responde con la evaluación actualizada de toda la conversación, con "
+            "una sección por criterio, en el mismo orden, citando solo evidencias "
+            "nuevas y con este formato estructurado:\n"
+            "### CRITERIO: <nombre>\n"
+            "PUNTAJE: <número>\n"
+            "JUSTIFICACION: <texto>\n"
+            "EVIDENCIAS:\n"
+            '- Turno <número>: "cita literal" (impacto=<positivo|negativo|neutral>)'
+        )
+
+    def _presupuesto_conjunto(self, nombres: Sequence[str]) -> Optional[int]:
+        """El presupuesto más estricto entre los criterios de la llamada conjunta."""
+
+        presupuestos = [
+            self._rubrica.obtener(nombre).presupuesto_tokens
+            for nombre in nombres
+            if self._rubrica.obtener(nombre).presupuesto_tokens is not None
+        ]
+        return min(presupuestos) if presupuestos else None
+
+    @classmethod
+    def _construir_prompt_conjunto(
+        cls,
+        historial: str,
+        criterios: Sequence[Tuple[str, DefinicionCriterio]],
+    ) -> str:
+        secciones = "\n\n".join(
+            f"## Criterio {nombre}\n{cls._describir_criterio(definicion)}"
+            for nombre, definicion in criterios
+        )
+        return (
+            "Evalúa cada uno de los siguientes criterios para la conversación.\n\n"
+            f"{secciones}\n\n"
+            f"Conversación completa:\n{historial}\n\n"
+            "Responde con una sección por criterio, en el mismo orden y con este "
+            "formato estructurado:\n"
+            "### CRITERIO: <nombre>\n"
+            "PUNTAJE: <número>\n"
+            "JUSTIFICACION: <texto>\n"
+            "EVIDENCIAS:\n"
+            '- Turno <número>: "cita literal" (impacto=<positivo|negativo|neutral>)'
+        )
+
+    @classmethod
+    def _parsear_respuesta_conjunta(
+        cls, respuesta: str, nombres: Iterable[str]
+    ) -> Dict[str, VeredictoCriterio]:
+        """Separa la respuesta conjunta en veredictos por criterio.
+
+        Omite las secciones ausentes, desconocidas o mal formadas para que el
+        llamador pueda reevaluarlas individualmente.
+        """
+
+        esperados = set(nombres)
+        encabezados = list(_PATRON_SECCION_CRITERIO.finditer(respuesta))
+        veredictos: Dict[str, VeredictoCriterio] = {}
+        for indice, encabezado in enumerate(encabezados):
+            nombre = encabezado.group(1)
+            if nombre not in esperados or nombre in veredictos:
+                continue
+            fin = (
+                encabezados[indice + 1].start()
+                if indice + 1 < len(encabezados)
+                else len(respuesta)
+            )
+            seccion = respuesta[encabezado.end() : fin].strip()
+            try:
+                veredictos[nombre] = cls._parsear_respuesta(seccion, nombre)
+            except ValueError:
+                continue
+        return veredictos
+
     @staticmethod
     def _extraer_fortalezas_oportunidades(
         criterios: Iterable[CriterioEvaluacion],
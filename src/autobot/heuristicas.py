@@ -0,0 +1,231 @@
+"""Puntuación heurística local usada como primer nivel de la cascada de evaluación."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from statistics import mean, pstdev
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .models import (
+    ContextoConversacion,
+    EvidenciaEvaluacion,
+    MensajeConversacion,
+    PersonalidadCliente,
+    ResultadoEvaluacion,
+)
+
+_PALABRAS_EMPATICAS = (
+    "entiendo",
+    "comprendo",
+    "lamento",
+    "disculpa",
+    "preocup",
+    "ayudar",
+    "tranquilo",
+    "seguro",
+    "confianza",
+    "importante",
+)
+_PALABRAS_ESTRUCTURA = ("primero", "segundo", "paso", "siguiente")
+_PALABRAS_COMPLEJAS = ("implementar", "ejecutar", "proceder", "gestionar")
+_PALABRAS_SOLUCION = (
+    "solución",
+    "resolver",
+    "ayudar",
+    "hacer",
+    "realizar",
+    "paso",
+    "proceso",
+    "opción",
+    "alternativa",
+)
+_ACCIONES_CONCRETAS = ("voy a", "haré", "realizaré", "enviaré")
+
+_PERSONALIDADES_ENOJADAS = (
+    PersonalidadCliente.ENOJADO_IMPACIENTE,
+    PersonalidadCliente.AGRESIVO_DEMANDANTE,
+)
+
+
+@dataclass
+class ResultadoHeuristico:
+    """Puntaje estimado localmente junto con la confianza en la estimación."""
+
+    puntaje: int
+    confianza: float
+    justificacion: str
+    evidencias: List[EvidenciaEvaluacion]
+
+
+def _puntuar_empatia(
+    mensaje: str, personalidad: PersonalidadCliente, _turno: int
+) -> float:
+    texto = mensaje.lower()
+    puntaje = 50 + 10 * sum(1 for palabra in _PALABRAS_EMPATICAS if palabra in texto)
+    if personalidad in _PERSONALIDADES_ENOJADAS:
+        if any(p in texto for p in ("lamento", "disculpa", "entiendo su frustración")):
+            puntaje += 20
+    elif personalidad == PersonalidadCliente.ANSIOSO_DETALLISTA:
+        if any(p in texto for p in ("tranquil", "no se preocupe", "seguro")):
+            puntaje += 20
+    return min(100, puntaje)
+
+
+def _puntuar_claridad(
+    mensaje: str, _personalidad: PersonalidadCliente, _turno: int
+) -> float:
+    texto = mensaje.lower()
+    puntaje = 70
+    longitud = len(mensaje.split())
+    if 10 <= longitud <= 50:
+        puntaje += 10
+    elif longitud < 5:
+        puntaje -= 20
+    if any(palabra in texto for palabra in _PALABRAS_ESTRUCTURA):
+        puntaje += 10
+    if sum(1 for palabra in _PALABRAS_COMPLEJAS if palabra in texto) > 2:
+        puntaje -= 10
+    return min(100, max(0, puntaje))
+
+
+def _puntuar_resolucion(
+    mensaje: str, _personalidad: PersonalidadCliente, turno: int
+) -> float:
+    texto = mensaje.lower()
+    puntaje = 60 + 8 * sum(1 for palabra in _PALABRAS_SOLUCION if palabra in texto)
+    if "?" in mensaje and turno <= 2:
+        puntaje += 10
+    if any(accion in texto for accion in _ACCIONES_CONCRETAS):
+        puntaje += 15
+    return min(100, puntaje)
+
+
+PuntuadorTurno = Callable[[str, PersonalidadCliente, int], float]
+
+PUNTUADORES: Dict[str, PuntuadorTurno] = {
+    "empatia_y_tono": _puntuar_empatia,
+    "claridad_y_comunicacion": _puntuar_claridad,
+    "resolucion_y_proactividad": _puntuar_resolucion,
+}
+
+
+class EvaluadorHeuristico:
+    """Puntúa criterios con las reglas de palabras clave del evaluador heredado.
+
+    Cada turno del agente recibe un puntaje de 0 a 100 que se promedia y se
+    convierte a la escala 1-5 de la rúbrica. La confianza crece con la cantidad
+    de turnos y con la consistencia entre ellos, y es mayor cuanto más extremo
+    es el promedio: los casos intermedios quedan para el LLM.
+    """
+
+    def __init__(
+        self,
+        puntuadores: Dict[str, PuntuadorTurno] | None = None,
+        turnos_para_confianza: int = 3,
+    ) -> None:
+        self._puntuadores = dict(PUNTUADORES if puntuadores is None else puntuadores)
+        self._turnos_para_confianza = turnos_para_confianza
+
+    def evaluar(
+        self, contexto: ContextoConversacion, criterio: str
+    ) -> Optional[ResultadoHeuristico]:
+        """Devuelve la estimación del criterio o ``None`` si no hay heurística."""
+
+        puntuador = self._puntuadores.get(criterio)
+        if puntuador is None:
+            return None
+        turnos_agente: List[MensajeConversacion] = [
+            mensaje for mensaje in contexto.historial if mensaje.rol == "agente"
+        ]
+        if not turnos_agente:
+            return ResultadoHeuristico(1, 0.0, "Sin turnos del agente.", [])
+
+        personalidad = contexto.configuracion.personalidad
+        puntajes = [
+            puntuador(mensaje.contenido, personalidad, posicion)
+            for posicion, mensaje in enumerate(turnos_agente, start=1)
+        ]
+        promedio = mean(puntajes)
+        cobertura = min(1.0, len(puntajes) / self._turnos_para_confianza)
+        consistencia = max(0.0, 1 - pstdev(puntajes) / 25)
+        extremo = min(1.0, abs(promedio - 62.5) / 37.5)
+        confianza = round(cobertura * consistencia * (0.5 + 0.5 * extremo), 3)
+
+        puntaje = min(5, max(1, 1 + int(promedio // 20)))
+        mejor = max(range(len(puntajes)), key=puntajes.__getitem__)
+        peor = min(range(len(puntajes)), key=puntajes.__getitem__)
+        evidencias = [
+            self._evidencia(criterio, turnos_agente[indice], puntajes[indice])
+            for indice in dict.fromkeys((mejor, peor))
+        ]
+        return ResultadoHeuristico(
+            puntaje=puntaje,
+            confianza=confianza,
+            justificacion=(
+                f"Estimación heurística sobre {len(puntajes)} turnos del agente "
+                f"(promedio {promedio:.0f}/100, confianza {confianza:.2f})."
+            ),
+            evidencias=evidencias,
+        )
+
+    @staticmethod
+    def _evidencia(
+        criterio: str, mensaje: MensajeConversacion, puntaje: float
+    ) -> EvidenciaEvaluacion:
+        if puntaje >= 70:
+            impacto = "positivo"
+        elif puntaje < 50:
+            impacto = "negativo"
+        else:
+            impacto = "neutral"
+        return EvidenciaEvaluacion(
+            criterio=criterio,
+            turno=mensaje.turno,
+            extracto=mensaje.contenido[:120],
+            impacto=impacto,
+        )
+
+
+def resumir_cascada(
+    cascada: Iterable[ResultadoEvaluacion],
+    referencia: Iterable[ResultadoEvaluacion],
+) -> Dict[str, float]:
+    """Compara resultados de la cascada con una evaluación completa por LLM.
+
+    Informa qué proporción de criterios resolvió la heurística (llamadas al LLM
+    evitadas) y con qué frecuencia coincidió con el LLM, exacta o con una
+    diferencia de un punto.
+    """
+
+    puntajes_referencia = {
+        (resultado.sesion_id, criterio.nombre): criterio.puntaje
+        for resultado in referencia
+        for criterio in resultado.criterios
+    }
+    totales = heuristicos = exactos = cercanos = 0
+    for resultado in cascada:
+        for criterio in resultado.criterios:
+            totales += 1
+            if criterio.origen != "heuristica":
+                continue
+            heuristicos += 1
+            esperado = puntajes_referencia.get((resultado.sesion_id, criterio.nombre))
+            if esperado is None:
+                continue
+            exactos += criterio.puntaje == esperado
+            cercanos += abs(criterio.puntaje - esperado) <= 1
+    return {
+        "criterios": totales,
+        "criterios_heuristicos": heuristicos,
+        "tasa_llamadas_evitadas": heuristicos / totales if totales else 0.0,
+        "acuerdo_exacto": exactos / heuristicos if heuristicos else 0.0,
+        "acuerdo_tolerante": cercanos / heuristicos if heuristicos else 0.0,
+    }
+
+
+__all__ = [
+    "EvaluadorHeuristico",
+    "PUNTUADORES",
+    "ResultadoHeuristico",
+    "resumir_cascada",
+]
@@ -0,0 +1,205 @@
+"""Registro de métricas para instrumentar el uso del LLM en la evaluación."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LIMITES_SEGUNDOS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+LIMITES_TAMANO: Tuple[float, ...] = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+ObservadorMetrica = Callable[[str, Dict[str, str], float], None]
+
+
+class Histograma:
+    """Histograma acumulativo con límites fijos, al estilo de Prometheus."""
+
+    def __init__(self, limites: Sequence[float]) -> None:
+        self.limites: Tuple[float, ...] = tuple(sorted(limites))
+        self.cubetas: List[int] = [0] * (len(self.limites) + 1)
+        self.cantidad = 0
+        self.suma = 0.0
+        self.minimo: Optional[float] = None
+        self.maximo: Optional[float] = None
+
+    def observar(self, valor: float) -> None:
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.cantidad += 1
+        self.suma += valor
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+    def percentil(self, fraccion: float) -> Optional[float]:
+        """Aproxima el percentil con el límite superior de la cubeta donde cae."""
+
+        if self.cantidad == 0:
+            return None
+        objetivo = fraccion * self.cantidad
+        acumulado = 0
+        for indice, cantidad in enumerate(self.cubetas):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return (
+                    self.limites[indice] if indice < len(self.limites) else self.maximo
+                )
+        return self.maximo
+
+    def a_dict(self) -> Dict[str, object]:
+        return {
+            "cantidad": self.cantidad,
+            "suma": self.suma,
+            "promedio": self.suma / self.cantidad if self.cantidad else None,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "p50": self.percentil(0.5),
+            "p95": self.percentil(0.95),
+            "cubetas": {
+                **{
+                    f"{limite:g}": cantidad
+                    for limite, cantidad in zip(self.limites, self.cubetas)
+                },
+                "+Inf": self.cubetas[-1],
+            },
+        }
+
+
+class RegistroMetricas:
+    """Agrega contadores e histogramas etiquetados de forma segura entre hilos.
+
+    Además de acumular, reenvía cada observación a los observadores
+    registrados con ``suscribir`` para integrarse con sistemas externos.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._contadores: Dict[Tuple[str, Etiquetas], float] = {}
+        self._histogramas: Dict[Tuple[str, Etiquetas], Histograma] = {}
+        self._observadores: List[ObservadorMetrica] = []
+
+    def suscribir(self, observador: ObservadorMetrica) -> None:
+        """Registra una función que recibe cada observación individual."""
+
+        self._observadores.append(observador)
+
+    def incrementar(
+        self,
+        nombre: str,
+        etiquetas: Optional[Dict[str, str]] = None,
+        cantidad: float = 1,
+    ) -> None:
+        clave = (nombre, _normalizar(etiquetas))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + cantidad
+        self._notificar(nombre, etiquetas, cantidad)
+
+    def observar(
+        self,
+        nombre: str,
+        valor: float,
+        etiquetas: Optional[Dict[str, str]] = None,
+        limites: Sequence[float] = LIMITES_SEGUNDOS,
+    ) -> None:
+        clave = (nombre, _normalizar(etiquetas))
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(limites)
+            histograma.observar(valor)
+        self._notificar(nombre, etiquetas, valor)
+
+    def contador(
+        self, nombre: str, etiquetas: Optional[Dict[str, str]] = None
+    ) -> float:
+        with self._lock:
+            return self._contadores.get((nombre, _normalizar(etiquetas)), 0)
+
+    def histograma(
+        self, nombre: str, etiquetas: Optional[Dict[str, str]] = None
+    ) -> Optional[Histograma]:
+        with self._lock:
+            return self._histogramas.get((nombre, _normalizar(etiquetas)))
+
+    def exportar(self) -> Dict[str, Dict[str, object]]:
+        """Instantánea serializable a JSON de todas las métricas."""
+
+        with self._lock:
+            return {
+                "contadores": {
+                    _nombre_serie(nombre, etiquetas): valor
+                    for (nombre, etiquetas), valor in sorted(self._contadores.items())
+                },
+                "histogramas": {
+                    _nombre_serie(nombre, etiquetas): histograma.a_dict()
+                    for (nombre, etiquetas), histograma in sorted(
+                        self._histogramas.items(), key=lambda item: item[0]
+                    )
+                },
+            }
+
+    def exportar_prometheus(self) -> str:
+        """Representación en el formato de texto de exposición de Prometheus."""
+
+        lineas: List[str] = []
+        with self._lock:
+            for (nombre, etiquetas), valor in sorted(self._contadores.items()):
+                lineas.append(
+                    f"{_nombre_serie(nombre + '_total', etiquetas)} {valor:g}"
+                )
+            for (nombre, etiquetas), histograma in sorted(
+                self._histogramas.items(), key=lambda item: item[0]
+            ):
+                acumulado = 0
+                for limite, cantidad in zip(histograma.limites, histograma.cubetas):
+                    acumulado += cantidad
+                    serie = _nombre_serie(
+                        nombre + "_bucket", etiquetas + (("le", f"{limite:g}"),)
+                    )
+                    lineas.append(f"{serie} {acumulado}")
+                serie = _nombre_serie(nombre + "_bucket", etiquetas + (("le", "+Inf"),))
+                lineas.append(f"{serie} {histograma.cantidad}")
+                serie = _nombre_serie(nombre + "_sum", etiquetas)
+                lineas.append(f"{serie} {histograma.suma:g}")
+                serie = _nombre_serie(nombre + "_count", etiquetas)
+                lineas.append(f"{serie} {histograma.cantidad}")
+        return "\n".join(lineas) + ("\n" if lineas else "")
+
+    def _notificar(
+        self, nombre: str, etiquetas: Optional[Dict[str, str]], valor: float
+    ) -> None:
+        for observador in self._observadores:
+            observador(nombre, dict(etiquetas or {}), valor)
+
+
+def _normalizar(etiquetas: Optional[Dict[str, str]]) -> Etiquetas:
+    return tuple(sorted((etiquetas or {}).items()))
+
+
+def _nombre_serie(nombre: str, etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return nombre
+    pares = ",".join(f'{clave}="{valor}"' for clave, valor in etiquetas)
+    return f"{nombre}{{{pares}}}"
+
+
+__all__ = [
+    "Histograma",
+    "LIMITES_SEGUNDOS",
+    "LIMITES_TAMANO",
+    "RegistroMetricas",
+]
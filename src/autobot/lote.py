@@ -0,0 +1,221 @@
+"""Evaluación masiva de sesiones almacenadas con concurrencia acotada."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Set,
+    Union,
+)
+
+from .evaluation import AnalizadorConversacion, ErrorTransitorioLLM, LLMClient
+from .models import ContextoConversacion, ResultadoEvaluacion
+
+FuenteContextos = Union[
+    Iterable[ContextoConversacion], AsyncIterable[ContextoConversacion]
+]
+
+ERRORES_TRANSITORIOS = (ErrorTransitorioLLM, ConnectionError, TimeoutError)
+
+
+@dataclass
+class ProgresoLote:
+    """Avance de una evaluación masiva, notificado tras cada cambio."""
+
+    iniciadas: int = 0
+    completadas: int = 0
+    fallidas: int = 0
+    reintentos: int = 0
+
+    @property
+    def en_curso(self) -> int:
+        return self.iniciadas - self.completadas - self.fallidas
+
+
+class _ClienteLote:
+    """Envuelve al cliente real con un límite global de llamadas y reintentos."""
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        semaforo: asyncio.Semaphore,
+        reintentos: int,
+        espera_reintento: float,
+        al_reintentar: Callable[[], None],
+    ) -> None:
+        self._llm = llm
+        self._semaforo = semaforo
+        self._reintentos = reintentos
+        self._espera_reintento = espera_reintento
+        self._al_reintentar = al_reintentar
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:
+        intento = 0
+        while True:
+            try:
+                async with self._semaforo:
+                    return await self._llm.generate(
+                        prompt, temperature=temperature, max_tokens=max_tokens
+                    )
+            except ERRORES_TRANSITORIOS:
+                if intento >= self._reintentos:
+                    raise
+            await self._esperar_reintento(intento)
+            intento += 1
+
+    async def _esperar_reintento(self, intento: int) -> None:
+        self._al_reintentar()
+        await asyncio.sleep(self._espera_reintento * 2**intento)
+
+
+class _ClienteLoteStreaming(_ClienteLote):
+    """Variante para clientes con ``generate_stream``.
+
+    Reintenta con la misma espera exponencial mientras no se haya entregado
+    ningún fragmento; una vez iniciado el flujo, los errores se propagan.
+    """
+
+    async def generate_stream(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> AsyncIterator[str]:
+        intento = 0
+        while True:
+            emitido = False
+            try:
+                async with self._semaforo:
+                    flujo = self._llm.generate_stream(  # type: ignore[attr-defined]
+                        prompt, temperature=temperature, max_tokens=max_tokens
+                    )
+                    try:
+                        async for fragmento in flujo:
+                            emitido = True
+                            yield fragmento
+                    finally:
+                        cerrar = getattr(flujo, "aclose", None)
+                        if cerrar is not None:
+                            await cerrar()
+                return
+            except ERRORES_TRANSITORIOS:
+                if emitido or intento >= self._reintentos:
+                    raise
+            await self._esperar_reintento(intento)
+            intento += 1
+
+
+async def evaluar_lote(
+    analizador: AnalizadorConversacion,
+    contextos: FuenteContextos,
+    *,
+    max_sesiones: int = 8,
+    max_llamadas_llm: int = 16,
+    reintentos: int = 3,
+    espera_reintento: float = 0.5,
+    al_progresar: Optional[Callable[[ProgresoLote], None]] = None,
+    al_fallar: Optional[Callable[[ContextoConversacion, BaseException], None]] = None,
+) -> AsyncIterator[ResultadoEvaluacion]:
+    """Evalúa sesiones en paralelo y entrega cada resultado al completarse.
+
+    Los contextos se consumen de forma perezosa, por lo que nunca hay más de
+    ``max_sesiones`` en memoria a la vez. ``max_llamadas_llm`` limita las
+    llamadas simultáneas al LLM sumando todas las sesiones y criterios. Los
+    errores transitorios se reintentan con espera exponencial; las sesiones
+    que fallan definitivamente se notifican a ``al_fallar`` y no detienen el
+    lote.
+    """
+
+    if max_sesiones < 1 or max_llamadas_llm < 1:
+        raise ValueError("Los límites de concurrencia deben ser enteros positivos")
+
+    progreso = ProgresoLote()
+
+    def notificar() -> None:
+        if al_progresar is not None:
+            al_progresar(progreso)
+
+    def registrar_reintento() -> None:
+        progreso.reintentos += 1
+        if analizador.metricas is not None:
+            analizador.metricas.incrementar("llm_reintentos")
+        notificar()
+
+    llm = analizador.llm_client
+    tipo_cliente = (
+        _ClienteLoteStreaming if hasattr(llm, "generate_stream") else _ClienteLote
+    )
+    cliente = tipo_cliente(
+        llm,
+        asyncio.Semaphore(max_llamadas_llm),
+        reintentos,
+        espera_reintento,
+        registrar_reintento,
+    )
+    analizador_lote = analizador.con_cliente(cliente)
+
+    iterador = _iterar(contextos)
+    pendientes: Set[asyncio.Task] = set()
+    origen: Dict[asyncio.Task, ContextoConversacion] = {}
+    agotado = False
+    try:
+        while True:
+            while not agotado and len(pendientes) < max_sesiones:
+                try:
+                    contexto = await iterador.__anext__()
+                except StopAsyncIteration:
+                    agotado = True
+                    break
+                tarea = asyncio.create_task(
+                    analizador_lote.evaluar_conversacion(contexto)
+                )
+                origen[tarea] = contexto
+                pendientes.add(tarea)
+                progreso.iniciadas += 1
+                notificar()
+
+            if not pendientes:
+                return
+
+            terminadas, pendientes = await asyncio.wait(
+                pendientes, return_when=asyncio.FIRST_COMPLETED
+            )
+            for tarea in terminadas:
+                contexto = origen.pop(tarea)
+                error = tarea.exception()
+                if error is None:
+                    progreso.completadas += 1
+                    notificar()
+                    yield tarea.result()
+                    continue
+                progreso.fallidas += 1
+                notificar()
+                if al_fallar is not None:
+                    al_fallar(contexto, error)
+    finally:
+        for tarea in pendientes:
+            tarea.cancel()
+        if pendientes:
+            await asyncio.gather(*pendientes, return_exceptions=True)
+        await iterador.aclose()
+
+
+async def _iterar(
+    contextos: FuenteContextos,
+) -> AsyncGenerator[ContextoConversacion, None]:
+    if hasattr(contextos, "__aiter__"):
+        async for contexto in contextos:  # type: ignore[union-attr]
+            yield contexto
+    else:
+        for contexto in contextos:  # type: ignore[union-attr]
+            yield contexto
+
+
+__all__ = ["ProgresoLote", "evaluar_lote"]
@@ -0,0 +1,138 @@
+"""Métricas de la conversación calculadas localmente, sin recurrir al LLM."""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, Mapping, Optional, Pattern, Tuple
+
+from .models import ContextoConversacion, MensajeConversacion, PersonalidadCliente
+from .personalities import PERFILES_PERSONALIDAD, PerfilPersonalidad
+
+if TYPE_CHECKING:
+    from .evaluation import RubricaEvaluacion
+
+CRITERIO_EMPATIA = "empatia_y_tono"
+CRITERIO_SOLUCION = "resolucion_y_proactividad"
+CRITERIO_CONFIRMACION = "claridad_y_comunicacion"
+
+_Detectores = Tuple[
+    Optional[Pattern[str]], Optional[Pattern[str]], Optional[Pattern[str]]
+]
+
+
+def compilar_marcadores(marcadores: Iterable[str]) -> Optional[Pattern[str]]:
+    """Une los marcadores en una sola expresión regular insensible a mayúsculas.
+
+    Los marcadores se buscan como prefijo de palabra, de modo que ``disculp``
+    detecta tanto "disculpe" como "disculpas". Devuelve ``None`` si no hay
+    marcadores.
+    """
+
+    terminos = sorted(
+        {marcador.strip().lower() for marcador in marcadores if marcador.strip()},
+        key=len,
+        reverse=True,
+    )
+    if not terminos:
+        return None
+    alternativas = "|".join(re.escape(termino) for termino in terminos)
+    return re.compile(rf"(?<!\w)(?:{alternativas})", re.IGNORECASE)
+
+
+class MotorMetricas:
+    """Calcula las métricas de ``ResultadoEvaluacion`` en una sola pasada.
+
+    Los detectores de empatía, solución y confirmación de entendimiento se
+    construyen con los ``marcadores`` de los criterios de la rúbrica; el de
+    empatía suma además las ``palabras_calmantes`` del perfil del cliente. Se
+    compilan una vez por personalidad y se reutilizan entre sesiones, así que
+    el cálculo es barato incluso para lotes grandes.
+    """
+
+    def __init__(
+        self,
+        rubrica: "RubricaEvaluacion",
+        perfiles: Mapping[PersonalidadCliente, PerfilPersonalidad] | None = None,
+    ) -> None:
+        self._marcadores = {
+            nombre: tuple(rubrica.criterios[nombre].marcadores)
+            if nombre in rubrica.criterios
+            else ()
+            for nombre in (CRITERIO_EMPATIA, CRITERIO_SOLUCION, CRITERIO_CONFIRMACION)
+        }
+        self._perfiles = PERFILES_PERSONALIDAD if perfiles is None else perfiles
+        self._detectores: Dict[PersonalidadCliente, _Detectores] = {}
+
+    def calcular(self, contexto: ContextoConversacion) -> Dict[str, Optional[float]]:
+        empatia, solucion, confirmacion = self._detectores_para(
+            contexto.configuracion.personalidad
+        )
+        turnos_hasta_empatia: Optional[int] = None
+        turnos_hasta_solucion: Optional[int] = None
+        confirmaciones = 0
+        interrupciones = 0
+        tiempo_total = 0.0
+        respuestas = 0
+        anterior: Optional[MensajeConversacion] = None
+
+        for mensaje in contexto.historial:
+            if mensaje.rol == "cliente":
+                if anterior is not None and anterior.rol == "cliente":
+                    interrupciones += 1
+            else:
+                if anterior is not None and anterior.rol == "cliente":
+                    tiempo_total += (
+                        mensaje.timestamp - anterior.timestamp
+                    ).total_seconds()
+                    respuestas += 1
+                texto = mensaje.contenido
+                if (
+                    turnos_hasta_empatia is None
+                    and empatia is not None
+                    and empatia.search(texto)
+                ):
+                    turnos_hasta_empatia = mensaje.turno
+                if (
+                    turnos_hasta_solucion is None
+                    and solucion is not None
+                    and solucion.search(texto)
+                ):
+                    turnos_hasta_solucion = mensaje.turno
+                if confirmacion is not None and confirmacion.search(texto):
+                    confirmaciones += 1
+            anterior = mensaje
+
+        return {
+            "turnos_totales": len(contexto.historial),
+            "turnos_hasta_empatia": turnos_hasta_empatia,
+            "turnos_hasta_solucion": turnos_hasta_solucion,
+            "confirmaciones_entendimiento": confirmaciones,
+            "interrupciones": interrupciones,
+            "tiempo_respuesta_promedio": (
+                tiempo_total / respuestas if respuestas else 0.0
+            ),
+        }
+
+    def _detectores_para(self, personalidad: PersonalidadCliente) -> _Detectores:
+        detectores = self._detectores.get(personalidad)
+        if detectores is None:
+            perfil = self._perfiles.get(personalidad)
+            calmantes = perfil.palabras_calmantes if perfil is not None else ()
+            detectores = (
+                compilar_marcadores(
+                    (*self._marcadores[CRITERIO_EMPATIA], *calmantes)
+                ),
+                compilar_marcadores(self._marcadores[CRITERIO_SOLUCION]),
+                compilar_marcadores(self._marcadores[CRITERIO_CONFIRMACION]),
+            )
+            self._detectores[personalidad] = detectores
+        return detectores
+
+
+__all__ = [
+    "CRITERIO_CONFIRMACION",
+    "CRITERIO_EMPATIA",
+    "CRITERIO_SOLUCION",
+    "MotorMetricas",
+    "compilar_marcadores",
+]
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Dict, List, Literal, Optional
 
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
 
 class PersonalidadCliente(str, Enum):
     """Enumeración de personalidades disponibles para los clientes simulados."""
@@ -55,18 +59,87 @@ class ConfiguracionSimulacion:
     nivel_dificultad: float = 0.7
 
 
-@dataclass
+@dataclass(init=False)
 class MensajeConversacion:
-    """Unidad básica del diálogo entre cliente y agente."""
+    """Unidad básica del diálogo entre cliente y agente.
+
+    Usa ``__slots__`` para que las sesiones en memoria no paguen un
+    ``__dict__`` por mensaje. ``rol`` se interna y ``metadatos`` se crea
+    recién al primer acceso; la comparación, ``repr`` y los codecs consultan
+    ``_tiene_metadatos`` para no crearlo. Con ``marca_compacta=True`` el
+    ``timestamp`` se guarda como microsegundos desde la época y se devuelve en
+    UTC al leerlo; las fechas sin zona horaria se interpretan como UTC.
+    """
+
+    __slots__ = ("turno", "rol", "contenido", "timestamp", "metadatos", "_marca")
 
     turno: int
     rol: Literal["cliente", "agente"]
     contenido: str
     timestamp: datetime
-    metadatos: Dict[str, str] = field(default_factory=dict)
-
-
-@dataclass
+    metadatos: Dict[str, str]
+
+    def __init__(
+        self,
+        turno: int,
+        rol: Literal["cliente", "agente"],
+        contenido: str,
+        timestamp: datetime,
+        metadatos: Optional[Dict[str, str]] = None,
+        *,
+        marca_compacta: bool = False,
+    ) -> None:
+        self.turno = turno
+        self.rol = sys.intern(rol)
+        self.contenido = contenido
+        if marca_compacta:
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            self._marca = (timestamp - _EPOCA) // _MICROSEGUNDO
+        else:
+            self.timestamp = timestamp
+        if metadatos is not None:
+            self.metadatos = metadatos
+
+    def __eq__(self, otro: object) -> bool:
+        if otro.__class__ is not self.__class__:
+            return NotImplemented
+        return self._campos() == otro._campos()
+
+    def __repr__(self) -> str:
+        turno, rol, contenido, timestamp, metadatos = self._campos()
+        return (
+            f"{type(self).__qualname__}(turno={turno!r}, rol={rol!r}, "
+            f"contenido={contenido!r}, timestamp={timestamp!r}, "
+            f"metadatos={metadatos!r})"
+        )
+
+    def _tiene_metadatos(self) -> bool:
+        """Indica si ``metadatos`` ya existe, sin crearlo como el acceso normal."""
+
+        try:
+            object.__getattribute__(self, "metadatos")
+        except AttributeError:
+            return False
+        return True
+
+    def _campos(self) -> tuple:
+        metadatos = self.metadatos if self._tiene_metadatos() else {}
+        return self.turno, self.rol, self.contenido, self.timestamp, metadatos
+
+    def __getattr__(self, nombre: str):
+        # Solo se llama para los slots sin asignar.
+        if nombre == "metadatos":
+            self.metadatos = {}
+            return self.metadatos
+        if nombre == "timestamp":
+            return _EPOCA + timedelta(microseconds=self._marca)
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {nombre!r}"
+        )
+
+
+@dataclass(slots=True)
 class ContextoConversacion:
     """Estado completo de la conversación en curso."""
 
@@ -79,6 +152,18 @@ class ContextoConversacion:
 
 
 @dataclass
+class MetadatosSesion:
+    """Cabecera de una conversación sin su historial de mensajes."""
+
+    sesion_id: str
+    configuracion: ConfiguracionSimulacion
+    estado_actual: Literal["iniciando", "en_progreso", "resolviendo", "finalizado"]
+    total_mensajes: int
+    datos_clave_mencionados: Dict[str, bool] = field(default_factory=dict)
+    emociones_cliente: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
 class EvidenciaEvaluacion:
     """Fragmento textual que respalda un puntaje obtenido."""
 
@@ -97,6 +182,7 @@ class CriterioEvaluacion:
     peso: float
     justificacion: str
     evidencias: List[EvidenciaEvaluacion]
+    origen: Literal["llm", "heuristica"] = "llm"
 
 
 @dataclass
@@ -115,3 +201,13 @@ class ResultadoEvaluacion:
     recomendaciones: List[str]
     metricas: Dict[str, Optional[float]]
     resumen_ejecutivo: str
+
+
+@dataclass
+class PuntoControlEvaluacion:
+    """Estado parcial de una evaluación incremental para reanudarla más tarde."""
+
+    sesion_id: str
+    turnos_evaluados: int
+    criterios: Dict[str, CriterioEvaluacion]
+    timestamp: datetime
@@ -0,0 +1,976 @@
+"""Almacenamiento durable en SQLite para sesiones y resultados de evaluación."""
+
+from __future__ import annotations
+
+import base64
+import itertools
+import json
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .almacenamiento import semilla_version
+from .codificacion import decodificar_cabecera
+from .context import (
+    AlmacenamientoEnMemoria,
+    _barrer_periodicamente,
+    _BloqueosPorSesion,
+    _clave,
+)
+from .models import (
+    CanalComunicacion,
+    EscenarioObra,
+    PersonalidadCliente,
+    ResultadoEvaluacion,
+)
+from .scenarios import REGISTRO_ESCENARIOS, RegistroEscenarios
+from .serializacion import a_dict, desde_dict
+
+_VALOR = 0
+_LISTA = 1
+
+_ESQUEMA = (
+    "CREATE TABLE IF NOT EXISTS claves ("
+    " clave TEXT PRIMARY KEY,"
+    " sesion_id TEXT NOT NULL,"
+    " tipo INTEGER NOT NULL,"
+    " valor,"
+    " vence REAL,"
+    " modificada REAL NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS idx_claves_sesion ON claves (sesion_id)",
+    "CREATE INDEX IF NOT EXISTS idx_claves_vence ON claves (vence)"
+    " WHERE vence IS NOT NULL",
+    "CREATE TABLE IF NOT EXISTS elementos ("
+    " clave TEXT NOT NULL,"
+    " posicion INTEGER NOT NULL,"
+    " valor,"
+    " PRIMARY KEY (clave, posicion)"
+    ") WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS resultados ("
+    " id INTEGER PRIMARY KEY,"
+    " sesion_id TEXT NOT NULL,"
+    " timestamp TEXT NOT NULL,"
+    " personalidad TEXT NOT NULL,"
+    " canal TEXT NOT NULL,"
+    " escenario TEXT NOT NULL,"
+    " puntaje_global REAL NOT NULL,"
+    " datos TEXT NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS idx_resultados_sesion ON resultados (sesion_id)",
+    "CREATE INDEX IF NOT EXISTS idx_resultados_timestamp ON resultados (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_resultados_personalidad"
+    " ON resultados (personalidad, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_resultados_canal ON resultados (canal, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_resultados_escenario"
+    " ON resultados (escenario, timestamp)",
+)
+
+_LEER = (
+    "SELECT tipo, valor FROM claves"
+    " WHERE clave = ? AND (vence IS NULL OR vence > ?)"
+)
+_LEER_PARA_ESCRIBIR = "SELECT tipo, valor, vence FROM claves WHERE clave = ?"
+_INSERTAR = (
+    "INSERT OR REPLACE INTO claves"
+    " (clave, sesion_id, tipo, valor, vence, modificada) VALUES (?, ?, ?, ?, ?, ?)"
+)
+_ACTUALIZAR_VALOR = "UPDATE claves SET valor = ?, modificada = ? WHERE clave = ?"
+_ACTUALIZAR_VENCIMIENTO = "UPDATE claves SET vence = ? WHERE clave = ?"
+_BORRAR = "DELETE FROM claves WHERE clave = ?"
+_BORRAR_ELEMENTOS = "DELETE FROM elementos WHERE clave = ?"
+_AGREGAR_ELEMENTO = "INSERT INTO elementos (clave, posicion, valor) VALUES (?, ?, ?)"
+_LEER_ELEMENTOS = (
+    "SELECT valor FROM elementos"
+    " WHERE clave = ? AND posicion BETWEEN ? AND ? ORDER BY posicion"
+)
+_INSERTAR_RESULTADO = (
+    "INSERT INTO resultados (sesion_id, timestamp, personalidad, canal, escenario,"
+    " puntaje_global, datos) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+_ESQUEMA_FRIO = (
+    "CREATE TABLE IF NOT EXISTS sesiones_frias ("
+    " sesion_id TEXT PRIMARY KEY,"
+    " datos BLOB NOT NULL,"
+    " vence REAL,"
+    " degradada REAL NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS idx_sesiones_frias_vence ON sesiones_frias (vence)"
+    " WHERE vence IS NOT NULL",
+)
+
+
+class AlmacenamientoSQLite:
+    """Almacenamiento durable en una base SQLite en modo WAL.
+
+    Ofrece las mismas operaciones que ``AlmacenamientoEnMemoria`` (``get``,
+    ``setex``, ``rpush``, ``lrange``, ``llen``, ``incr``, ``cas``, ``delete``,
+    ``expire``, ``items``, ``barrer``), así que ``GestorContexto`` lo usa sin
+    cambios y las sesiones sobreviven a reinicios. Los TTL se miden con el
+    reloj de pared y las claves vencidas se ignoran al leer y se eliminan con
+    ``barrer``. Las claves se indexan por el id de sesión, lo que sigue a
+    ``:`` en la clave.
+
+    Cada operación es una transacción; ``transaccion()`` agrupa varias en
+    una sola confirmación. ``cas`` usa ``BEGIN IMMEDIATE``, así que es atómico
+    también entre procesos que abren la misma base. Todas las sentencias son
+    constantes y el caché de sentencias preparadas de ``sqlite3`` las
+    reutiliza.
+
+    Además guarda ``ResultadoEvaluacion`` completos, consultables por sesión,
+    fecha, personalidad, canal y escenario.
+    """
+
+    def __init__(
+        self,
+        ruta: str | Path = ":memory:",
+        sincronizacion: str = "NORMAL",
+        timeout: float = 5.0,
+        reloj: Callable[[], float] = time.time,
+    ) -> None:
+        if sincronizacion.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Modo de sincronización inválido: {sincronizacion!r}")
+        self._conexion = sqlite3.connect(
+            str(ruta),
+            timeout=timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        self._reloj = reloj
+        self._lock = threading.RLock()
+        self._profundidad = 0
+        self._expiraciones = 0
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(f"PRAGMA synchronous={sincronizacion.upper()}")
+        with self.transaccion():
+            for sentencia in _ESQUEMA:
+                self._conexion.execute(sentencia)
+
+    @contextmanager
+    def transaccion(self) -> Iterator[None]:
+        """Confirma juntas todas las operaciones del bloque; admite anidarse."""
+
+        with self._lock:
+            if self._profundidad:
+                self._profundidad += 1
+                try:
+                    yield
+                finally:
+                    self._profundidad -= 1
+                return
+            self._conexion.execute("BEGIN IMMEDIATE")
+            self._profundidad = 1
+            try:
+                yield
+            except BaseException:
+                self._conexion.execute("ROLLBACK")
+                raise
+            else:
+                self._conexion.execute("COMMIT")
+            finally:
+                self._profundidad = 0
+
+    def get(self, clave: str) -> Optional[str]:
+        with self._lock:
+            fila = self._conexion.execute(_LEER, (clave, self._reloj())).fetchone()
+        if fila is None:
+            return None
+        if fila[0] == _LISTA:
+            raise TypeError(f"La clave {clave!r} contiene una lista")
+        return fila[1]
+
+    def setex(self, clave: str, ttl: int, valor: str) -> None:
+        if ttl <= 0:
+            raise ValueError(f"TTL inválido para {clave!r}: {ttl}")
+        with self.transaccion():
+            self._setex(clave, ttl, valor)
+
+    def rpush(self, clave: str, *valores: str) -> int:
+        with self.transaccion():
+            return self._rpush(clave, valores)
+
+    def lrange(self, clave: str, inicio: int, fin: int) -> List[str]:
+        """Devuelve los elementos entre ``inicio`` y ``fin`` inclusive, como Redis."""
+
+        with self._lock:
+            longitud = self._longitud(clave)
+            if inicio < 0:
+                inicio = max(longitud + inicio, 0)
+            if fin < 0:
+                fin += longitud
+            if fin < inicio or inicio >= longitud:
+                return []
+            filas = self._conexion.execute(_LEER_ELEMENTOS, (clave, inicio, fin))
+            return [valor for (valor,) in filas]
+
+    def llen(self, clave: str) -> int:
+        with self._lock:
+            return self._longitud(clave)
+
+    def incr(self, clave: str) -> int:
+        """Incrementa un contador conservando su TTL, como ``INCR`` de Redis."""
+
+        with self.transaccion():
+            return self._incr(clave)
+
+    def cas(
+        self,
+        clave_version: str,
+        esperada: Optional[int],
+        ttl: int,
+        valores: Optional[Dict[str, str]] = None,
+        listas: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> Optional[int]:
+        """Escribe solo si ``clave_version`` sigue valiendo ``esperada``.
+
+        Mismo contrato que ``AlmacenamientoEnMemoria.cas``, en una única
+        transacción.
+        """
+
+        if ttl <= 0:
+            raise ValueError(f"TTL inválido para {clave_version!r}: {ttl}")
+        with self.transaccion():
+            fila = self._vigente(clave_version)
+            actual = None if fila is None else int(fila[1])
+            if actual != esperada:
+                return None
+            for clave, valor in (valores or {}).items():
+                self._setex(clave, ttl, valor)
+            vence = self._reloj() + ttl
+            for clave, elementos in (listas or {}).items():
+                if elementos:
+                    self._rpush(clave, elementos)
+                self._conexion.execute(_ACTUALIZAR_VENCIMIENTO, (vence, clave))
+            if actual is None:
+                version = semilla_version()
+                self._setex(clave_version, ttl, str(version))
+                return version
+            version = self._incr(clave_version)
+            self._conexion.execute(_ACTUALIZAR_VENCIMIENTO, (vence, clave_version))
+            return version
+
+    def delete(self, *claves: str) -> int:
+        with self.transaccion():
+            eliminadas = 0
+            for clave in claves:
+                if self._vigente(clave) is not None:
+                    self._eliminar(clave)
+                    eliminadas += 1
+            return eliminadas
+
+    def expire(self, clave: str, ttl: int) -> bool:
+        """Fija el TTL de una clave existente; uno no positivo la elimina."""
+
+        with self.transaccion():
+            if self._vigente(clave) is None:
+                return False
+            if ttl <= 0:
+                self._eliminar(clave)
+            else:
+                self._conexion.execute(
+                    _ACTUALIZAR_VENCIMIENTO, (self._reloj() + ttl, clave)
+                )
+            return True
+
+    def items(self) -> Iterable:
+        """Pares ``(clave, {"valor", "timestamp"})`` de las claves vigentes."""
+
+        with self.transaccion():
+            self._barrer()
+            filas = self._conexion.execute(
+                "SELECT clave, tipo, valor, modificada FROM claves ORDER BY clave"
+            ).fetchall()
+            return [
+                (
+                    clave,
+                    {
+                        "valor": (
+                            self.lrange(clave, 0, -1) if tipo == _LISTA else valor
+                        ),
+                        "timestamp": datetime.fromtimestamp(
+                            modificada, UTC
+                        ).isoformat(),
+                    },
+                )
+                for clave, tipo, valor, modificada in filas
+            ]
+
+    def barrer(self) -> int:
+        """Elimina las claves vencidas y devuelve cuántas eran."""
+
+        with self.transaccion():
+            return self._barrer()
+
+    def guardar_resultado(self, resultado: ResultadoEvaluacion) -> None:
+        """Persiste un resultado de evaluación."""
+
+        self.guardar_resultados([resultado])
+
+    def guardar_resultados(self, resultados: Iterable[ResultadoEvaluacion]) -> int:
+        """Persiste varios resultados en una sola transacción; devuelve cuántos."""
+
+        filas = [
+            (
+                resultado.sesion_id,
+                _instante(resultado.timestamp_evaluacion),
+                resultado.personalidad_cliente.value,
+                resultado.canal.value,
+                resultado.escenario.id,
+                resultado.puntaje_global,
+                json.dumps(a_dict(resultado), ensure_ascii=False),
+            )
+            for resultado in resultados
+        ]
+        with self.transaccion():
+            self._conexion.executemany(_INSERTAR_RESULTADO, filas)
+        return len(filas)
+
+    def obtener_resultados(
+        self,
+        sesion_id: str | None = None,
+        personalidad: PersonalidadCliente | str | None = None,
+        canal: CanalComunicacion | str | None = None,
+        escenario: EscenarioObra | str | None = None,
+        desde: datetime | None = None,
+        hasta: datetime | None = None,
+        limite: int | None = None,
+    ) -> List[ResultadoEvaluacion]:
+        """Resultados que cumplen todos los filtros, del más antiguo al más nuevo.
+
+        ``desde`` es inclusivo y ``hasta`` exclusivo; las fechas sin zona
+        horaria se interpretan como UTC.
+        """
+
+        condiciones: List[str] = []
+        parametros: List[object] = []
+        if sesion_id is not None:
+            condiciones.append("sesion_id = ?")
+            parametros.append(sesion_id)
+        if personalidad is not None:
+            condiciones.append("personalidad = ?")
+            parametros.append(PersonalidadCliente(personalidad).value)
+        if canal is not None:
+            condiciones.append("canal = ?")
+            parametros.append(CanalComunicacion(canal).value)
+        if escenario is not None:
+            condiciones.append("escenario = ?")
+            parametros.append(getattr(escenario, "id", escenario))
+        if desde is not None:
+            condiciones.append("timestamp >= ?")
+            parametros.append(_instante(desde))
+        if hasta is not None:
+            condiciones.append("timestamp < ?")
+            parametros.append(_instante(hasta))
+        consulta = "SELECT datos FROM resultados"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += " ORDER BY timestamp, id"
+        if limite is not None:
+            consulta += " LIMIT ?"
+            parametros.append(limite)
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+        return [_resultado_desde_json(datos) for (datos,) in filas]
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Claves, elementos de listas y resultados guardados; claves vencidas."""
+
+        with self._lock:
+            (claves,) = self._conexion.execute(
+                "SELECT COUNT(*) FROM claves WHERE vence IS NULL OR vence > ?",
+                (self._reloj(),),
+            ).fetchone()
+            (elementos,) = self._conexion.execute(
+                "SELECT COUNT(*) FROM elementos"
+            ).fetchone()
+            (resultados,) = self._conexion.execute(
+                "SELECT COUNT(*) FROM resultados"
+            ).fetchone()
+            return {
+                "entradas": claves,
+                "elementos": elementos,
+                "resultados": resultados,
+                "expiraciones": self._expiraciones,
+            }
+
+    def cerrar(self) -> None:
+        """Cierra la conexión con la base."""
+
+        with self._lock:
+            self._conexion.close()
+
+    def _vigente(self, clave: str) -> Optional[tuple]:
+        """Fila ``(tipo, valor, vence)`` de la clave; si venció, la elimina."""
+
+        fila = self._conexion.execute(_LEER_PARA_ESCRIBIR, (clave,)).fetchone()
+        if fila is not None and fila[2] is not None and fila[2] <= self._reloj():
+            self._eliminar(clave)
+            self._expiraciones += 1
+            return None
+        return fila
+
+    def _longitud(self, clave: str) -> int:
+        fila = self._conexion.execute(_LEER, (clave, self._reloj())).fetchone()
+        if fila is None:
+            return 0
+        if fila[0] != _LISTA:
+            raise TypeError(f"La clave {clave!r} no contiene una lista")
+        return fila[1]
+
+    def _setex(self, clave: str, ttl: int, valor: str) -> None:
+        ahora = self._reloj()
+        self._conexion.execute(_BORRAR_ELEMENTOS, (clave,))
+        self._conexion.execute(
+            _INSERTAR, (clave, _sesion(clave), _VALOR, valor, ahora + ttl, ahora)
+        )
+
+    def _rpush(self, clave: str, valores: Sequence[str]) -> int:
+        fila = self._vigente(clave)
+        ahora = self._reloj()
+        if fila is None:
+            longitud = 0
+            self._conexion.execute(
+                _INSERTAR, (clave, _sesion(clave), _LISTA, 0, None, ahora)
+            )
+        elif fila[0] != _LISTA:
+            raise TypeError(f"La clave {clave!r} no contiene una lista")
+        else:
+            longitud = fila[1]
+        self._conexion.executemany(
+            _AGREGAR_ELEMENTO,
+            (
+                (clave, posicion, valor)
+                for posicion, valor in enumerate(valores, longitud)
+            ),
+        )
+        longitud += len(valores)
+        self._conexion.execute(_ACTUALIZAR_VALOR, (longitud, ahora, clave))
+        return longitud
+
+    def _incr(self, clave: str) -> int:
+        fila = self._vigente(clave)
+        ahora = self._reloj()
+        if fila is None:
+            self._conexion.execute(
+                _INSERTAR, (clave, _sesion(clave), _VALOR, "1", None, ahora)
+            )
+            return 1
+        if fila[0] == _LISTA:
+            raise TypeError(f"La clave {clave!r} contiene una lista")
+        valor = int(fila[1]) + 1
+        self._conexion.execute(_ACTUALIZAR_VALOR, (str(valor), ahora, clave))
+        return valor
+
+    def _eliminar(self, clave: str) -> None:
+        self._conexion.execute(_BORRAR_ELEMENTOS, (clave,))
+        self._conexion.execute(_BORRAR, (clave,))
+
+    def _barrer(self) -> int:
+        ahora = self._reloj()
+        self._conexion.execute(
+            "DELETE FROM elementos WHERE clave IN"
+            " (SELECT clave FROM claves WHERE vence <= ?)",
+            (ahora,),
+        )
+        vencidas = self._conexion.execute(
+            "DELETE FROM claves WHERE vence <= ?", (ahora,)
+        ).rowcount
+        self._expiraciones += vencidas
+        return vencidas
+
+
+class AlmacenamientoEscalonado:
+    """Sesiones activas en memoria y las demás comprimidas en SQLite.
+
+    El nivel caliente es un ``AlmacenamientoEnMemoria`` con a lo sumo
+    ``max_sesiones`` sesiones. Una sesión baja al nivel frío cuando hace
+    falta lugar (la usada hace más tiempo), en cuanto una escritura deja su
+    cabecera con ``estado_actual == "finalizado"`` o cuando lleva
+    ``inactividad`` segundos sin accesos; esto último se revisa en
+    ``barrer``, a mano o cada ``intervalo_barrido`` segundos. Al degradarla,
+    todas sus claves se guardan en una sola fila, como JSON comprimido con
+    zlib y con sus vencimientos absolutos. Cualquier operación sobre una clave
+    de una sesión fría la promueve antes de ejecutarse, así que
+    ``GestorContexto`` no distingue un nivel del otro. Como en
+    ``AlmacenamientoParticionado``, la sesión es lo que sigue a ``:`` en la
+    clave y ``cas`` solo admite claves de una misma sesión. ``registro`` debe
+    ser el mismo del codec con que se escriben las cabeceras.
+
+    Cada operación toma el lock de la franja de su sesión, que ``bloqueo``
+    comparte con ``GestorContexto``; el registro de accesos usa un lock
+    propio que solo se retiene para actualizarlo. Para hacer lugar se saltean
+    las sesiones cuya franja está ocupada por otro hilo, así que el nivel
+    caliente puede exceder ``max_sesiones`` por un momento.
+
+    El nivel caliente vive en el proceso: ``cerrar`` degrada todas las
+    sesiones para que sobrevivan al reinicio, y la base no debe compartirse
+    con otro ``AlmacenamientoEscalonado`` abierto a la vez.
+    """
+
+    def __init__(
+        self,
+        ruta: str | Path = ":memory:",
+        max_sesiones: int = 1024,
+        inactividad: float = 900.0,
+        intervalo_barrido: float | None = None,
+        timeout: float = 5.0,
+        reloj: Callable[[], float] = time.time,
+        registro: RegistroEscenarios | None = None,
+    ) -> None:
+        if max_sesiones < 1:
+            raise ValueError("max_sesiones debe ser al menos 1")
+        if inactividad <= 0:
+            raise ValueError("inactividad debe ser positiva")
+        self._caliente = AlmacenamientoEnMemoria(reloj=reloj)
+        self._frio = _NivelFrio(ruta, timeout)
+        self._max_sesiones = max_sesiones
+        self._inactividad = inactividad
+        self._reloj = reloj
+        self._registro = registro or REGISTRO_ESCENARIOS
+        self._bloqueos = _BloqueosPorSesion()
+        self._lock = threading.Lock()
+        # Sesiones calientes por último acceso, de la más antigua a la más nueva.
+        self._accesos: "OrderedDict[str, float]" = OrderedDict()
+        self._claves: Dict[str, Set[str]] = {}
+        self._finalizadas: Set[str] = set()
+        self._frias = self._frio.sesiones()
+        self._promociones = 0
+        self._degradaciones = 0
+        self._detener = threading.Event()
+        if intervalo_barrido is not None:
+            if intervalo_barrido <= 0:
+                raise ValueError("intervalo_barrido debe ser positivo")
+            threading.Thread(
+                target=_barrer_periodicamente,
+                args=(weakref.ref(self), self._detener, intervalo_barrido),
+                name="barrido-almacenamiento",
+                daemon=True,
+            ).start()
+
+    def bloqueo(self, sesion_id: str) -> threading.RLock:
+        """Lock de la franja a la que pertenece la sesión."""
+
+        return self._bloqueos(sesion_id)
+
+    def get(self, clave: str) -> Optional[str]:
+        with self.bloqueo(_sesion_de(clave)):
+            self._acceder(clave)
+            return self._caliente.get(clave)
+
+    def setex(self, clave: str, ttl: int, valor: str) -> None:
+        sesion = _sesion_de(clave)
+        with self.bloqueo(sesion):
+            self._acceder(clave, escritura=True)
+            self._caliente.setex(clave, ttl, valor)
+            if self._revisar_cabecera(sesion, clave, valor):
+                self._degradar(sesion)
+
+    def rpush(self, clave: str, *valores: str) -> int:
+        with self.bloqueo(_sesion_de(clave)):
+            self._acceder(clave, escritura=True)
+            return self._caliente.rpush(clave, *valores)
+
+    def lrange(self, clave: str, inicio: int, fin: int) -> List[str]:
+        with self.bloqueo(_sesion_de(clave)):
+            self._acceder(clave)
+            return self._caliente.lrange(clave, inicio, fin)
+
+    def llen(self, clave: str) -> int:
+        with self.bloqueo(_sesion_de(clave)):
+            self._acceder(clave)
+            return self._caliente.llen(clave)
+
+    def incr(self, clave: str) -> int:
+        with self.bloqueo(_sesion_de(clave)):
+            self._acceder(clave, escritura=True)
+            return self._caliente.incr(clave)
+
+    def cas(
+        self,
+        clave_version: str,
+        esperada: Optional[int],
+        ttl: int,
+        valores: Optional[Dict[str, str]] = None,
+        listas: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> Optional[int]:
+        """``AlmacenamientoEnMemoria.cas`` sobre claves de una misma sesión."""
+
+        sesion = _sesion_de(clave_version)
+        for clave in (*(valores or ()), *(listas or ())):
+            if _sesion_de(clave) != sesion:
+                raise ValueError(f"La clave {clave!r} pertenece a otra sesión")
+        with self.bloqueo(sesion):
+            self._acceder(clave_version, escritura=True)
+            with self._lock:
+                self._claves[sesion].update(valores or (), listas or ())
+            version = self._caliente.cas(clave_version, esperada, ttl, valores, listas)
+            finalizada = False
+            if version is not None:
+                for clave, valor in (valores or {}).items():
+                    finalizada |= self._revisar_cabecera(sesion, clave, valor)
+            if finalizada:
+                self._degradar(sesion)
+            return version
+
+    def delete(self, *claves: str) -> int:
+        eliminadas = 0
+        for clave in claves:
+            sesion = _sesion_de(clave)
+            with self.bloqueo(sesion):
+                self._acceder(clave)
+                with self._lock:
+                    self._claves.get(sesion, set()).discard(clave)
+                eliminadas += self._caliente.delete(clave)
+        return eliminadas
+
+    def expire(self, clave: str, ttl: int) -> bool:
+        """Fija el TTL de una clave existente; uno no positivo la elimina."""
+
+        with self.bloqueo(_sesion_de(clave)):
+            self._acceder(clave)
+            return self._caliente.expire(clave, ttl)
+
+    def items(self) -> Iterable:
+        """Pares ``(clave, {"valor", "timestamp"})`` de ambos niveles."""
+
+        ahora = self._reloj()
+        pares = list(self._caliente.items())
+        for datos, degradada in self._frio.todas():
+            timestamp = datetime.fromtimestamp(degradada, UTC).isoformat()
+            pares.extend(
+                (clave, {"valor": _desempaquetar(valor), "timestamp": timestamp})
+                for clave, (valor, vence) in _descomprimir(datos).items()
+                if vence is None or vence > ahora
+            )
+        return pares
+
+    def barrer(self) -> int:
+        """Elimina lo vencido y degrada las sesiones inactivas o finalizadas.
+
+        Devuelve cuántas claves calientes y sesiones frías vencidas eliminó.
+        """
+
+        ahora = self._reloj()
+        vencidas = self._caliente.barrer()
+        purgadas = self._frio.purgar(ahora)
+        limite = ahora - self._inactividad
+        with self._lock:
+            self._frias.difference_update(purgadas)
+            candidatas = list(self._finalizadas)
+            for sesion, acceso in self._accesos.items():
+                if acceso > limite:
+                    break
+                candidatas.append(sesion)
+        for sesion in candidatas:
+            with self.bloqueo(sesion):
+                with self._lock:
+                    acceso = self._accesos.get(sesion)
+                    vigente = sesion not in self._finalizadas and (
+                        acceso is None or acceso > limite
+                    )
+                if not vigente:
+                    self._degradar(sesion)
+        return vencidas + len(purgadas)
+
+    def degradar(self, sesion_id: str) -> bool:
+        """Baja una sesión al nivel frío; ``False`` si no estaba en memoria."""
+
+        with self.bloqueo(sesion_id):
+            return self._degradar(sesion_id)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Sesiones y tamaño de cada nivel, promociones y degradaciones."""
+
+        caliente = self._caliente.estadisticas()
+        bytes_frios = self._frio.tamano()
+        with self._lock:
+            return {
+                "sesiones_calientes": len(self._accesos),
+                "sesiones_frias": len(self._frias),
+                "entradas_calientes": caliente["entradas"],
+                "bytes_calientes": caliente["bytes"],
+                "bytes_frios": bytes_frios,
+                "promociones": self._promociones,
+                "degradaciones": self._degradaciones,
+                "expiraciones": caliente["expiraciones"],
+            }
+
+    def cerrar(self) -> None:
+        """Degrada todas las sesiones calientes y cierra la base."""
+
+        self._detener.set()
+        with self._lock:
+            sesiones = list(self._accesos)
+        for sesion in sesiones:
+            self.degradar(sesion)
+        self._caliente.cerrar()
+        self._frio.cerrar()
+
+    def _acceder(self, clave: str, escritura: bool = False) -> str:
+        """Promueve la sesión de ``clave`` si es fría y registra el acceso.
+
+        Requiere el lock de la franja de la sesión. Una lectura de una sesión
+        desconocida no la registra, para que las consultas fallidas no ocupen
+        lugar en el nivel caliente.
+        """
+
+        sesion = _sesion_de(clave)
+        with self._lock:
+            fria = sesion in self._frias
+            if not fria and sesion not in self._accesos and not escritura:
+                return sesion
+        if fria:
+            self._promover(sesion)
+        with self._lock:
+            self._accesos[sesion] = self._reloj()
+            self._accesos.move_to_end(sesion)
+            if escritura:
+                self._claves.setdefault(sesion, set()).add(clave)
+        self._hacer_lugar(sesion)
+        return sesion
+
+    def _hacer_lugar(self, actual: str) -> None:
+        """Degrada las sesiones usadas hace más tiempo que exceden el límite.
+
+        Solo se intenta tomar el lock de cada candidata: esperarlo mientras se
+        retiene el de ``actual`` podría trabar a dos hilos entre sí.
+        """
+
+        salteadas = 0
+        while True:
+            with self._lock:
+                if len(self._accesos) <= self._max_sesiones:
+                    return
+                sesion = next(itertools.islice(self._accesos, salteadas, None))
+            bloqueo = self.bloqueo(sesion)
+            if sesion == actual or not bloqueo.acquire(blocking=False):
+                salteadas += 1
+                if salteadas >= self._max_sesiones:
+                    return
+                continue
+            try:
+                self._degradar(sesion)
+            finally:
+                bloqueo.release()
+
+    def _promover(self, sesion: str) -> None:
+        with self._lock:
+            self._frias.discard(sesion)
+        datos = self._frio.tomar(sesion)
+        if datos is None:
+            return
+        ahora = self._reloj()
+        claves = set()
+        for clave, (valor, vence) in _descomprimir(datos).items():
+            if vence is not None and vence <= ahora:
+                continue
+            valor = _desempaquetar(valor)
+            if isinstance(valor, list):
+                self._caliente.rpush(clave, *valor)
+                if vence is not None:
+                    self._caliente.expire(clave, vence - ahora)
+            elif vence is None:
+                self._caliente.set(clave, valor)
+            else:
+                self._caliente.setex(clave, vence - ahora, valor)
+            claves.add(clave)
+            self._revisar_cabecera(sesion, clave, valor)
+        with self._lock:
+            self._claves.setdefault(sesion, set()).update(claves)
+            self._promociones += 1
+
+    def _degradar(self, sesion: str) -> bool:
+        """Guarda la sesión en el nivel frío; requiere el lock de su franja."""
+
+        with self._lock:
+            self._accesos.pop(sesion, None)
+            self._finalizadas.discard(sesion)
+            claves = sorted(self._claves.pop(sesion, ()))
+        ahora = self._reloj()
+        registros: Dict[str, list] = {}
+        for clave in claves:
+            restante = self._caliente.ttl(clave)
+            if restante == -2:
+                continue
+            try:
+                valor = self._caliente.get(clave)
+            except TypeError:
+                valor = self._caliente.lrange(clave, 0, -1)
+            vence = None if restante == -1 else ahora + restante
+            registros[clave] = [_empaquetar(valor), vence]
+        self._caliente.delete(*claves)
+        if not registros:
+            return False
+        vencimientos = [vence for _, vence in registros.values()]
+        vence = None if None in vencimientos else max(vencimientos)
+        self._frio.guardar(sesion, _comprimir(registros), vence, ahora)
+        with self._lock:
+            self._frias.add(sesion)
+            self._degradaciones += 1
+        return True
+
+    def _revisar_cabecera(self, sesion: str, clave: str, valor) -> bool:
+        """Registra si la cabecera escrita finaliza la sesión y lo devuelve."""
+
+        if clave != _clave(sesion):
+            return False
+        try:
+            cabecera = decodificar_cabecera(valor, self._registro)
+            finalizada = cabecera.estado_actual == "finalizado"
+        except (ValueError, KeyError, TypeError, IndexError):
+            return False
+        with self._lock:
+            if finalizada:
+                self._finalizadas.add(sesion)
+            else:
+                self._finalizadas.discard(sesion)
+        return finalizada
+
+
+class _NivelFrio:
+    """Una fila por sesión degradada con todas sus claves comprimidas.
+
+    Cada método usa la conexión bajo un lock propio, porque la comparten los
+    hilos que promueven y degradan sesiones de franjas distintas.
+    """
+
+    def __init__(self, ruta: str | Path, timeout: float) -> None:
+        self._conexion = sqlite3.connect(
+            str(ruta), timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        for sentencia in _ESQUEMA_FRIO:
+            self._conexion.execute(sentencia)
+
+    def sesiones(self) -> Set[str]:
+        with self._lock:
+            filas = self._conexion.execute("SELECT sesion_id FROM sesiones_frias")
+            return {sesion_id for (sesion_id,) in filas}
+
+    def guardar(
+        self, sesion_id: str, datos: bytes, vence: Optional[float], ahora: float
+    ) -> None:
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO sesiones_frias"
+                " (sesion_id, datos, vence, degradada) VALUES (?, ?, ?, ?)",
+                (sesion_id, datos, vence, ahora),
+            )
+
+    def tomar(self, sesion_id: str) -> Optional[bytes]:
+        """Quita la fila de la sesión y devuelve sus datos."""
+
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT datos FROM sesiones_frias WHERE sesion_id = ?", (sesion_id,)
+            ).fetchone()
+            if fila is None:
+                return None
+            self._conexion.execute(
+                "DELETE FROM sesiones_frias WHERE sesion_id = ?", (sesion_id,)
+            )
+            return fila[0]
+
+    def todas(self) -> List[Tuple[bytes, float]]:
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT datos, degradada FROM sesiones_frias ORDER BY sesion_id"
+            ).fetchall()
+
+    def purgar(self, ahora: float) -> List[str]:
+        """Elimina las sesiones cuyas claves vencieron todas; devuelve sus ids."""
+
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT sesion_id FROM sesiones_frias WHERE vence <= ?", (ahora,)
+            ).fetchall()
+            self._conexion.execute(
+                "DELETE FROM sesiones_frias WHERE vence <= ?", (ahora,)
+            )
+            return [sesion_id for (sesion_id,) in filas]
+
+    def tamano(self) -> int:
+        with self._lock:
+            (total,) = self._conexion.execute(
+                "SELECT COALESCE(SUM(LENGTH(datos)), 0) FROM sesiones_frias"
+            ).fetchone()
+            return total
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+
+def _sesion(clave: str) -> str:
+    return clave.partition(":")[2]
+
+
+def _sesion_de(clave: str) -> str:
+    return _sesion(clave) or clave
+
+
+def _empaquetar(valor):
+    """Valor apto para JSON: los ``bytes`` del codec binario van en base64."""
+
+    if isinstance(valor, list):
+        return [_empaquetar(elemento) for elemento in valor]
+    if isinstance(valor, (bytes, bytearray)):
+        return {"b64": base64.b64encode(valor).decode("ascii")}
+    return valor
+
+
+def _desempaquetar(valor):
+    if isinstance(valor, list):
+        return [_desempaquetar(elemento) for elemento in valor]
+    if isinstance(valor, dict):
+        return base64.b64decode(valor["b64"])
+    return valor
+
+
+def _comprimir(registros: Dict[str, list]) -> bytes:
+    texto = json.dumps(registros, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(texto.encode("utf-8"))
+
+
+def _descomprimir(datos: bytes) -> Dict[str, list]:
+    return json.loads(zlib.decompress(datos))
+
+
+def _instante(momento: datetime) -> str:
+    """ISO-8601 en UTC, para que el orden del texto sea el orden temporal."""
+
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=UTC)
+    return momento.astimezone(UTC).isoformat(timespec="microseconds")
+
+
+def _resultado_desde_json(datos: str) -> ResultadoEvaluacion:
+    payload = json.loads(datos)
+    payload["escenario"] = REGISTRO_ESCENARIOS.compartir(
+        desde_dict(EscenarioObra, payload["escenario"])
+    )
+    return desde_dict(ResultadoEvaluacion, payload)
+
+
+__all__ = ["AlmacenamientoEscalonado", "AlmacenamientoSQLite"]
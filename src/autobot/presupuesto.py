@@ -0,0 +1,202 @@
+"""Ensamblado de transcripciones acotado por un presupuesto de tokens."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Literal, Sequence, Tuple
+
+from .models import MensajeConversacion
+
+NivelDetalle = Literal["completo", "extracto", "omitido"]
+
+
+def estimar_tokens(texto: str) -> int:
+    """Aproxima los tokens de un texto sin depender de un tokenizador externo.
+
+    Usa la regla habitual de unos cuatro caracteres por token, suficiente para
+    decidir qué turnos entran en el prompt.
+    """
+
+    return (len(texto) + 3) // 4
+
+
+def renderizar_turno(mensaje: MensajeConversacion) -> str:
+    """Formato de un turno completo dentro del prompt de evaluación."""
+
+    return f"Turno {mensaje.turno} ({mensaje.rol}): {mensaje.contenido}"
+
+
+class EnsambladorTranscripcion:
+    """Construye la transcripción de una conversación sin superar el presupuesto.
+
+    Prioriza los ``turnos_recientes`` finales y los turnos marcados como
+    relevantes. Si ni siquiera ellos caben, se reducen a extractos y, si aún
+    sobra, se omiten empezando por los más antiguos. El resto se incorpora del
+    más nuevo al más antiguo: completo si cabe, como extracto si no, y los
+    tramos que no entran se resumen en una línea que indica el rango de turnos
+    omitidos. Los números de turno se mantienen para que las evidencias sigan
+    siendo válidas. Solo un presupuesto menor que esa línea de resumen puede
+    quedar excedido.
+    """
+
+    def __init__(
+        self,
+        presupuesto_tokens: int,
+        turnos_recientes: int = 4,
+        max_caracteres_extracto: int = 80,
+    ) -> None:
+        if presupuesto_tokens < 1:
+            raise ValueError("El presupuesto de tokens debe ser positivo")
+        self._presupuesto = presupuesto_tokens
+        self._turnos_recientes = turnos_recientes
+        self._max_caracteres_extracto = max_caracteres_extracto
+
+    def ensamblar(
+        self,
+        historial: Sequence[MensajeConversacion],
+        turnos_relevantes: Iterable[int] = (),
+    ) -> str:
+        """Devuelve la transcripción ajustada al presupuesto configurado."""
+
+        completos = [renderizar_turno(mensaje) for mensaje in historial]
+        costos_completos = [estimar_tokens(linea) for linea in completos]
+        if sum(costos_completos) + len(completos) <= self._presupuesto:
+            return "\n".join(completos)
+
+        extractos = [self._extracto(mensaje) for mensaje in historial]
+        costos_extractos = [estimar_tokens(linea) for linea in extractos]
+
+        def costo_tramo(desde: int, hasta: int) -> int:
+            if desde > hasta:
+                return 0
+            return estimar_tokens(self._resumen(historial, desde, hasta)) + 1
+
+        relevantes = set(turnos_relevantes)
+        inicio_recientes = max(len(historial) - self._turnos_recientes, 0)
+        prioritarios = [
+            indice
+            for indice, mensaje in enumerate(historial)
+            if indice >= inicio_recientes or mensaje.turno in relevantes
+        ]
+        niveles: List[NivelDetalle] = ["omitido"] * len(historial)
+        anterior: Dict[int, int] = {}
+        siguiente: Dict[int, int] = {}
+        total = 0
+        previo = -1
+        for indice in prioritarios:
+            niveles[indice] = "completo"
+            total += costo_tramo(previo + 1, indice - 1) + costos_completos[indice] + 1
+            anterior[indice], siguiente[previo] = previo, indice
+            previo = indice
+        total += costo_tramo(previo + 1, len(historial) - 1)
+        siguiente[previo] = len(historial)
+        anterior[len(historial)] = previo
+
+        # Los prioritarios que no caben pasan a extracto y, si no alcanza, se
+        # omiten del más antiguo al más reciente fusionando los tramos vecinos.
+        for indice in prioritarios:
+            if total <= self._presupuesto:
+                break
+            if costos_extractos[indice] < costos_completos[indice]:
+                total += costos_extractos[indice] - costos_completos[indice]
+                niveles[indice] = "extracto"
+        for indice in prioritarios:
+            if total <= self._presupuesto:
+                break
+            izquierda, derecha = anterior[indice], siguiente[indice]
+            costo = (
+                costos_completos[indice]
+                if niveles[indice] == "completo"
+                else costos_extractos[indice]
+            )
+            total += (
+                costo_tramo(izquierda + 1, derecha - 1)
+                - costo_tramo(izquierda + 1, indice - 1)
+                - costo_tramo(indice + 1, derecha - 1)
+                - costo
+                - 1
+            )
+            niveles[indice] = "omitido"
+            siguiente[izquierda], anterior[derecha] = derecha, izquierda
+
+        # Con los prioritarios fijados, cada turno restante solo parte el tramo
+        # omitido que lo contiene, así que el costo se actualiza en O(1).
+        fijado_previo: List[int] = []
+        ultimo = -1
+        for nivel in niveles:
+            fijado_previo.append(ultimo)
+            if nivel != "omitido":
+                ultimo = len(fijado_previo) - 1
+        descartados = set(prioritarios)
+        hasta = len(historial) - 1
+        for indice in range(len(historial) - 1, -1, -1):
+            if niveles[indice] != "omitido":
+                hasta = indice - 1
+                continue
+            if indice in descartados:
+                continue
+            desde = fijado_previo[indice] + 1
+            base = (
+                total
+                - costo_tramo(desde, hasta)
+                + costo_tramo(desde, indice - 1)
+                + costo_tramo(indice + 1, hasta)
+                + 1
+            )
+            for nivel, costo in (
+                ("completo", costos_completos[indice]),
+                ("extracto", costos_extractos[indice]),
+            ):
+                if base + costo <= self._presupuesto:
+                    niveles[indice] = nivel
+                    total = base + costo
+                    hasta = indice - 1
+                    break
+
+        lineas: List[str] = []
+        tramos = {desde: hasta for desde, hasta in self._tramos_omitidos(niveles)}
+        indice = 0
+        while indice < len(historial):
+            if indice in tramos:
+                lineas.append(self._resumen(historial, indice, tramos[indice]))
+                indice = tramos[indice] + 1
+                continue
+            lineas.append(
+                completos[indice]
+                if niveles[indice] == "completo"
+                else extractos[indice]
+            )
+            indice += 1
+        return "\n".join(lineas)
+
+    def _extracto(self, mensaje: MensajeConversacion) -> str:
+        contenido = " ".join(mensaje.contenido.split())
+        if len(contenido) > self._max_caracteres_extracto:
+            contenido = contenido[: self._max_caracteres_extracto].rstrip() + "…"
+        return f"Turno {mensaje.turno} ({mensaje.rol}, extracto): {contenido}"
+
+    @staticmethod
+    def _tramos_omitidos(niveles: Sequence[NivelDetalle]) -> List[Tuple[int, int]]:
+        tramos: List[Tuple[int, int]] = []
+        desde = None
+        for indice, nivel in enumerate(niveles):
+            if nivel == "omitido" and desde is None:
+                desde = indice
+            elif nivel != "omitido" and desde is not None:
+                tramos.append((desde, indice - 1))
+                desde = None
+        if desde is not None:
+            tramos.append((desde, len(niveles) - 1))
+        return tramos
+
+    @staticmethod
+    def _resumen(
+        historial: Sequence[MensajeConversacion], desde: int, hasta: int
+    ) -> str:
+        primero, ultimo = historial[desde].turno, historial[hasta].turno
+        cantidad = hasta - desde + 1
+        if cantidad == 1:
+            return f"Turno {primero}: [omitido por longitud]"
+        return f"Turnos {primero}-{ultimo}: [{cantidad} mensajes omitidos por longitud]"
+
+
+__all__ = ["EnsambladorTranscripcion", "estimar_tokens", "renderizar_turno"]
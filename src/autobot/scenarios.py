@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from .models import EscenarioObra
 
+VERSION_CATALOGO = 1
+"""Versión de ``ESCENARIOS_OBRA``; se incrementa al modificar una entrada."""
 
 ESCENARIOS_OBRA: List[EscenarioObra] = [
     EscenarioObra(
@@ -123,3 +125,64 @@ ESCENARIOS_OBRA: List[EscenarioObra] = [
         tiempo_estimado_resolucion=5,
     ),
 ]
+
+
+class RegistroEscenarios:
+    """Índice de escenarios por ``id`` que comparte una instancia por escenario.
+
+    Las sesiones guardan solo ``(id, version)`` de los escenarios del catálogo
+    y los resuelven aquí al leerse. Las versiones anteriores deben registrarse
+    con ``registrar(..., version=...)`` antes de leer sesiones que las usen;
+    nunca se sustituyen por la vigente, que podría tener otro contenido.
+    """
+
+    def __init__(
+        self, escenarios: Iterable[EscenarioObra] = (), version: int = VERSION_CATALOGO
+    ) -> None:
+        self.version = version
+        self._vigentes: Dict[str, EscenarioObra] = {}
+        self._versiones: Dict[Tuple[str, int], EscenarioObra] = {}
+        for escenario in escenarios:
+            self.registrar(escenario)
+
+    def registrar(
+        self, escenario: EscenarioObra, version: Optional[int] = None
+    ) -> None:
+        """Agrega un escenario al catálogo vigente o a una versión anterior."""
+
+        version = self.version if version is None else version
+        self._versiones[(escenario.id, version)] = escenario
+        if version == self.version:
+            self._vigentes[escenario.id] = escenario
+
+    def obtener(self, escenario_id: str) -> Optional[EscenarioObra]:
+        return self._vigentes.get(escenario_id)
+
+    def referencia(self, escenario: EscenarioObra) -> Optional[Tuple[str, int]]:
+        """``(id, version)`` si el escenario es el del catálogo, o ``None``."""
+
+        vigente = self._vigentes.get(escenario.id)
+        if vigente is not None and (vigente is escenario or vigente == escenario):
+            return escenario.id, self.version
+        return None
+
+    def resolver(self, escenario_id: str, version: int) -> EscenarioObra:
+        escenario = self._versiones.get((escenario_id, version))
+        if escenario is not None:
+            return escenario
+        if escenario_id not in self._vigentes:
+            raise KeyError(f"Escenario desconocido en el catálogo: {escenario_id!r}")
+        raise ValueError(
+            f"Versión {version} del catálogo no registrada para {escenario_id!r} "
+            f"(vigente: {self.version})"
+        )
+
+    def compartir(self, escenario: EscenarioObra) -> EscenarioObra:
+        """Devuelve la instancia del catálogo si es equivalente a ``escenario``."""
+
+        if self.referencia(escenario) is None:
+            return escenario
+        return self._vigentes[escenario.id]
+
+
+REGISTRO_ESCENARIOS = RegistroEscenarios(ESCENARIOS_OBRA)
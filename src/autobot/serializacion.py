@@ -0,0 +1,248 @@
+"""Conversión de los modelos a diccionarios JSON y de vuelta, generada por clase.
+
+``dataclasses.asdict`` recorre cada instancia por reflexión, copia en
+profundidad todas las colecciones y deja fechas y enumerados para un
+``default=`` de ``json.dumps``. Aquí, la primera vez que se pide una clase se
+genera código fuente específico a partir de sus campos y anotaciones: un
+serializador que produce directamente valores aptos para JSON (fechas en
+ISO-8601, enumerados por su valor) y un deserializador que hace el camino
+inverso. Las funciones quedan en caché por clase.
+
+Para no copiar, las listas y diccionarios de valores primitivos se comparten
+con la instancia: el diccionario devuelto por ``a_dict`` es para serializarlo
+de inmediato, no para modificarlo. Al deserializar, los campos con valor por
+omisión pueden faltar y un valor que ya es instancia del modelo se conserva
+tal cual, lo que permite resolver antes algunas partes (por ejemplo, los
+escenarios por referencia). Si la clase define ``_tiene_<campo>``, ese
+diccionario se serializa vacío mientras no exista, en lugar de crearlo al
+leerlo.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import inspect
+import itertools
+import threading
+import typing
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+Serializador = Callable[[Any], Dict[str, Any]]
+Deserializador = Callable[[Dict[str, Any]], Any]
+
+_PRIMITIVOS = (str, int, float, bool, type(None))
+
+_serializadores: Dict[Tuple[type, Tuple[str, ...]], Serializador] = {}
+_deserializadores: Dict[type, Deserializador] = {}
+_bloqueo = threading.RLock()
+
+
+def a_dict(objeto: Any) -> Dict[str, Any]:
+    """Convierte una instancia de un modelo en un diccionario apto para JSON."""
+
+    return serializador(type(objeto))(objeto)
+
+
+def desde_dict(clase: Type[T], datos: Dict[str, Any]) -> T:
+    """Reconstruye una instancia de ``clase`` a partir de ``a_dict``."""
+
+    return deserializador(clase)(datos)
+
+
+def serializador(clase: type, excluir: Iterable[str] = ()) -> Serializador:
+    """Serializador generado para ``clase``, omitiendo los campos ``excluir``."""
+
+    clave = (clase, tuple(sorted(excluir)))
+    funcion = _serializadores.get(clave)
+    if funcion is None:
+        with _bloqueo:
+            funcion = _serializadores.get(clave)
+            if funcion is None:
+                funcion = _generar_serializador(clase, clave[1])
+                _serializadores[clave] = funcion
+    return funcion
+
+
+def deserializador(clase: type) -> Deserializador:
+    """Deserializador generado para ``clase``."""
+
+    funcion = _deserializadores.get(clase)
+    if funcion is None:
+        with _bloqueo:
+            funcion = _deserializadores.get(clase)
+            if funcion is None:
+                funcion = _generar_deserializador(clase)
+                _deserializadores[clase] = funcion
+    return funcion
+
+
+class _Generador:
+    """Acumula el código y los nombres globales de una función generada."""
+
+    def __init__(self) -> None:
+        self.espacio: Dict[str, Any] = {}
+        self._contador = itertools.count()
+
+    def nombre(self, valor: Any) -> str:
+        nombre = f"_g{next(self._contador)}"
+        self.espacio[nombre] = valor
+        return nombre
+
+    def variable(self) -> str:
+        return f"_v{next(self._contador)}"
+
+    def compilar(self, nombre: str, codigo: str) -> Callable:
+        exec(compile(codigo, f"<serializacion {nombre}>", "exec"), self.espacio)
+        return self.espacio[nombre]
+
+
+def _generar_serializador(clase: type, excluir: Tuple[str, ...]) -> Serializador:
+    generador = _Generador()
+    tipos = _tipos_de_campos(clase)
+    lineas = []
+    for campo in dataclasses.fields(clase):
+        if campo.name in excluir:
+            continue
+        expresion = _serializar(tipos[campo.name], f"obj.{campo.name}", generador)
+        if hasattr(clase, f"_tiene_{campo.name}"):
+            # Diccionario creado a demanda: si no existe se emite vacío sin crearlo.
+            expresion = f"({expresion} if obj._tiene_{campo.name}() else {{}})"
+        lineas.append(f"    {campo.name!r}: {expresion},")
+    nombre = f"a_dict_{clase.__name__}"
+    codigo = f"def {nombre}(obj):\n  return {{\n" + "\n".join(lineas) + "\n  }\n"
+    return generador.compilar(nombre, codigo)
+
+
+def _generar_deserializador(clase: type) -> Deserializador:
+    generador = _Generador()
+    tipos = _tipos_de_campos(clase)
+    parametros = inspect.signature(clase).parameters
+    requeridos = []
+    opcionales = []
+    for campo in dataclasses.fields(clase):
+        if not campo.init:
+            continue
+        if parametros[campo.name].default is inspect.Parameter.empty:
+            expresion = _deserializar(
+                tipos[campo.name], f"datos[{campo.name!r}]", generador
+            )
+            requeridos.append(f"    {campo.name}={expresion},")
+            continue
+        expresion = _deserializar(tipos[campo.name], "valor", generador)
+        if _omitible_si_vacio(
+            campo, tipos[campo.name], parametros[campo.name].default
+        ):
+            # El valor por omisión equivale a un contenedor vacío: no se crea uno.
+            opcionales.append(
+                f"  valor = datos.get({campo.name!r})\n"
+                f"  if valor:\n    kwargs[{campo.name!r}] = {expresion}\n"
+            )
+        else:
+            opcionales.append(
+                f"  if {campo.name!r} in datos:\n"
+                f"    valor = datos[{campo.name!r}]\n"
+                f"    kwargs[{campo.name!r}] = {expresion}\n"
+            )
+    nombre = f"desde_dict_{clase.__name__}"
+    codigo = (
+        f"def {nombre}(datos):\n  kwargs = {{}}\n"
+        + "".join(opcionales)
+        + f"  return {generador.nombre(clase)}(\n"
+        + "\n".join(requeridos)
+        + "\n    **kwargs,\n  )\n"
+    )
+    return generador.compilar(nombre, codigo)
+
+
+def _tipos_de_campos(clase: type) -> Dict[str, Any]:
+    if not dataclasses.is_dataclass(clase):
+        raise TypeError(f"{clase.__name__} no es una dataclass")
+    return typing.get_type_hints(clase)
+
+
+def _omitible_si_vacio(campo: dataclasses.Field, tipo: Any, omision: Any) -> bool:
+    if typing.get_origin(tipo) not in (list, dict):
+        return False
+    return omision is None or campo.default_factory in (list, dict)
+
+
+def _serializar(tipo: Any, expresion: str, generador: _Generador) -> str:
+    if _es_primitivo(tipo):
+        return expresion
+    origen, argumentos = typing.get_origin(tipo), typing.get_args(tipo)
+    if origen is typing.Union:
+        interno = _serializar(_sin_none(argumentos), expresion, generador)
+        return f"(None if {expresion} is None else {interno})"
+    if origen is list:
+        variable = generador.variable()
+        elemento = _serializar(argumentos[0], variable, generador)
+        return f"[{elemento} for {variable} in {expresion}]"
+    if origen is dict:
+        variable = generador.variable()
+        valor = _serializar(argumentos[1], variable, generador)
+        return f"{{_k: {valor} for _k, {variable} in {expresion}.items()}}"
+    if isinstance(tipo, type) and issubclass(tipo, Enum):
+        return f"{expresion}.value"
+    if tipo is datetime:
+        return f"{expresion}.isoformat()"
+    if dataclasses.is_dataclass(tipo):
+        return f"{generador.nombre(serializador(tipo))}({expresion})"
+    raise TypeError(f"Tipo de campo no soportado: {tipo!r}")
+
+
+def _deserializar(tipo: Any, expresion: str, generador: _Generador) -> str:
+    if _es_primitivo(tipo):
+        return expresion
+    origen, argumentos = typing.get_origin(tipo), typing.get_args(tipo)
+    if origen is typing.Union:
+        interno = _deserializar(_sin_none(argumentos), expresion, generador)
+        return f"(None if {expresion} is None else {interno})"
+    if origen is list:
+        variable = generador.variable()
+        elemento = _deserializar(argumentos[0], variable, generador)
+        return f"[{elemento} for {variable} in {expresion}]"
+    if origen is dict:
+        variable = generador.variable()
+        valor = _deserializar(argumentos[1], variable, generador)
+        return f"{{_k: {valor} for _k, {variable} in {expresion}.items()}}"
+    if isinstance(tipo, type) and issubclass(tipo, Enum):
+        return f"{generador.nombre(tipo)}({expresion})"
+    if tipo is datetime:
+        return f"{generador.nombre(datetime.fromisoformat)}({expresion})"
+    if dataclasses.is_dataclass(tipo):
+        clase = generador.nombre(tipo)
+        funcion = generador.nombre(deserializador(tipo))
+        return (
+            f"({expresion} if isinstance({expresion}, {clase})"
+            f" else {funcion}({expresion}))"
+        )
+    raise TypeError(f"Tipo de campo no soportado: {tipo!r}")
+
+
+def _es_primitivo(tipo: Any) -> bool:
+    """Valores y contenedores de valores que JSON representa tal cual."""
+
+    if tipo in _PRIMITIVOS or tipo is Any:
+        return True
+    origen, argumentos = typing.get_origin(tipo), typing.get_args(tipo)
+    if origen is typing.Literal:
+        return True
+    if origen is typing.Union or origen is list:
+        return all(_es_primitivo(argumento) for argumento in argumentos)
+    if origen is dict:
+        return argumentos[0] is str and _es_primitivo(argumentos[1])
+    return False
+
+
+def _sin_none(argumentos: Tuple[Any, ...]) -> Any:
+    restantes = [argumento for argumento in argumentos if argumento is not type(None)]
+    if len(restantes) != 1:
+        raise TypeError(f"Unión no soportada: {argumentos!r}")
+    return restantes[0]
+
+
+__all__ = ["a_dict", "desde_dict", "deserializador", "serializador"]
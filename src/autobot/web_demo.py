@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import json
+import uuid
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Tuple
 
+from .context import AlmacenamientoParticionado
 from .demo import ejecutar_demo
 
 Address = Tuple[str, int]
@@ -16,6 +18,7 @@ class _DemoRequestHandler(SimpleHTTPRequestHandler):
     """Atiende solicitudes HTTP y expone el endpoint ``/api/demo``."""
 
     directorio_estatico: Path
+    almacenamiento: AlmacenamientoParticionado
 
     def __init__(self, *args, directory: str | None = None, **kwargs) -> None:
         super().__init__(*args, directory=directory, **kwargs)
@@ -31,7 +34,9 @@ class _DemoRequestHandler(SimpleHTTPRequestHandler):
             return super().do_GET()
 
         if self.path == "/api/demo":
-            resultado = ejecutar_demo()
+            resultado = ejecutar_demo(
+                almacenamiento=self.almacenamiento, sesion_id=f"web-{uuid.uuid4().hex}"
+            )
             payload = json.dumps({"report": resultado}, ensure_ascii=False).encode(
                 "utf-8"
             )
@@ -59,13 +64,23 @@ def obtener_directorio_estatico(base: Path | None = None) -> Path:
 
 
 def crear_servidor(
-    direccion: Address, directorio_estatico: Path | None = None
+    direccion: Address,
+    directorio_estatico: Path | None = None,
+    almacenamiento: AlmacenamientoParticionado | None = None,
 ) -> ThreadingHTTPServer:
-    """Crea un servidor HTTP listo para ejecutarse con ``serve_forever``."""
+    """Crea un servidor HTTP listo para ejecutarse con ``serve_forever``.
+
+    Todas las solicitudes comparten ``almacenamiento``, particionado para que
+    los hilos del servidor no compitan por un único lock; por defecto las
+    sesiones vencen según su TTL y se barren cada minuto.
+    """
 
     static_dir = directorio_estatico or obtener_directorio_estatico()
+    compartido = almacenamiento or AlmacenamientoParticionado(intervalo_barrido=60)
 
     class Handler(_DemoRequestHandler):
+        almacenamiento = compartido
+
         def __init__(self, *args, **kwargs):
             super().__init__(*args, directory=str(static_dir), **kwargs)
 
@@ -13,6 +13,7 @@ from evaluador_agentes import (
     AdaptadorCanal
 )
 import json
+import tempfile
 
 
 def test_adaptador_canal():
@@ -87,43 +88,45 @@ def test_chatbot_interactivo():
     print("TEST: Chatbot Interactivo (Simulado)")
     print("=" * 60)
     
-    chatbot = EvaluadorChatbot()
-    
-    # Test 1: Intentar responder sin iniciar test
-    print("\n1. Intentar responder sin COMENZAR TEST:")
-    respuesta = chatbot.procesar_comando("Hola")
-    print(respuesta[:80] + "...")
-    
-    # Test 2: Iniciar test
-    print("\n2. Iniciar test con COMENZAR TEST:")
-    respuesta = chatbot.procesar_comando("COMENZAR TEST")
-    print(respuesta[:200] + "...\n")
-    
-    # Test 3: Responder como agente
-    print("3. Respuesta del agente:")
-    respuesta = chatbot.procesar_comando(
-        "Lamento mucho su situación. Entiendo completamente su frustración. "
-        "Voy a revisar su caso inmediatamente y le daré una solución en los próximos minutos."
-    )
-    print(respuesta[:200] + "...\n")
-    
-    # Test 4: Ver puntaje actual
-    print("4. Ver puntaje actual con /score_now:")
-    respuesta = chatbot.procesar_comando("/score_now")
-    print(respuesta[:300] + "...\n")
-    
-    # Test 5: Continuar con otra respuesta
-    print("5. Otra respuesta del agente:")
-    respuesta = chatbot.procesar_comando(
-        "He verificado su pedido y veo que hubo un retraso en el almacén. "
-        "Voy a enviárselo con envío express sin costo adicional. Llegará mañana."
-    )
-    print(respuesta[:200] + "...\n")
-    
-    # Test 6: Finalizar
-    print("6. Finalizar test con /finalizar:")
-    respuesta = chatbot.procesar_comando("/finalizar")
-    print(respuesta[:400] + "...\n")
+    # El informe JSON de /finalizar se escribe en un directorio temporal
+    with tempfile.TemporaryDirectory() as directorio:
+        chatbot = EvaluadorChatbot(directorio_informes=directorio)
+    
+        # Test 1: Intentar responder sin iniciar test
+        print("\n1. Intentar responder sin COMENZAR TEST:")
+        respuesta = chatbot.procesar_comando("Hola")
+        print(respuesta[:80] + "...")
+    
+        # Test 2: Iniciar test
+        print("\n2. Iniciar test con COMENZAR TEST:")
+        respuesta = chatbot.procesar_comando("COMENZAR TEST")
+        print(respuesta[:200] + "...\n")
+    
+        # Test 3: Responder como agente
+        print("3. Respuesta del agente:")
+        respuesta = chatbot.procesar_comando(
+            "Lamento mucho su situación. Entiendo completamente su frustración. "
+            "Voy a revisar su caso inmediatamente y le daré una solución en los próximos minutos."
+        )
+        print(respuesta[:200] + "...\n")
+    
+        # Test 4: Ver puntaje actual
+        print("4. Ver puntaje actual con /score_now:")
+        respuesta = chatbot.procesar_comando("/score_now")
+        print(respuesta[:300] + "...\n")
+    
+        # Test 5: Continuar con otra respuesta
+        print("5. Otra respuesta del agente:")
+        respuesta = chatbot.procesar_comando(
+            "He verificado su pedido y veo que hubo un retraso en el almacén. "
+            "Voy a enviárselo con envío express sin costo adicional. Llegará mañana."
+        )
+        print(respuesta[:200] + "...\n")
+    
+        # Test 6: Finalizar
+        print("6. Finalizar test con /finalizar:")
+        respuesta = chatbot.procesar_comando("/finalizar")
+        print(respuesta[:400] + "...\n")
     
     print("✓ Test de chatbot interactivo completado\n")
 
@@ -0,0 +1,183 @@
+"""Fixtures compartidas por las pruebas."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from dataclasses import asdict
+from datetime import UTC, datetime, timedelta
+from enum import Enum
+from typing import Callable, Iterable
+
+import pytest
+
+from autobot.models import (
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    EscenarioObra,
+    MensajeConversacion,
+    PersonalidadCliente,
+)
+from autobot.scenarios import ESCENARIOS_OBRA
+
+INICIO = datetime(2026, 1, 1, 9, 0, tzinfo=UTC)
+
+
+class LLMContador:
+    """Cuenta las invocaciones recibidas y responde siempre lo mismo."""
+
+    def __init__(self) -> None:
+        self.llamadas = 0
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del prompt, temperature, max_tokens
+        self.llamadas += 1
+        return (
+            "PUNTAJE: 3\n"
+            "JUSTIFICACION: Correcto.\n"
+            "EVIDENCIAS:\n"
+            '- Turno 1: "Hola" (impacto=neutral)'
+        )
+
+
+class LLMLento:
+    """Cuenta las llamadas, tarda ``demora`` segundos y opcionalmente falla."""
+
+    def __init__(self, demora: float = 0.01, error: Exception | None = None) -> None:
+        self.demora = demora
+        self.error = error
+        self.llamadas = 0
+        self._lock = threading.Lock()
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del prompt, temperature, max_tokens
+        with self._lock:
+            self.llamadas += 1
+        await asyncio.sleep(self.demora)
+        if self.error is not None:
+            raise self.error
+        return "PUNTAJE: 4\nJUSTIFICACION: Bien."
+
+
+class LLMRegistro:
+    """Registra los prompts recibidos y responde con un puntaje fijo."""
+
+    def __init__(self, puntaje: int = 3, turno: int = 1) -> None:
+        self.puntaje = puntaje
+        self.turno = turno
+        self.prompts: list[str] = []
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del temperature, max_tokens
+        self.prompts.append(prompt)
+        return (
+            f"PUNTAJE: {self.puntaje}\n"
+            "JUSTIFICACION: Actualizado.\n"
+            "EVIDENCIAS:\n"
+            f'- Turno {self.turno}: "Cita {self.turno}" (impacto=positivo)'
+        )
+
+
+def _crear_mensaje(
+    turno: int,
+    rol: str | None = None,
+    contenido: str | None = None,
+    **cambios,
+) -> MensajeConversacion:
+    datos = dict(
+        turno=turno,
+        rol=rol or ("cliente" if turno % 2 else "agente"),
+        contenido=f"Mensaje número {turno}" if contenido is None else contenido,
+        timestamp=INICIO + timedelta(minutes=turno),
+    )
+    datos.update(cambios)
+    return MensajeConversacion(**datos)
+
+
+def _crear_contexto(
+    sesion_id: str = "prueba",
+    historial: Iterable[MensajeConversacion] = (),
+    *,
+    personalidad: PersonalidadCliente = PersonalidadCliente.ENOJADO_IMPACIENTE,
+    canal: CanalComunicacion = CanalComunicacion.CHAT,
+    escenario: EscenarioObra = ESCENARIOS_OBRA[0],
+    timestamp_inicio: datetime = INICIO,
+    estado_actual: str = "en_progreso",
+    **cambios,
+) -> ContextoConversacion:
+    return ContextoConversacion(
+        sesion_id=sesion_id,
+        configuracion=ConfiguracionSimulacion(
+            personalidad=personalidad,
+            canal=canal,
+            escenario=escenario,
+            timestamp_inicio=timestamp_inicio,
+        ),
+        estado_actual=estado_actual,
+        historial=list(historial),
+        **cambios,
+    )
+
+
+def _valor_json(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, Enum):
+        return valor.value
+    raise TypeError(f"Tipo no serializable: {type(valor)!r}")
+
+
+@pytest.fixture()
+def json_asdict() -> Callable[[object], str]:
+    """JSON de referencia vía ``asdict``, como se guardaban las sesiones antes."""
+
+    return lambda objeto: json.dumps(asdict(objeto), default=_valor_json)
+
+
+@pytest.fixture()
+def crear_mensaje() -> Callable[..., MensajeConversacion]:
+    """Fábrica de mensajes con rol alternado y marcas de tiempo deterministas."""
+
+    return _crear_mensaje
+
+
+@pytest.fixture()
+def crear_reclamo() -> Callable[[int], MensajeConversacion]:
+    """Fábrica de mensajes que mencionan un número de pedido y una demora."""
+
+    def construir(turno: int) -> MensajeConversacion:
+        return _crear_mensaje(
+            turno, contenido=f"Turno {turno}: el pedido #{turno} hace días que no llega"
+        )
+
+    return construir
+
+
+@pytest.fixture()
+def crear_contexto() -> Callable[..., ContextoConversacion]:
+    """Fábrica de contextos; los argumentos extra van a ``ContextoConversacion``."""
+
+    return _crear_contexto
+
+
+@pytest.fixture()
+def llm_contador() -> LLMContador:
+    return LLMContador()
+
+
+@pytest.fixture()
+def llm_lento() -> LLMLento:
+    return LLMLento()
+
+
+@pytest.fixture()
+def llm_registro() -> LLMRegistro:
+    return LLMRegistro()
@@ -0,0 +1,311 @@
+"""Pruebas del almacenamiento asíncrono y del cliente RESP."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from autobot.almacenamiento import (
+    AdaptadorAsincrono,
+    AlmacenamientoRESP,
+    ErrorRESP,
+    leer_respuesta,
+)
+from autobot.codificacion import CodecBinario, CodecJSON
+from autobot.commands import construir_sistema_comandos
+from autobot.context import (
+    AlmacenamientoEnMemoria,
+    GestorContexto,
+    GestorContextoAsincrono,
+)
+from autobot.demo import LLMDePrueba
+
+
+def _respuesta(valor) -> bytes:
+    if valor is None:
+        return b"$-1\r\n"
+    if isinstance(valor, int):
+        return b":%d\r\n" % valor
+    if isinstance(valor, str):
+        valor = valor.encode("utf-8")
+    if isinstance(valor, bytes):
+        return b"$%d\r\n%s\r\n" % (len(valor), valor)
+    return b"*%d\r\n" % len(valor) + b"".join(map(_respuesta, valor))
+
+
+class ServidorRESPDePrueba:
+    """Servidor RESP mínimo respaldado por ``AlmacenamientoEnMemoria``."""
+
+    def __init__(self) -> None:
+        self.almacenamiento = AlmacenamientoEnMemoria()
+        self.conexiones = 0
+
+    async def __aenter__(self) -> "ServidorRESPDePrueba":
+        self._servidor = await asyncio.start_server(self._atender, "127.0.0.1", 0)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *_excepcion) -> None:
+        self._servidor.close()
+        await self._servidor.wait_closed()
+
+    async def _atender(self, lector, escritor) -> None:
+        self.conexiones += 1
+        vigiladas: dict = {}
+        transaccion = None
+        try:
+            while True:
+                nombre, *argumentos = await leer_respuesta(lector)
+                nombre = nombre.decode().upper()
+                if nombre == "WATCH":
+                    for clave in argumentos:
+                        vigiladas[clave] = self.almacenamiento.get(clave.decode())
+                    respuesta = b"+OK\r\n"
+                elif nombre == "UNWATCH":
+                    vigiladas.clear()
+                    respuesta = b"+OK\r\n"
+                elif nombre == "MULTI":
+                    transaccion = []
+                    respuesta = b"+OK\r\n"
+                elif nombre == "EXEC":
+                    intacta = all(
+                        self.almacenamiento.get(clave.decode()) == valor
+                        for clave, valor in vigiladas.items()
+                    )
+                    respuesta = b"*-1\r\n"
+                    if intacta:
+                        respuesta = b"*%d\r\n" % len(transaccion) + b"".join(
+                            self._despachar(*comando) for comando in transaccion
+                        )
+                    vigiladas.clear()
+                    transaccion = None
+                elif transaccion is not None:
+                    transaccion.append((nombre, argumentos))
+                    respuesta = b"+QUEUED\r\n"
+                else:
+                    respuesta = self._despachar(nombre, argumentos)
+                escritor.write(respuesta)
+                await escritor.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    def _despachar(self, nombre: str, argumentos: list) -> bytes:
+        datos = self.almacenamiento
+        clave = argumentos[0].decode() if argumentos else ""
+        try:
+            if nombre == "GET":
+                return _respuesta(datos.get(clave))
+            if nombre == "MGET":
+                return _respuesta([datos.get(c.decode()) for c in argumentos])
+            if nombre == "SETEX":
+                datos.setex(clave, int(argumentos[1]), argumentos[2])
+                return b"+OK\r\n"
+            if nombre == "RPUSH":
+                return _respuesta(datos.rpush(clave, *argumentos[1:]))
+            if nombre == "LRANGE":
+                inicio, fin = int(argumentos[1]), int(argumentos[2])
+                return _respuesta(datos.lrange(clave, inicio, fin))
+            if nombre == "LLEN":
+                return _respuesta(datos.llen(clave))
+            if nombre == "INCR":
+                return _respuesta(datos.incr(clave))
+            if nombre == "DEL":
+                return _respuesta(datos.delete(*(c.decode() for c in argumentos)))
+            if nombre == "EXPIRE":
+                return _respuesta(datos.expire(clave, int(argumentos[1])))
+        except TypeError:
+            return b"-WRONGTYPE Operation against a key holding the wrong kind\r\n"
+        return b"-ERR unknown command '%s'\r\n" % nombre.encode()
+
+
+class AlmacenamientoRESPContado(AlmacenamientoRESP):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.viajes = 0
+
+    async def _enviar(self, conexion, comandos):
+        self.viajes += 1
+        return await super()._enviar(conexion, comandos)
+
+
+def test_operaciones_basicas_y_errores_del_servidor() -> None:
+    async def escenario() -> None:
+        async with ServidorRESPDePrueba() as servidor:
+            cliente = AlmacenamientoRESP(puerto=servidor.puerto)
+            await cliente.asetex("a", 60, "uno")
+            assert await cliente.aget("a") == b"uno"
+            assert await cliente.amget("a", "falta") == [b"uno", None]
+            assert await cliente.arpush("lista", "x", b"\xff\x00") == 2
+            assert await cliente.alrange("lista", -1, -1) == [b"\xff\x00"]
+            assert await cliente.aincr("contador") == 1
+            assert await cliente.aexpire("lista", 10) is True
+            with pytest.raises(ErrorRESP, match="WRONGTYPE"):
+                await cliente.aget("lista")
+            assert await cliente.adelete("a", "lista") == 2
+            assert await cliente.aget("a") is None
+            await cliente.cerrar()
+
+    asyncio.run(escenario())
+
+
+def test_pool_reutiliza_conexiones_y_limita_la_concurrencia() -> None:
+    async def escenario() -> None:
+        async with ServidorRESPDePrueba() as servidor:
+            cliente = AlmacenamientoRESP(puerto=servidor.puerto, tamano_pool=3)
+            await asyncio.gather(*(cliente.aincr("contador") for _ in range(50)))
+            resultados = await (
+                cliente.pipeline().get("contador").incr("contador").ejecutar()
+            )
+
+            assert resultados == [b"50", 51]
+            assert servidor.conexiones == cliente.conexiones_abiertas == 3
+            await cliente.cerrar()
+
+    asyncio.run(escenario())
+
+
+@pytest.mark.parametrize("codec", [CodecJSON(), CodecBinario()])
+def test_gestor_asincrono_sobre_resp_usa_tuberias(
+    codec, crear_contexto, crear_reclamo
+) -> None:
+    async def escenario() -> None:
+        async with ServidorRESPDePrueba() as servidor:
+            cliente = AlmacenamientoRESPContado(puerto=servidor.puerto)
+            gestor = GestorContextoAsincrono(cliente, ventana_contexto=4, codec=codec)
+            await gestor.inicializar_contexto(crear_contexto("resp"))
+            for turno in range(1, 21):
+                await gestor.agregar_mensaje("resp", crear_reclamo(turno))
+
+            # El primer mensaje aporta datos clave: versión más ``acas`` (2 viajes).
+            assert cliente.viajes == 1 + 3 + 2 * 19
+            sincrono = GestorContexto(servidor.almacenamiento, ventana_contexto=4)
+            contexto = await gestor.obtener_contexto("resp")
+            assert contexto == sincrono.obtener_contexto("resp")
+            assert contexto.datos_clave_mencionados == {
+                "numero_pedido": True,
+                "fecha_problema": True,
+            }
+
+            frio = GestorContextoAsincrono(cliente, ventana_contexto=4, codec=codec)
+            antes = cliente.viajes
+            texto = await frio.obtener_contexto_para_llm("resp")
+            assert cliente.viajes - antes == 2
+            assert texto == sincrono.obtener_contexto_para_llm("resp")
+            assert "[Turno 17]" in texto and "[Turno 16]" not in texto
+            assert await frio.contar_mensajes("resp") == 20
+            antes = cliente.viajes
+            metadatos = await frio.obtener_metadatos("resp")
+            assert cliente.viajes - antes == 1
+            assert metadatos == sincrono.obtener_metadatos("resp")
+            assert metadatos.total_mensajes == 20
+            with pytest.raises(KeyError):
+                await frio.obtener_contexto("otra")
+            await cliente.cerrar()
+
+    asyncio.run(escenario())
+
+
+def test_sistema_de_comandos_con_gestor_asincrono(crear_reclamo) -> None:
+    async def escenario() -> None:
+        gestor = GestorContextoAsincrono(AdaptadorAsincrono(AlmacenamientoEnMemoria()))
+        sistema = construir_sistema_comandos(gestor, LLMDePrueba())
+
+        assert "TEST INICIADO" in await sistema.procesar("comenzar test", "s1")
+        for turno in range(1, 5):
+            await gestor.agregar_mensaje("s1", crear_reclamo(turno))
+        parcial = await sistema.procesar("/evaluar", "s1")
+        final = await sistema.procesar("/finalizar", "s1")
+
+        assert "Puntaje global" in parcial and "Puntaje global" in final
+        punto_control = await gestor.obtener_punto_control("s1")
+        assert punto_control is not None and punto_control.turnos_evaluados == 4
+
+    asyncio.run(escenario())
+
+
+def test_acas_detecta_escrituras_concurrentes() -> None:
+    async def escenario() -> None:
+        async with ServidorRESPDePrueba() as servidor:
+            cliente = AlmacenamientoRESP(puerto=servidor.puerto)
+            valores = {"contexto:x": "v1"}
+            listas = {"mensajes:x": ["m1"]}
+
+            semilla = await cliente.acas("version:x", None, 60, valores, listas)
+            assert await cliente.aget("version:x") == str(semilla).encode()
+            assert await cliente.acas("version:x", None, 60, valores) is None
+            nueva = await cliente.acas("version:x", semilla, 60, {"contexto:x": "v2"})
+            assert nueva == semilla + 1
+            assert await cliente.aget("contexto:x") == b"v2"
+            assert await cliente.alrange("mensajes:x", 0, -1) == [b"m1"]
+            await cliente.asetex("contexto:y", 60, "v1")
+            with pytest.raises(ErrorRESP, match="WRONGTYPE"):
+                await cliente.acas("version:y", None, 60, listas={"contexto:y": ["m"]})
+            await cliente.cerrar()
+
+    asyncio.run(escenario())
+
+
+def test_cliente_resp_se_reutiliza_en_otro_bucle_de_eventos() -> None:
+    bucle = asyncio.new_event_loop()
+    hilo = threading.Thread(target=bucle.run_forever)
+    hilo.start()
+    servidor = ServidorRESPDePrueba()
+    asyncio.run_coroutine_threadsafe(servidor.__aenter__(), bucle).result()
+    try:
+        cliente = AlmacenamientoRESP(puerto=servidor.puerto)
+
+        assert asyncio.run(cliente.aincr("contador")) == 1
+        assert asyncio.run(cliente.aincr("contador")) == 2
+        assert cliente.conexiones_abiertas == 1
+        assert servidor.conexiones == 2
+        asyncio.run(cliente.cerrar())
+    finally:
+        asyncio.run_coroutine_threadsafe(servidor.__aexit__(), bucle).result()
+        bucle.call_soon_threadsafe(bucle.stop)
+        hilo.join()
+        bucle.close()
+
+def test_gestores_asincronos_concurrentes_no_pierden_datos_clave(
+    crear_contexto, crear_mensaje
+) -> None:
+    async def escenario() -> None:
+        async with ServidorRESPDePrueba() as servidor:
+            clientes = [AlmacenamientoRESP(puerto=servidor.puerto) for _ in range(2)]
+            gestores = [GestorContextoAsincrono(cliente) for cliente in clientes]
+            await gestores[0].inicializar_contexto(crear_contexto("resp"))
+
+            async def escribir(gestor, contenido: str) -> None:
+                for turno in range(10):
+                    await gestor.agregar_mensaje(
+                        "resp", crear_mensaje(turno, "cliente", f"{contenido} {turno}")
+                    )
+                    await gestor.actualizar(
+                        "resp",
+                        lambda contexto: contexto.emociones_cliente.append(contenido),
+                    )
+
+            await asyncio.gather(
+                escribir(gestores[0], "Pedido #5"), escribir(gestores[1], "hace días")
+            )
+
+            contexto = await GestorContextoAsincrono(clientes[0]).obtener_contexto(
+                "resp"
+            )
+            assert len(contexto.historial) == 20
+            assert len(contexto.emociones_cliente) == 20
+            assert contexto.datos_clave_mencionados == {
+                "numero_pedido": True,
+                "fecha_problema": True,
+            }
+            conflictos = sum(
+                g.estadisticas_escrituras()["conflictos"] for g in gestores
+            )
+            assert conflictos > 0
+            for cliente in clientes:
+                await cliente.cerrar()
+
+    asyncio.run(escenario())
@@ -0,0 +1,146 @@
+"""Pruebas para la caché de veredictos."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from autobot.cache import CacheVeredictos, clave_veredicto
+from autobot.demo import ejecutar_demo
+from autobot.evaluation import AnalizadorConversacion, RubricaEvaluacion
+from autobot.models import EvidenciaEvaluacion
+
+
+@pytest.fixture()
+def saludo(crear_contexto, crear_mensaje):
+    """Contexto de un solo mensaje del cliente, con contenido configurable."""
+
+    def construir(sesion_id: str, contenido: str = "Hola"):
+        return crear_contexto(sesion_id, [crear_mensaje(1, contenido=contenido)])
+
+    return construir
+
+
+def _veredicto(puntaje: int):
+    evidencia = EvidenciaEvaluacion(
+        criterio="empatia_y_tono", turno=1, extracto="Hola", impacto="neutral"
+    )
+    return puntaje, "Texto", [evidencia]
+
+
+def test_clave_depende_de_la_entrada() -> None:
+    definicion = RubricaEvaluacion().obtener("empatia_y_tono")
+    base = clave_veredicto("empatia_y_tono", definicion, "Turno 1", 0.3, 800)
+
+    assert base == clave_veredicto("empatia_y_tono", definicion, "Turno 1", 0.3, 800)
+    assert base != clave_veredicto("empatia_y_tono", definicion, "Turno 2", 0.3, 800)
+    assert base != clave_veredicto("empatia_y_tono", definicion, "Turno 1", 0.5, 800)
+
+
+def test_desalojo_lru_en_memoria() -> None:
+    cache = CacheVeredictos(capacidad=2)
+    cache.guardar("a", _veredicto(1))
+    cache.guardar("b", _veredicto(2))
+    assert cache.obtener("a") is not None
+    cache.guardar("c", _veredicto(3))
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("a")[0] == 1
+    estadisticas = cache.estadisticas()
+    assert estadisticas["desalojos"] == 1
+    assert estadisticas["aciertos"] == 2
+    assert estadisticas["fallos"] == 1
+
+
+def test_nivel_en_disco_sobrevive_entre_instancias(tmp_path) -> None:
+    ruta = tmp_path / "veredictos.sqlite"
+    cache = CacheVeredictos(ruta_disco=ruta, capacidad_disco=2)
+    for clave, puntaje in (("a", 1), ("b", 2), ("c", 3)):
+        cache.guardar(clave, _veredicto(puntaje))
+    assert cache.estadisticas()["desalojos_disco"] == 1
+    cache.cerrar()
+
+    reabierta = CacheVeredictos(ruta_disco=ruta)
+    puntaje, justificacion, evidencias = reabierta.obtener("c")
+    assert (puntaje, justificacion) == (3, "Texto")
+    assert evidencias[0].criterio == "empatia_y_tono"
+    assert reabierta.obtener("a") is None
+    assert reabierta.estadisticas()["aciertos_disco"] == 1
+    reabierta.cerrar()
+
+
+def test_nivel_en_disco_cuenta_filas_sin_recorrer_la_tabla(tmp_path) -> None:
+    ruta = tmp_path / "veredictos.sqlite"
+    cache = CacheVeredictos(capacidad=1, ruta_disco=ruta, capacidad_disco=3)
+    for clave in ("a", "b", "a", "c"):
+        cache.guardar(clave, _veredicto(1))
+    assert cache.obtener("a") is not None
+    cache.guardar("d", _veredicto(2))
+
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["entradas_disco"], estadisticas["desalojos_disco"]) == (3, 1)
+    cache.cerrar()
+    reabierta = CacheVeredictos(ruta_disco=ruta)
+    assert reabierta.estadisticas()["entradas_disco"] == 3
+    assert reabierta.obtener("b") is None and reabierta.obtener("a") is not None
+    reabierta.cerrar()
+
+
+def test_clave_se_calcula_una_vez_con_los_parametros_reales(
+    monkeypatch, saludo, llm_contador
+) -> None:
+    renderizados = []
+    original = AnalizadorConversacion._renderizar_historial.__func__
+
+    def contar(cls, contexto, presupuesto_tokens=None):
+        renderizados.append(presupuesto_tokens)
+        return original(cls, contexto, presupuesto_tokens)
+
+    monkeypatch.setattr(
+        AnalizadorConversacion, "_renderizar_historial", classmethod(contar)
+    )
+    cache = CacheVeredictos()
+    llm = llm_contador
+
+    asyncio.run(
+        AnalizadorConversacion(llm, cache=cache).evaluar_conversacion(saludo("a"))
+    )
+    assert len(renderizados) == 3
+    asyncio.run(
+        AnalizadorConversacion(
+            llm, cache=cache, estrategia="conjunta"
+        ).evaluar_conversacion(saludo("b"))
+    )
+    # La llamada conjunta usa otro límite de tokens, así que sus claves fallan;
+    # como su respuesta no se puede interpretar, cada criterio se reevalúa por
+    # separado y ahí sí reutiliza los veredictos anteriores.
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["fallos"], estadisticas["aciertos"]) == (6, 3)
+    assert llm.llamadas == 4
+    assert len(renderizados) == 7
+
+
+def test_analizador_reutiliza_veredictos_de_transcripciones_identicas(
+    saludo, llm_contador
+) -> None:
+    llm = llm_contador
+    analizador = AnalizadorConversacion(llm, cache=CacheVeredictos())
+
+    asyncio.run(analizador.evaluar_conversacion(saludo("uno")))
+    asyncio.run(analizador.evaluar_conversacion(saludo("dos")))
+    assert llm.llamadas == 3
+
+    asyncio.run(analizador.evaluar_conversacion(saludo("tres", "Otro texto")))
+    assert llm.llamadas == 6
+
+
+def test_demo_repetida_no_invoca_al_llm() -> None:
+    cache = CacheVeredictos()
+    ejecutar_demo(cache)
+    assert cache.estadisticas()["aciertos"] == 0
+
+    informe = ejecutar_demo(cache)
+
+    assert "Puntaje global" in informe
+    assert cache.estadisticas()["aciertos"] == 3
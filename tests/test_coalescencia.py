@@ -0,0 +1,89 @@
+"""Pruebas de la coalescencia de evaluaciones en curso."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from autobot.coalescencia import CoalescedorEvaluaciones
+from autobot.commands import construir_sistema_comandos
+from autobot.context import AlmacenamientoEnMemoria, GestorContexto
+from autobot.evaluation import AnalizadorConversacion
+
+
+@pytest.fixture()
+def preparar(crear_mensaje):
+    """Sistema coalescente con la sesión ``s1`` iniciada y un mensaje del agente."""
+
+    def construir(llm, **opciones):
+        gestor = GestorContexto(AlmacenamientoEnMemoria())
+        sistema = construir_sistema_comandos(gestor, llm, coalescente=True, **opciones)
+        asyncio.run(sistema.procesar("comenzar test", "s1"))
+        gestor.agregar_mensaje("s1", crear_mensaje(1, "agente", "Hola"))
+        return gestor, sistema
+
+    return construir
+
+
+def test_finalizar_repetido_comparte_una_evaluacion(preparar, llm_lento) -> None:
+    llm_lento.demora = 0.05
+    _, sistema = preparar(llm_lento)
+
+    async def varias():
+        return await asyncio.gather(
+            *(sistema.procesar("/finalizar", "s1") for _ in range(5))
+        )
+
+    informes = asyncio.run(varias())
+
+    assert len(set(informes)) == 1
+    assert llm_lento.llamadas == 3
+
+
+def test_transcripcion_nueva_no_se_coalesce(preparar, crear_mensaje, llm_lento) -> None:
+    llm_lento.demora = 0
+    coalescedor = CoalescedorEvaluaciones(AnalizadorConversacion(llm_lento))
+    gestor, _ = preparar(llm_lento)
+    contexto = gestor.obtener_contexto("s1")
+
+    asyncio.run(coalescedor.evaluar_conversacion(contexto))
+    contexto.historial.append(crear_mensaje(2, "cliente", "Gracias"))
+    asyncio.run(coalescedor.evaluar_conversacion(contexto))
+
+    assert coalescedor.estadisticas() == {
+        "solicitudes": 2,
+        "ejecutadas": 2,
+        "coalescidas": 0,
+        "en_curso": 0,
+    }
+
+
+def test_coalescencia_entre_hilos_y_propagacion_de_errores(preparar, llm_lento) -> None:
+    gestor, _ = preparar(llm_lento)
+    llm_lento.demora, llm_lento.error = 0.2, RuntimeError("caído")
+    coalescedor = CoalescedorEvaluaciones(AnalizadorConversacion(llm_lento))
+    contexto = gestor.obtener_contexto("s1")
+    errores: list[str] = []
+
+    def solicitar() -> None:
+        try:
+            asyncio.run(coalescedor.evaluar_conversacion(contexto))
+        except RuntimeError as error:
+            errores.append(str(error))
+
+    hilos = [threading.Thread(target=solicitar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+        time.sleep(0.01)
+    for hilo in hilos:
+        hilo.join(timeout=5)
+
+    assert errores == ["caído"] * 4
+    estadisticas = coalescedor.estadisticas()
+    assert estadisticas["ejecutadas"] == 1
+    assert estadisticas["coalescidas"] == 3
+    with pytest.raises(RuntimeError):
+        asyncio.run(coalescedor.evaluar_conversacion(contexto))
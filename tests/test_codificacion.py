@@ -0,0 +1,199 @@
+"""Pruebas de los codecs de contextos almacenados."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+
+from autobot.almacenamiento import AdaptadorAsincrono
+from autobot.codificacion import (
+    CodecBinario,
+    CodecJSON,
+    decodificar_cabecera,
+    decodificar_mensaje,
+)
+from autobot.context import (
+    AlmacenamientoEnMemoria,
+    GestorContexto,
+    GestorContextoAsincrono,
+)
+from autobot.models import (
+    CanalComunicacion,
+    ContextoConversacion,
+    MensajeConversacion,
+    PersonalidadCliente,
+)
+from autobot.scenarios import ESCENARIOS_OBRA, RegistroEscenarios
+
+
+@pytest.fixture()
+def contexto(crear_contexto) -> ContextoConversacion:
+    contexto = crear_contexto(
+        "binaria",
+        personalidad=PersonalidadCliente.SARCASTICO_EXIGENTE,
+        canal=CanalComunicacion.WHATSAPP,
+        escenario=ESCENARIOS_OBRA[1],
+        timestamp_inicio=datetime(2026, 3, 1, 8, 30, 15, 123456, tzinfo=UTC),
+        estado_actual="resolviendo",
+        datos_clave_mencionados={"numero_pedido": True, "fecha_problema": False},
+        emociones_cliente=["molesto", "escéptico"],
+    )
+    contexto.configuracion = replace(
+        contexto.configuracion, duracion_maxima=12, nivel_dificultad=0.35
+    )
+    return contexto
+
+
+@pytest.fixture()
+def mensaje(crear_mensaje):
+    """Mensaje con zona horaria, emoji y metadatos; admite reemplazar campos."""
+
+    def construir(turno: int = 300, **cambios) -> MensajeConversacion:
+        datos = dict(
+            rol="agente",
+            contenido="Perdón por la demora 🙏, el camión sale hoy.",
+            timestamp=datetime(2026, 3, 1, 8, 31, tzinfo=timezone(timedelta(hours=-3))),
+            metadatos={"canal": "whatsapp"},
+        )
+        datos.update(cambios)
+        return crear_mensaje(turno, **datos)
+
+    return construir
+
+
+@pytest.mark.parametrize("codec", [CodecJSON(), CodecBinario()])
+def test_ida_y_vuelta(codec, contexto, mensaje) -> None:
+    assert decodificar_cabecera(codec.codificar_cabecera(contexto)) == contexto
+    original = mensaje()
+    assert decodificar_mensaje(codec.codificar_mensaje(original)) == original
+
+
+def test_binario_conserva_literales_desconocidos_y_es_mas_compacto(
+    contexto, mensaje
+) -> None:
+    codec = CodecBinario()
+    supervisor = mensaje(rol="supervisor")
+
+    assert decodificar_mensaje(codec.codificar_mensaje(supervisor)).rol == "supervisor"
+    assert len(codec.codificar_mensaje(mensaje())) < len(
+        CodecJSON().codificar_mensaje(mensaje()).encode()
+    ) / 2
+    assert len(codec.codificar_cabecera(contexto)) < len(
+        CodecJSON().codificar_cabecera(contexto).encode()
+    )
+
+
+def test_version_de_esquema_desconocida(mensaje) -> None:
+    codificado = bytearray(CodecBinario().codificar_mensaje(mensaje()))
+    codificado[3] = 99
+
+    with pytest.raises(ValueError, match="Versión"):
+        decodificar_mensaje(bytes(codificado))
+
+
+def test_gestor_lee_ambos_formatos_durante_la_migracion(contexto, mensaje) -> None:
+    almacenamiento = AlmacenamientoEnMemoria()
+    GestorContexto(almacenamiento).inicializar_contexto(contexto)
+    GestorContexto(almacenamiento).agregar_mensaje("binaria", mensaje(turno=1))
+
+    binario = GestorContexto(almacenamiento, codec=CodecBinario(), capacidad_cache=0)
+    binario.agregar_mensaje("binaria", mensaje(turno=2, rol="cliente"))
+    binario.agregar_mensaje("binaria", mensaje(turno=3, contenido="Pedido #9"))
+
+    assert isinstance(almacenamiento.get("contexto:binaria"), str)
+    contexto = GestorContexto(almacenamiento).obtener_contexto("binaria")
+    assert [m.turno for m in contexto.historial] == [1, 2, 3]
+    assert contexto.configuracion.escenario == ESCENARIOS_OBRA[1]
+
+    binario.inicializar_contexto(contexto)
+    assert isinstance(almacenamiento.get("contexto:binaria"), bytes)
+    assert GestorContexto(almacenamiento).obtener_contexto("binaria") == contexto
+
+
+@pytest.mark.parametrize("codec", [CodecJSON(), CodecBinario()])
+def test_escenarios_del_catalogo_se_guardan_por_referencia(codec, contexto) -> None:
+    cabecera = codec.codificar_cabecera(contexto)
+
+    texto = cabecera if isinstance(cabecera, str) else cabecera.decode("latin-1")
+    assert contexto.configuracion.escenario.descripcion[:40] not in texto
+    primero = decodificar_cabecera(cabecera).configuracion.escenario
+    segundo = decodificar_cabecera(cabecera).configuracion.escenario
+    assert primero is segundo is ESCENARIOS_OBRA[1]
+
+
+@pytest.mark.parametrize("codec", [CodecJSON(), CodecBinario()])
+def test_escenarios_ad_hoc_se_embeben(codec, contexto) -> None:
+    contexto.configuracion.escenario = replace(
+        ESCENARIOS_OBRA[1], titulo="Variante ad hoc"
+    )
+
+    decodificado = decodificar_cabecera(codec.codificar_cabecera(contexto))
+
+    assert decodificado.configuracion.escenario == contexto.configuracion.escenario
+    assert decodificado.configuracion.escenario is not ESCENARIOS_OBRA[1]
+
+
+def test_registro_resuelve_versiones_anteriores_del_catalogo() -> None:
+    registro = RegistroEscenarios(ESCENARIOS_OBRA, version=2)
+    anterior = replace(ESCENARIOS_OBRA[0], titulo="Título de la versión 1")
+    registro.registrar(anterior, version=1)
+
+    assert registro.resolver("ESC-001", 1) is anterior
+    assert registro.resolver("ESC-001", 2) is ESCENARIOS_OBRA[0]
+    with pytest.raises(ValueError, match="Versión 7"):
+        registro.resolver("ESC-002", 7)
+    with pytest.raises(ValueError, match="Versión 1"):
+        registro.resolver("ESC-002", 1)
+    with pytest.raises(KeyError):
+        registro.resolver("ESC-999", 2)
+
+
+@pytest.mark.parametrize("codec", [CodecJSON, CodecBinario])
+def test_cabeceras_de_otra_version_del_catalogo_no_se_sustituyen(
+    codec, contexto
+) -> None:
+    anterior = RegistroEscenarios(ESCENARIOS_OBRA, version=1)
+    cabecera = codec(anterior).codificar_cabecera(contexto)
+    nuevo = RegistroEscenarios(
+        [replace(ESCENARIOS_OBRA[1], titulo="Otro título")], version=2
+    )
+
+    with pytest.raises(ValueError, match="Versión 1 del catálogo"):
+        decodificar_cabecera(cabecera, nuevo)
+    nuevo.registrar(ESCENARIOS_OBRA[1], version=1)
+    decodificado = decodificar_cabecera(cabecera, nuevo)
+    assert decodificado.configuracion.escenario is ESCENARIOS_OBRA[1]
+
+
+@pytest.mark.parametrize("codec", [CodecJSON, CodecBinario])
+def test_gestores_resuelven_en_el_registro_del_codec(codec, contexto) -> None:
+    propio = replace(ESCENARIOS_OBRA[1], id="ESC-900", titulo="Solo en este registro")
+    codec = codec(RegistroEscenarios([propio]))
+    contexto.configuracion.escenario = propio
+    almacenamiento = AlmacenamientoEnMemoria()
+    GestorContexto(almacenamiento, codec=codec).inicializar_contexto(contexto)
+
+    sincrono = GestorContexto(almacenamiento, codec=codec, capacidad_cache=0)
+    asincrono = GestorContextoAsincrono(AdaptadorAsincrono(almacenamiento), codec=codec)
+    leidos = [
+        sincrono.obtener_contexto("binaria"),
+        asyncio.run(asincrono.obtener_contexto("binaria")),
+    ]
+
+    with pytest.raises(KeyError):
+        decodificar_cabecera(almacenamiento.get("contexto:binaria"))
+    for leido in leidos:
+        assert leido == contexto
+        assert leido.configuracion.escenario is propio
+
+
+def test_cabeceras_binarias_v1_siguen_siendo_legibles(contexto) -> None:
+    contexto.configuracion.escenario = replace(ESCENARIOS_OBRA[1], area="otra")
+    v2 = CodecBinario().codificar_cabecera(contexto)
+    indicador = 4 + 1 + len(contexto.sesion_id) + 2 + 10 + 1 + 8 + 1
+    v1 = v2[:3] + bytes([1]) + v2[4:indicador] + v2[indicador + 1 :]
+
+    assert decodificar_cabecera(v1) == contexto
@@ -0,0 +1,476 @@
+"""Pruebas del registro de mensajes del gestor de contexto."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import pytest
+
+from autobot.context import (
+    TTL_CONTEXTO,
+    AlmacenamientoEnMemoria,
+    AlmacenamientoParticionado,
+    ConflictoConcurrencia,
+    GestorContexto,
+    HistorialDiferido,
+)
+from autobot.models import CanalComunicacion, ContextoConversacion
+from autobot.scenarios import ESCENARIOS_OBRA
+
+
+class AlmacenamientoEspia(AlmacenamientoEnMemoria):
+    def __init__(self) -> None:
+        super().__init__()
+        self.bytes_escritos = 0
+        self.elementos_leidos = 0
+
+    def setex(self, clave: str, ttl: int, valor: str) -> None:
+        self.bytes_escritos += len(valor)
+        super().setex(clave, ttl, valor)
+
+    def rpush(self, clave: str, *valores: str) -> int:
+        self.bytes_escritos += sum(len(valor) for valor in valores)
+        return super().rpush(clave, *valores)
+
+    def lrange(self, clave: str, inicio: int, fin: int) -> list[str]:
+        valores = super().lrange(clave, inicio, fin)
+        self.elementos_leidos += len(valores)
+        return valores
+
+
+def test_agregar_mensaje_escribe_bytes_constantes(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoEspia()
+    gestor = GestorContexto(almacenamiento)
+    gestor.inicializar_contexto(crear_contexto("registro"))
+
+    escrituras = []
+    for turno in range(1, 201):
+        antes = almacenamiento.bytes_escritos
+        gestor.agregar_mensaje("registro", crear_mensaje(turno, "agente"))
+        escrituras.append(almacenamiento.bytes_escritos - antes)
+
+    assert max(escrituras) - min(escrituras) <= 10
+    assert almacenamiento.elementos_leidos == 0
+    assert gestor.contar_mensajes("registro") == 200
+    assert [m.turno for m in gestor.obtener_contexto("registro").historial] == list(
+        range(1, 201)
+    )
+
+
+def test_ventana_para_llm_decodifica_solo_la_cola(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoEspia()
+    gestor = GestorContexto(almacenamiento, ventana_contexto=3, capacidad_cache=0)
+    gestor.inicializar_contexto(crear_contexto("registro"))
+    for turno in range(1, 51):
+        gestor.agregar_mensaje("registro", crear_mensaje(turno, "agente"))
+
+    texto = gestor.obtener_contexto_para_llm("registro")
+
+    assert almacenamiento.elementos_leidos == 3
+    assert "[Turno 48]" in texto and "[Turno 47]" not in texto
+    assert [m.turno for m in gestor.obtener_mensajes_recientes("registro", 2)] == [
+        49,
+        50,
+    ]
+
+
+def test_historial_diferido_decodifica_solo_lo_que_se_lee(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoEspia()
+    gestor = GestorContexto(almacenamiento, capacidad_cache=0)
+    gestor.inicializar_contexto(crear_contexto("registro"))
+    for turno in range(1, 201):
+        gestor.agregar_mensaje("registro", crear_mensaje(turno, "agente"))
+
+    historial = gestor.obtener_historial("registro")
+
+    assert isinstance(historial, HistorialDiferido)
+    assert len(historial) == 200 and almacenamiento.elementos_leidos == 0
+    assert [m.turno for m in historial[-5:]] == [196, 197, 198, 199, 200]
+    assert historial[-1].turno == 200 and historial[0].turno == 1
+    assert almacenamiento.elementos_leidos == 6
+    assert [m.turno for m in historial[-10::3]] == [191, 194, 197, 200]
+    assert [m.turno for m in historial] == list(range(1, 201))
+    with pytest.raises(IndexError):
+        historial[200]
+
+
+def test_metadatos_sin_decodificar_mensajes(crear_contexto, crear_mensaje) -> None:
+    almacenamiento = AlmacenamientoEspia()
+    gestor = GestorContexto(almacenamiento)
+    gestor.inicializar_contexto(
+        crear_contexto("registro", canal=CanalComunicacion.EMAIL)
+    )
+    for turno in range(1, 31):
+        gestor.agregar_mensaje("registro", crear_mensaje(turno, "agente"))
+
+    en_cache = gestor.obtener_metadatos("registro")
+    frio = GestorContexto(almacenamiento).obtener_metadatos("registro")
+
+    assert almacenamiento.elementos_leidos == 0
+    assert en_cache == frio
+    assert frio.total_mensajes == 30 and frio.estado_actual == "en_progreso"
+    assert frio.configuracion.canal is CanalComunicacion.EMAIL
+    assert frio.configuracion.escenario is ESCENARIOS_OBRA[0]
+    with pytest.raises(KeyError):
+        gestor.obtener_metadatos("otra")
+
+
+def test_sesiones_con_historial_embebido_se_migran(
+    crear_contexto, crear_mensaje, json_asdict
+) -> None:
+    almacenamiento = AlmacenamientoEnMemoria()
+    contexto = crear_contexto("registro")
+    contexto.historial.append(crear_mensaje(1, "cliente"))
+    almacenamiento.setex("contexto:registro", 60, json_asdict(contexto))
+    gestor = GestorContexto(almacenamiento)
+
+    assert gestor.obtener_mensajes_recientes("registro")[0].turno == 1
+    gestor.agregar_mensaje("registro", crear_mensaje(2, "cliente"))
+
+    assert "historial" not in json.loads(almacenamiento.get("contexto:registro"))
+    assert [m.turno for m in gestor.obtener_contexto("registro").historial] == [1, 2]
+
+
+def test_reinicializar_descarta_el_registro_anterior(
+    crear_contexto, crear_mensaje
+) -> None:
+    gestor = GestorContexto(AlmacenamientoEnMemoria())
+    gestor.inicializar_contexto(crear_contexto("registro"))
+    gestor.agregar_mensaje("registro", crear_mensaje(1, "agente"))
+
+    gestor.inicializar_contexto(crear_contexto("registro"))
+
+    assert gestor.obtener_contexto("registro").historial == []
+    with pytest.raises(KeyError):
+        gestor.obtener_mensajes_recientes("otra")
+
+
+def test_lrange_respeta_la_semantica_de_redis() -> None:
+    almacenamiento = AlmacenamientoEnMemoria()
+    almacenamiento.rpush("lista", "a", "b", "c")
+
+    assert almacenamiento.lrange("lista", 0, -1) == ["a", "b", "c"]
+    assert almacenamiento.lrange("lista", -2, -1) == ["b", "c"]
+    assert almacenamiento.lrange("lista", -10, 0) == ["a"]
+    assert almacenamiento.lrange("lista", 0, -5) == []
+    assert almacenamiento.lrange("ausente", 0, -1) == []
+    with pytest.raises(TypeError):
+        almacenamiento.get("lista")
+
+
+def test_cache_devuelve_contextos_sin_decodificar(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoEspia()
+    gestor = GestorContexto(almacenamiento)
+    gestor.inicializar_contexto(crear_contexto("registro"))
+    for turno in range(1, 6):
+        gestor.agregar_mensaje("registro", crear_mensaje(turno, "cliente"))
+
+    contexto = gestor.obtener_contexto("registro")
+    contexto.historial.append(crear_mensaje(99, "agente"))
+
+    assert almacenamiento.elementos_leidos == 0
+    assert len(gestor.obtener_contexto("registro").historial) == 5
+    estadisticas = gestor.estadisticas_cache()
+    assert estadisticas["aciertos"] == 7
+    assert estadisticas["tasa_aciertos"] == 1.0
+
+
+def test_escrituras_de_otro_gestor_invalidan_la_cache(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoEnMemoria()
+    lector = GestorContexto(almacenamiento)
+    escritor = GestorContexto(almacenamiento)
+    lector.inicializar_contexto(crear_contexto("registro"))
+    lector.agregar_mensaje("registro", crear_mensaje(1, "agente"))
+
+    escritor.agregar_mensaje("registro", crear_mensaje(2, "cliente"))
+    escritor.agregar_mensaje(
+        "registro",
+        crear_mensaje(3, "cliente", "Pedido #77"),
+    )
+    lector.agregar_mensaje("registro", crear_mensaje(4, "agente"))
+
+    contexto = lector.obtener_contexto("registro")
+    assert [m.turno for m in contexto.historial] == [1, 2, 3, 4]
+    assert contexto.datos_clave_mencionados == {"numero_pedido": True}
+    assert lector.estadisticas_cache()["invalidaciones"] == 1
+
+
+def test_cache_desaloja_la_sesion_menos_usada(crear_contexto) -> None:
+    gestor = GestorContexto(AlmacenamientoEnMemoria(), capacidad_cache=2)
+    for sesion_id in ("a", "b", "c"):
+        gestor.inicializar_contexto(crear_contexto(sesion_id))
+    gestor.obtener_contexto("a")
+
+    estadisticas = gestor.estadisticas_cache()
+    assert estadisticas["desalojos"] == 2
+    assert estadisticas["entradas"] == 2
+    assert estadisticas["fallos"] == 1
+
+
+class Reloj:
+    def __init__(self) -> None:
+        self.ahora = 1000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+
+def test_claves_vencen_al_accederlas_y_al_barrer() -> None:
+    reloj = Reloj()
+    almacenamiento = AlmacenamientoEnMemoria(reloj=reloj)
+    almacenamiento.setex("corta", 10, "a")
+    almacenamiento.setex("larga", 100, "b")
+    almacenamiento.rpush("lista", "x")
+    almacenamiento.expire("lista", 10)
+    almacenamiento.incr("contador")
+    almacenamiento.expire("contador", 10)
+    almacenamiento.incr("contador")
+
+    reloj.ahora += 11
+    assert almacenamiento.get("corta") is None
+    assert almacenamiento.get("contador") is None
+    assert almacenamiento.barrer() == 1
+    assert [clave for clave, _ in almacenamiento.items()] == ["larga"]
+    assert almacenamiento.items()[0][1]["valor"] == "b"
+    assert almacenamiento.expire("larga", 0) is True
+    assert almacenamiento.estadisticas() == {
+        "entradas": 0,
+        "bytes": 0,
+        "desalojos": 0,
+        "expiraciones": 3,
+    }
+    with pytest.raises(ValueError):
+        almacenamiento.setex("nula", 0, "x")
+
+
+def test_set_sin_vencimiento_y_ttl_restante() -> None:
+    reloj = Reloj()
+    almacenamiento = AlmacenamientoEnMemoria(reloj=reloj)
+    almacenamiento.set("fija", "a")
+    almacenamiento.setex("temporal", 10, "b")
+
+    reloj.ahora += 4
+    assert almacenamiento.ttl("fija") == -1
+    assert almacenamiento.ttl("temporal") == 6
+    assert almacenamiento.ttl("falta") == -2
+    reloj.ahora += 1000
+    assert almacenamiento.get("fija") == "a" and almacenamiento.barrer() == 1
+
+
+def test_limites_desalojan_la_clave_menos_usada(crear_contexto, crear_mensaje) -> None:
+    almacenamiento = AlmacenamientoEnMemoria(max_entradas=3)
+    for clave in ("a", "b", "c"):
+        almacenamiento.setex(clave, 60, clave)
+    almacenamiento.get("a")
+    almacenamiento.setex("d", 60, "d")
+
+    assert almacenamiento.get("b") is None
+    assert [clave for clave, _ in almacenamiento.items()] == ["c", "a", "d"]
+
+    acotado = AlmacenamientoEnMemoria(max_bytes=2_000)
+    gestor = GestorContexto(acotado, capacidad_cache=0)
+    for numero in range(20):
+        gestor.inicializar_contexto(crear_contexto(f"s{numero}"))
+        gestor.agregar_mensaje(f"s{numero}", crear_mensaje(1, "agente"))
+
+    estadisticas = acotado.estadisticas()
+    assert estadisticas["bytes"] <= 2_000
+    assert estadisticas["desalojos"] > 0
+    assert gestor.obtener_contexto("s19").historial[0].turno == 1
+
+
+def test_barrido_periodico_en_segundo_plano() -> None:
+    reloj = Reloj()
+    almacenamiento = AlmacenamientoEnMemoria(intervalo_barrido=0.01, reloj=reloj)
+    for numero in range(50):
+        almacenamiento.setex(f"clave{numero}", 5, "valor")
+    reloj.ahora += 6
+
+    limite = time.monotonic() + 2
+    while almacenamiento.estadisticas()["entradas"] and time.monotonic() < limite:
+        time.sleep(0.01)
+    almacenamiento.cerrar()
+
+    assert almacenamiento.estadisticas()["expiraciones"] == 50
+
+
+def test_particiones_agrupan_las_claves_de_cada_sesion(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoParticionado(particiones=4)
+    gestor = GestorContexto(almacenamiento)
+    for numero in range(8):
+        gestor.inicializar_contexto(crear_contexto(f"s{numero}"))
+        gestor.agregar_mensaje(f"s{numero}", crear_mensaje(1, "agente"))
+
+    for numero in range(8):
+        particion = almacenamiento._particion(f"contexto:s{numero}")
+        assert particion is almacenamiento._particion(f"mensajes:s{numero}")
+        assert particion is almacenamiento._particion(f"version:s{numero}")
+    assert almacenamiento.estadisticas()["entradas"] == 24
+    assert len(almacenamiento.items()) == 24
+    assert almacenamiento.bloqueo("s1") is almacenamiento.bloqueo("s1")
+
+
+def test_escrituras_concurrentes_de_una_sesion_se_linealizan(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoParticionado()
+    GestorContexto(almacenamiento).inicializar_contexto(crear_contexto("registro"))
+
+    def trabajar(hilo: int) -> None:
+        gestor = GestorContexto(almacenamiento)
+        for turno in range(25):
+            texto = "Pedido #1" if hilo % 2 else "hace días"
+            gestor.agregar_mensaje("registro", crear_mensaje(turno, "cliente", texto))
+            gestor.actualizar(
+                "registro",
+                lambda contexto: contexto.emociones_cliente.append(f"h{hilo}"),
+            )
+
+    hilos = [threading.Thread(target=trabajar, args=(hilo,)) for hilo in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    contexto = GestorContexto(almacenamiento).obtener_contexto("registro")
+    assert len(contexto.historial) == 200
+    assert len(contexto.emociones_cliente) == 200
+    assert contexto.datos_clave_mencionados == {
+        "numero_pedido": True,
+        "fecha_problema": True,
+    }
+
+
+def test_actualizar_persiste_cabecera_y_mensajes_nuevos(
+    crear_contexto, crear_mensaje
+) -> None:
+    gestor = GestorContexto(AlmacenamientoEnMemoria())
+    gestor.inicializar_contexto(crear_contexto("registro"))
+    gestor.agregar_mensaje("registro", crear_mensaje(1, "agente"))
+
+    def finalizar(contexto: ContextoConversacion) -> None:
+        contexto.estado_actual = "finalizado"
+        contexto.historial.append(crear_mensaje(2, "agente"))
+
+    resultado = gestor.actualizar("registro", finalizar)
+
+    otro = GestorContexto(gestor._almacenamiento).obtener_contexto("registro")
+    assert otro == resultado
+    assert otro.estado_actual == "finalizado"
+    assert [m.turno for m in otro.historial] == [1, 2]
+    with pytest.raises(ValueError):
+        gestor.actualizar("registro", lambda contexto: contexto.historial.clear())
+
+
+def test_cas_solo_escribe_sobre_la_version_esperada() -> None:
+    almacenamiento = AlmacenamientoEnMemoria()
+
+    semilla = almacenamiento.cas("version:x", None, 60, {"contexto:x": "a"})
+    assert semilla > 1
+    assert almacenamiento.cas("version:x", None, 60, {"contexto:x": "b"}) is None
+    assert (
+        almacenamiento.cas("version:x", semilla, 60, listas={"mensajes:x": ["m"]})
+        == semilla + 1
+    )
+    assert almacenamiento.get("contexto:x") == "a"
+    assert almacenamiento.lrange("mensajes:x", 0, -1) == ["m"]
+    particionado = AlmacenamientoParticionado(particiones=2)
+    ajena = next(
+        f"contexto:{numero}"
+        for numero in range(100)
+        if particionado._particion(f"contexto:{numero}")
+        is not particionado._particion("version:x")
+    )
+    with pytest.raises(ValueError):
+        particionado.cas("version:x", None, 60, {ajena: "a"})
+
+
+
+def test_version_perdida_no_repite_una_version_cacheada(
+    crear_contexto, crear_mensaje
+) -> None:
+    almacenamiento = AlmacenamientoEnMemoria()
+    lector = GestorContexto(almacenamiento)
+    lector.inicializar_contexto(crear_contexto("aba"))
+    lector.agregar_mensaje("aba", crear_mensaje(1, "agente"))
+
+    almacenamiento.delete("version:aba")
+    escritor = GestorContexto(almacenamiento, capacidad_cache=0)
+    escritor.agregar_mensaje("aba", crear_mensaje(2, "agente"))
+    escritor.agregar_mensaje("aba", crear_mensaje(3, "agente"))
+
+    contexto = lector.obtener_contexto("aba")
+    assert [m.turno for m in contexto.historial] == [1, 2, 3]
+
+
+def test_cas_no_desaloja_las_claves_que_escribe() -> None:
+    almacenamiento = AlmacenamientoEnMemoria(max_entradas=2)
+    almacenamiento.setex("suelta", 60, "x")
+    for sesion in ("a", "b"):
+        almacenamiento.cas(
+            f"version:{sesion}",
+            None,
+            60,
+            {f"contexto:{sesion}": sesion},
+            {f"mensajes:{sesion}": ["m"]},
+        )
+
+    claves = {clave for clave, _ in almacenamiento.items()}
+    assert claves == {"contexto:b", "mensajes:b", "version:b"}
+    assert almacenamiento.estadisticas()["desalojos"] == 4
+
+
+def test_cabecera_mensajes_y_version_vencen_juntos(
+    crear_contexto, crear_mensaje
+) -> None:
+    reloj = Reloj()
+    almacenamiento = AlmacenamientoEnMemoria(reloj=reloj)
+    gestor = GestorContexto(almacenamiento)
+    gestor.inicializar_contexto(crear_contexto("ttl", [crear_mensaje(1)]))
+
+    reloj.ahora += TTL_CONTEXTO - 10
+    gestor.actualizar("ttl", lambda contexto: None)
+
+    claves = ("contexto:ttl", "mensajes:ttl", "version:ttl")
+    assert {almacenamiento.ttl(clave) for clave in claves} == {TTL_CONTEXTO}
+
+
+class AlmacenamientoDisputado(AlmacenamientoEnMemoria):
+    """Simula otro proceso que escribe justo antes de cada ``cas``."""
+
+    def cas(self, clave_version, *args, **kwargs):
+        self.incr(clave_version)
+        return super().cas(clave_version, *args, **kwargs)
+
+
+def test_conflictos_se_reintentan_hasta_el_limite(
+    crear_contexto, crear_mensaje
+) -> None:
+    gestor = GestorContexto(AlmacenamientoDisputado(), max_reintentos=2)
+    gestor.inicializar_contexto(crear_contexto("registro"))
+    gestor.agregar_mensaje("registro", crear_mensaje(1, "agente"))
+
+    with pytest.raises(ConflictoConcurrencia):
+        gestor.actualizar("registro", lambda contexto: None)
+
+    assert gestor.estadisticas_escrituras() == {
+        "escrituras": 0,
+        "conflictos": 3,
+        "agotadas": 1,
+        "tasa_reintentos": 1.0,
+    }
+    assert len(gestor.obtener_contexto("registro").historial) == 1
@@ -0,0 +1,130 @@
+"""Pruebas para la pre-evaluación especulativa."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from autobot.commands import SistemaComandos, construir_sistema_comandos
+from autobot.context import AlmacenamientoEnMemoria, GestorContexto
+from autobot.especulacion import EvaluadorEspeculativo
+from autobot.evaluation import AnalizadorConversacion
+
+
+def _construir(llm, retardo: float = 0.05):
+    analizador = AnalizadorConversacion(llm)
+    especulador = EvaluadorEspeculativo(analizador, retardo=retardo)
+    gestor = GestorContexto(AlmacenamientoEnMemoria())
+    gestor.suscribir(especulador.al_agregar_mensaje)
+    return gestor, SistemaComandos(gestor, analizador, especulador), especulador
+
+
+@pytest.fixture()
+def simular(crear_mensaje):
+    """Conversa en la sesión ``s1`` con los roles dados y la finaliza."""
+
+    async def conversar(sistema, gestor, roles, esperar: float) -> str:
+        await sistema.procesar("comenzar test", "s1")
+        for turno, rol in enumerate(roles, start=1):
+            gestor.agregar_mensaje("s1", crear_mensaje(turno, rol))
+            await asyncio.sleep(esperar)
+        return await sistema.procesar("/finalizar", "s1")
+
+    return conversar
+
+
+def test_finalizar_reutiliza_resultado_especulativo(simular, llm_lento) -> None:
+    gestor, sistema, especulador = _construir(llm_lento)
+
+    informe = asyncio.run(
+        simular(sistema, gestor, ["cliente", "agente", "cliente", "agente"], 0.2)
+    )
+
+    assert "Puntaje global" in informe
+    estadisticas = especulador.estadisticas()
+    assert estadisticas["aprovechadas"] == 1
+    assert estadisticas["tasa_aprovechamiento"] == 1.0
+    # Dos pre-evaluaciones incrementales de tres criterios y ninguna al final.
+    assert llm_lento.llamadas == 6
+
+
+def test_turnos_nuevos_cancelan_trabajo_obsoleto(simular, llm_lento) -> None:
+    gestor, sistema, especulador = _construir(llm_lento)
+
+    asyncio.run(simular(sistema, gestor, ["agente", "agente", "agente"], 0))
+
+    estadisticas = especulador.estadisticas()
+    assert estadisticas["programadas"] == 3
+    assert estadisticas["canceladas"] == 2
+    assert llm_lento.llamadas == 3
+
+
+def test_resultado_parcial_se_complementa(simular, llm_lento) -> None:
+    gestor, sistema, especulador = _construir(llm_lento, retardo=0)
+
+    asyncio.run(simular(sistema, gestor, ["agente", "cliente"], 0.1))
+
+    estadisticas = especulador.estadisticas()
+    assert estadisticas["complementadas"] == 1
+    assert estadisticas["tasa_aprovechamiento"] == 0.0
+
+
+def test_sin_bucle_de_eventos_no_programa_nada(crear_mensaje, llm_lento) -> None:
+    especulador = EvaluadorEspeculativo(AnalizadorConversacion(llm_lento))
+    gestor = GestorContexto(AlmacenamientoEnMemoria())
+    gestor.suscribir(especulador.al_agregar_mensaje)
+
+    asyncio.run(
+        construir_sistema_comandos(gestor, llm_lento).procesar("comenzar test", "s1")
+    )
+    gestor.agregar_mensaje("s1", crear_mensaje(1, "agente"))
+
+    assert especulador.estadisticas()["programadas"] == 0
+
+
+def test_modo_especulativo_desde_la_fabrica(simular, llm_lento) -> None:
+    gestor = GestorContexto(AlmacenamientoEnMemoria())
+    sistema = construir_sistema_comandos(gestor, llm_lento, especulativo=True)
+
+    informe = asyncio.run(simular(sistema, gestor, ["cliente", "agente"], 0.2))
+
+    assert "Puntaje global" in informe
+    assert llm_lento.llamadas == 3
+
+
+def test_sesiones_abandonadas_se_descartan(crear_mensaje, llm_lento) -> None:
+    class Reloj:
+        ahora = 0.0
+
+        def __call__(self) -> float:
+            return self.ahora
+
+    reloj = Reloj()
+    especulador = EvaluadorEspeculativo(
+        AnalizadorConversacion(llm_lento),
+        retardo=10,
+        max_sesiones=2,
+        ttl=60,
+        reloj=reloj,
+    )
+    gestor = GestorContexto(AlmacenamientoEnMemoria())
+    gestor.suscribir(especulador.al_agregar_mensaje)
+    sistema = construir_sistema_comandos(gestor, llm_lento)
+
+    async def escenario() -> None:
+        for sesion_id in ("a", "b", "c"):
+            await sistema.procesar("comenzar test", sesion_id)
+            gestor.agregar_mensaje(sesion_id, crear_mensaje(1, "agente"))
+        assert especulador.estadisticas()["sesiones"] == 2
+        reloj.ahora += 61
+        await sistema.procesar("comenzar test", "d")
+        gestor.agregar_mensaje("d", crear_mensaje(1, "agente"))
+        await asyncio.sleep(0)
+
+    asyncio.run(escenario())
+
+    estadisticas = especulador.estadisticas()
+    assert (estadisticas["sesiones"], estadisticas["descartadas"]) == (1, 3)
+    assert estadisticas["canceladas"] == 3
+    assert llm_lento.llamadas == 0
@@ -0,0 +1,436 @@
+"""Pruebas del motor de evaluación."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+
+from autobot.cache import CacheVeredictos
+from autobot.commands import SistemaComandos
+from autobot.context import AlmacenamientoEnMemoria, GestorContexto
+from autobot.demo import LLMDePruebaStreaming
+from autobot.evaluation import (
+    AnalizadorConversacion,
+    ParserIncremental,
+    RubricaEvaluacion,
+)
+from autobot.models import (
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    MensajeConversacion,
+    PersonalidadCliente,
+)
+from autobot.scenarios import ESCENARIOS_OBRA
+
+PUNTAJES = {
+    "empatia_y_tono": 5,
+    "claridad_y_comunicacion": 2,
+    "resolucion_y_proactividad": 3,
+}
+
+
+def _criterio_del_prompt(prompt: str) -> str:
+    return next(nombre for nombre in PUNTAJES if f"criterio {nombre}" in prompt)
+
+
+class LLMConDemoras:
+    """Responde con un puntaje por criterio tras una demora configurable."""
+
+    def __init__(self, demoras: dict | None = None, fallar: str | None = None):
+        self.demoras = demoras or {}
+        self.fallar = fallar
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.cancelados: list[str] = []
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del temperature, max_tokens
+        nombre = _criterio_del_prompt(prompt)
+        self.en_curso += 1
+        self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        try:
+            await asyncio.sleep(self.demoras.get(nombre, 0.01))
+            if nombre == self.fallar:
+                raise RuntimeError("fallo del proveedor")
+        except asyncio.CancelledError:
+            self.cancelados.append(nombre)
+            raise
+        finally:
+            self.en_curso -= 1
+        return (
+            f"PUNTAJE: {PUNTAJES[nombre]}\n"
+            f"JUSTIFICACION: Evaluación de {nombre}.\n"
+            "EVIDENCIAS:\n"
+            '- Turno 2: "Te ayudo" (impacto=positivo)'
+        )
+
+
+@pytest.fixture()
+def contexto() -> ContextoConversacion:
+    configuracion = ConfiguracionSimulacion(
+        personalidad=PersonalidadCliente.PROFESIONAL_DIRECTO,
+        canal=CanalComunicacion.EMAIL,
+        escenario=ESCENARIOS_OBRA[0],
+        timestamp_inicio=datetime.now(UTC),
+    )
+    return ContextoConversacion(
+        sesion_id="evaluacion",
+        configuracion=configuracion,
+        estado_actual="en_progreso",
+        historial=[
+            MensajeConversacion(
+                turno=1,
+                rol="cliente",
+                contenido="El pedido #CM-2024-8847 no llegó",
+                timestamp=datetime.now(UTC),
+            ),
+            MensajeConversacion(
+                turno=2,
+                rol="agente",
+                contenido="Te ayudo ahora mismo con el envío",
+                timestamp=datetime.now(UTC),
+            ),
+        ],
+    )
+
+
+def test_criterios_concurrentes_conservan_orden(contexto) -> None:
+    llm = LLMConDemoras(
+        demoras={"empatia_y_tono": 0.05, "resolucion_y_proactividad": 0.0}
+    )
+    analizador = AnalizadorConversacion(llm, RubricaEvaluacion())
+
+    resultado = asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    assert [criterio.nombre for criterio in resultado.criterios] == list(PUNTAJES)
+    assert [criterio.puntaje for criterio in resultado.criterios] == [5, 2, 3]
+    assert llm.max_en_curso == 3
+
+
+def test_limite_de_concurrencia(contexto) -> None:
+    llm = LLMConDemoras()
+    analizador = AnalizadorConversacion(llm, max_concurrencia=1)
+
+    asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    assert llm.max_en_curso == 1
+
+
+def test_timeout_por_criterio_cancela_al_resto(contexto) -> None:
+    llm = LLMConDemoras(
+        demoras={"empatia_y_tono": 5, "claridad_y_comunicacion": 5}
+    )
+    analizador = AnalizadorConversacion(llm, timeout_criterio=0.05)
+
+    with pytest.raises(TimeoutError, match="empatia_y_tono|claridad"):
+        asyncio.run(analizador.evaluar_conversacion(contexto))
+
+
+def test_error_fatal_cancela_criterios_pendientes(contexto) -> None:
+    llm = LLMConDemoras(
+        demoras={"empatia_y_tono": 5, "claridad_y_comunicacion": 5},
+        fallar="resolucion_y_proactividad",
+    )
+    analizador = AnalizadorConversacion(llm)
+
+    with pytest.raises(RuntimeError, match="fallo del proveedor"):
+        asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    assert sorted(llm.cancelados) == ["claridad_y_comunicacion", "empatia_y_tono"]
+
+
+def test_max_concurrencia_invalida() -> None:
+    with pytest.raises(ValueError):
+        AnalizadorConversacion(LLMConDemoras(), max_concurrencia=0)
+
+
+class LLMConjunto:
+    """Responde al prompt conjunto omitiendo un criterio y rompiendo otro."""
+
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del temperature, max_tokens
+        self.prompts.append(prompt)
+        if "### CRITERIO:" in prompt:
+            return (
+                "### CRITERIO: resolucion_y_proactividad\n"
+                "PUNTAJE: 4\n"
+                "JUSTIFICACION: Propuso un envío concreto.\n"
+                "EVIDENCIAS:\n"
+                '- Turno 2: "Te ayudo ahora mismo" (impacto=positivo)\n\n'
+                "### CRITERIO: empatia_y_tono\n"
+                "JUSTIFICACION: Falta el puntaje.\n"
+            )
+        nombre = _criterio_del_prompt(prompt)
+        return f"PUNTAJE: {PUNTAJES[nombre]}\nJUSTIFICACION: Individual."
+
+
+def test_estrategia_conjunta_reevalua_criterios_no_parseados(contexto) -> None:
+    llm = LLMConjunto()
+    analizador = AnalizadorConversacion(llm, estrategia="conjunta")
+
+    resultado = asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    assert [criterio.nombre for criterio in resultado.criterios] == list(PUNTAJES)
+    assert [criterio.puntaje for criterio in resultado.criterios] == [5, 2, 4]
+    resolucion = resultado.criterios[2]
+    assert resolucion.justificacion == "Propuso un envío concreto."
+    assert resolucion.evidencias[0].turno == 2
+    assert len(llm.prompts) == 3
+    assert llm.prompts[0].count("Turno 1 (cliente)") == 1
+
+
+def test_estrategia_desconocida() -> None:
+    with pytest.raises(ValueError, match="Estrategia"):
+        AnalizadorConversacion(LLMConjunto(), estrategia="otra")  # type: ignore[arg-type]
+
+
+def test_evaluacion_incremental_envia_solo_turnos_nuevos(
+    contexto, llm_registro
+) -> None:
+    analizador = AnalizadorConversacion(llm_registro)
+    _, punto_control = asyncio.run(analizador.evaluar_incremental(contexto))
+    assert punto_control.turnos_evaluados == 2
+
+    contexto.historial.append(
+        MensajeConversacion(
+            turno=3,
+            rol="agente",
+            contenido="El camión llega mañana a las 9",
+            timestamp=datetime.now(UTC),
+        )
+    )
+    llm_registro.prompts.clear()
+    llm_registro.puntaje, llm_registro.turno = 5, 3
+
+    resultado, punto_control = asyncio.run(
+        analizador.evaluar_incremental(contexto, punto_control)
+    )
+
+    assert len(llm_registro.prompts) == 3
+    assert all("Turno 1 (cliente)" not in prompt for prompt in llm_registro.prompts)
+    assert all("Turno 3 (agente)" in prompt for prompt in llm_registro.prompts)
+    assert all("PUNTAJE: 3" in prompt for prompt in llm_registro.prompts)
+    assert [criterio.puntaje for criterio in resultado.criterios] == [5, 5, 5]
+    assert [evidencia.turno for evidencia in resultado.criterios[0].evidencias] == [
+        1,
+        3,
+    ]
+    assert punto_control.turnos_evaluados == 3
+
+
+def test_evaluacion_incremental_sin_turnos_nuevos_no_llama_al_llm(
+    contexto, llm_registro
+) -> None:
+    analizador = AnalizadorConversacion(llm_registro)
+    _, punto_control = asyncio.run(analizador.evaluar_incremental(contexto))
+    llm_registro.prompts.clear()
+
+    resultado, _ = asyncio.run(analizador.evaluar_incremental(contexto, punto_control))
+
+    assert llm_registro.prompts == []
+    assert resultado.puntaje_global > 0
+
+
+def _con_turno_nuevo(contexto: ContextoConversacion) -> ContextoConversacion:
+    contexto.historial.append(
+        MensajeConversacion(
+            turno=3, rol="agente", contenido="Listo", timestamp=datetime.now(UTC)
+        )
+    )
+    return contexto
+
+
+def test_evaluacion_incremental_rechaza_punto_control_de_otra_sesion(
+    contexto, llm_registro
+) -> None:
+    analizador = AnalizadorConversacion(llm_registro)
+    _, punto_control = asyncio.run(analizador.evaluar_incremental(contexto))
+    punto_control.sesion_id = "otra"
+
+    with pytest.raises(ValueError, match="otra"):
+        asyncio.run(analizador.evaluar_incremental(contexto, punto_control))
+
+
+def test_evaluacion_incremental_usa_la_cache(contexto, llm_registro) -> None:
+    analizador = AnalizadorConversacion(llm_registro, cache=CacheVeredictos())
+    _, punto_control = asyncio.run(analizador.evaluar_incremental(contexto))
+    _con_turno_nuevo(contexto)
+
+    primero, _ = asyncio.run(analizador.evaluar_incremental(contexto, punto_control))
+    llm_registro.prompts.clear()
+    segundo, _ = asyncio.run(analizador.evaluar_incremental(contexto, punto_control))
+
+    assert llm_registro.prompts == []
+    assert segundo.criterios == primero.criterios
+
+
+class LLMConjuntoIncremental:
+    """Responde una sección por cada criterio que aparece en el prompt."""
+
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del temperature, max_tokens
+        self.prompts.append(prompt)
+        return "\n\n".join(
+            f"### CRITERIO: {nombre}\n"
+            "PUNTAJE: 4\n"
+            "JUSTIFICACION: Actualizado en conjunto.\n"
+            "EVIDENCIAS:\n"
+            '- Turno 3: "Listo" (impacto=positivo)'
+            for nombre in PUNTAJES
+            if f"## Criterio {nombre}" in prompt
+        )
+
+
+def test_evaluacion_incremental_respeta_la_estrategia_conjunta(contexto) -> None:
+    llm = LLMConjuntoIncremental()
+    analizador = AnalizadorConversacion(llm, estrategia="conjunta")
+    _, punto_control = asyncio.run(analizador.evaluar_incremental(contexto))
+    _con_turno_nuevo(contexto)
+    llm.prompts.clear()
+
+    resultado, _ = asyncio.run(analizador.evaluar_incremental(contexto, punto_control))
+
+    assert len(llm.prompts) == 1
+    assert "Evaluación previa:\nPUNTAJE: 4" in llm.prompts[0]
+    assert [criterio.puntaje for criterio in resultado.criterios] == [4, 4, 4]
+    assert [evidencia.turno for evidencia in resultado.criterios[0].evidencias] == [3]
+
+
+def test_punto_control_se_reanuda_desde_el_almacenamiento(
+    contexto, llm_registro
+) -> None:
+    almacenamiento = AlmacenamientoEnMemoria()
+    GestorContexto(almacenamiento).inicializar_contexto(contexto)
+    asyncio.run(
+        SistemaComandos(
+            GestorContexto(almacenamiento), AnalizadorConversacion(llm_registro)
+        ).procesar("/evaluar", contexto.sesion_id)
+    )
+
+    otro_gestor = GestorContexto(almacenamiento)
+    otro_gestor.agregar_mensaje(
+        contexto.sesion_id,
+        MensajeConversacion(
+            turno=3, rol="agente", contenido="Listo", timestamp=datetime.now(UTC)
+        ),
+    )
+    llm_registro.prompts.clear()
+    informe = asyncio.run(
+        SistemaComandos(otro_gestor, AnalizadorConversacion(llm_registro)).procesar(
+            "/finalizar", contexto.sesion_id
+        )
+    )
+
+    assert "Puntaje global" in informe
+    assert all("Nuevos turnos:\nTurno 3 (agente)" in p for p in llm_registro.prompts)
+    punto_control = otro_gestor.obtener_punto_control(contexto.sesion_id)
+    assert punto_control.turnos_evaluados == 3
+    assert punto_control.criterios["empatia_y_tono"].evidencias[0].criterio == (
+        "empatia_y_tono"
+    )
+
+
+RESPUESTA_CON_COLA = (
+    "PUNTAJE: 2\n"
+    "JUSTIFICACION: Respuestas\nmuy breves.\n"
+    "EVIDENCIAS:\n"
+    '- Turno 2: "Te ayudo" (impacto=negativo)\n'
+    "\n"
+    "Nota adicional que el modelo sigue escribiendo sin aportar nada.\n"
+)
+
+
+class LLMStreamingConCola(LLMDePruebaStreaming):
+    """Emite un bloque estructurado seguido de texto irrelevante."""
+
+    async def generate(  # type: ignore[override]
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:
+        del prompt, temperature, max_tokens
+        return RESPUESTA_CON_COLA
+
+
+def test_parser_incremental_coincide_con_el_parser_completo() -> None:
+    parser = ParserIncremental("empatia_y_tono")
+    eventos = []
+    for caracter in RESPUESTA_CON_COLA:
+        eventos.extend(parser.alimentar(caracter))
+    eventos.extend(parser.finalizar())
+
+    assert [evento.campo for evento in eventos] == [
+        "puntaje",
+        "justificacion",
+        "evidencia",
+    ]
+    assert parser.completo
+    assert parser.resultado() == AnalizadorConversacion._parsear_respuesta(
+        RESPUESTA_CON_COLA, "empatia_y_tono"
+    )
+
+
+def test_parser_incremental_ignora_lineas_vacias_entre_evidencias() -> None:
+    respuesta = (
+        "PUNTAJE: 4\n"
+        "JUSTIFICACION: Bien.\n"
+        "EVIDENCIAS:\n"
+        "\n"
+        '- Turno 1: "Hola" (impacto=positivo)\n'
+        "\n"
+        '- Turno 2: "Te ayudo" (impacto=positivo)\n'
+    )
+    parser = ParserIncremental("empatia_y_tono")
+    parser.alimentar(respuesta)
+
+    assert not parser.completo
+    parser.finalizar()
+    assert parser.resultado() == AnalizadorConversacion._parsear_respuesta(
+        respuesta, "empatia_y_tono"
+    )
+    assert len(parser.resultado()[2]) == 2
+
+
+def test_parser_incremental_sin_puntaje() -> None:
+    parser = ParserIncremental("empatia_y_tono")
+    parser.alimentar("JUSTIFICACION: Sin número")
+    parser.finalizar()
+
+    with pytest.raises(ValueError, match="puntaje"):
+        parser.resultado()
+
+
+def test_streaming_notifica_parciales_y_corta_la_generacion(contexto) -> None:
+    llm = LLMStreamingConCola(retardo_token=0.001)
+    eventos = []
+    analizador = AnalizadorConversacion(llm, al_recibir_parcial=eventos.append)
+
+    resultado = asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    assert [criterio.puntaje for criterio in resultado.criterios] == [2, 2, 2]
+    assert len(eventos) == 9
+    assert eventos[0].campo == "puntaje" and eventos[0].valor == 2
+    tokens_por_respuesta = len(RESPUESTA_CON_COLA.split())
+    assert llm.tokens_emitidos < 3 * tokens_por_respuesta
+
+
+def test_demo_con_llm_streaming(contexto) -> None:
+    analizador = AnalizadorConversacion(LLMDePruebaStreaming())
+
+    resultado = asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    assert all(criterio.puntaje == 4 for criterio in resultado.criterios)
+    assert all(len(criterio.evidencias) == 2 for criterio in resultado.criterios)
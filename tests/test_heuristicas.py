@@ -0,0 +1,103 @@
+"""Pruebas de la cascada heurística de evaluación."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from autobot.evaluation import AnalizadorConversacion
+from autobot.heuristicas import EvaluadorHeuristico, resumir_cascada
+
+EMPATICO = (
+    "Lamento mucho la demora, entiendo su frustración y comprendo lo importante "
+    "que es para su obra. Voy a ayudar personalmente y le doy total confianza."
+)
+
+
+@pytest.fixture()
+def dialogo(crear_contexto, crear_mensaje):
+    """Contexto que alterna un reclamo del cliente con cada respuesta del agente."""
+
+    def construir(mensajes_agente: list[str]):
+        historial = []
+        for indice, contenido in enumerate(mensajes_agente):
+            historial.append(crear_mensaje(2 * indice + 1, contenido="¿Y mi pedido?"))
+            historial.append(crear_mensaje(2 * indice + 2, contenido=contenido))
+        return crear_contexto("cascada", historial, estado_actual="finalizado")
+
+    return construir
+
+
+def test_heuristica_confiada_en_casos_claros(dialogo) -> None:
+    estimacion = EvaluadorHeuristico().evaluar(
+        dialogo([EMPATICO] * 3), "empatia_y_tono"
+    )
+
+    assert estimacion.puntaje == 5
+    assert estimacion.confianza >= 0.8
+    assert estimacion.evidencias[0].impacto == "positivo"
+
+
+def test_heuristica_poco_confiada_con_un_solo_turno(dialogo) -> None:
+    estimacion = EvaluadorHeuristico().evaluar(dialogo(["Ok."]), "empatia_y_tono")
+
+    assert estimacion.confianza < 0.5
+
+
+def test_criterio_sin_heuristica(dialogo) -> None:
+    assert EvaluadorHeuristico().evaluar(dialogo([EMPATICO]), "otro") is None
+
+
+def test_cascada_registra_el_nivel_y_ahorra_llamadas(
+    dialogo, llm_contador, llm_registro
+) -> None:
+    contexto = dialogo([EMPATICO] * 3)
+    llm = llm_contador
+    cascada = AnalizadorConversacion(
+        llm, heuristico=EvaluadorHeuristico(), umbral_confianza=0.8
+    )
+
+    resultado = asyncio.run(cascada.evaluar_conversacion(contexto))
+
+    origenes = {criterio.nombre: criterio.origen for criterio in resultado.criterios}
+    assert origenes["empatia_y_tono"] == "heuristica"
+    assert llm.llamadas == sum(1 for o in origenes.values() if o == "llm")
+    assert llm.llamadas < 3
+
+    llm_registro.puntaje = 5
+    referencia = asyncio.run(
+        AnalizadorConversacion(llm_registro).evaluar_conversacion(contexto)
+    )
+    resumen = resumir_cascada([resultado], [referencia])
+    assert resumen["criterios"] == 3
+    assert resumen["tasa_llamadas_evitadas"] == (3 - llm.llamadas) / 3
+    assert resumen["acuerdo_tolerante"] > 0
+
+
+def test_cascada_en_estrategia_conjunta(dialogo, llm_contador) -> None:
+    llm = llm_contador
+    analizador = AnalizadorConversacion(
+        llm, estrategia="conjunta", heuristico=EvaluadorHeuristico()
+    )
+
+    resultado = asyncio.run(analizador.evaluar_conversacion(dialogo([EMPATICO] * 3)))
+
+    assert resultado.criterios[0].origen == "heuristica"
+    assert [c.nombre for c in resultado.criterios][0] == "empatia_y_tono"
+
+
+def test_cascada_en_evaluacion_incremental(dialogo, llm_contador) -> None:
+    llm = llm_contador
+    analizador = AnalizadorConversacion(llm, heuristico=EvaluadorHeuristico())
+    _, punto_control = asyncio.run(
+        analizador.evaluar_incremental(dialogo([EMPATICO] * 2))
+    )
+    llamadas = llm.llamadas
+
+    resultado, _ = asyncio.run(
+        analizador.evaluar_incremental(dialogo([EMPATICO] * 3), punto_control)
+    )
+
+    assert resultado.criterios[0].origen == "heuristica"
+    assert llm.llamadas - llamadas < 3
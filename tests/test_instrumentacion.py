@@ -0,0 +1,113 @@
+"""Pruebas de la instrumentación de llamadas al LLM."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from autobot.cache import CacheVeredictos
+from autobot.demo import LLMDePruebaStreaming
+from autobot.evaluation import AnalizadorConversacion, ErrorTransitorioLLM
+from autobot.instrumentacion import Histograma, RegistroMetricas
+from autobot.lote import evaluar_lote
+
+
+class LLMGuionado:
+    def __init__(self, respuesta: str = "PUNTAJE: 4\nJUSTIFICACION: Bien.") -> None:
+        self.respuesta = respuesta
+        self.fallos_pendientes = 0
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del prompt, temperature, max_tokens
+        if self.fallos_pendientes:
+            self.fallos_pendientes -= 1
+            raise ErrorTransitorioLLM("saturado")
+        return self.respuesta
+
+
+@pytest.fixture()
+def contexto(crear_contexto, crear_mensaje):
+    return crear_contexto(
+        "m1", [crear_mensaje(1, "agente", "Hola")], estado_actual="finalizado"
+    )
+
+
+def test_histograma_acumula_y_aproxima_percentiles() -> None:
+    histograma = Histograma([1, 10, 100])
+    for valor in (0.5, 5, 5, 50, 500):
+        histograma.observar(valor)
+
+    datos = histograma.a_dict()
+    assert datos["cantidad"] == 5
+    assert datos["cubetas"] == {"1": 1, "10": 2, "100": 1, "+Inf": 1}
+    assert histograma.percentil(0.5) == 10
+    assert histograma.percentil(1.0) == 500
+
+
+def test_analizador_registra_latencia_tamanos_y_cache(contexto) -> None:
+    metricas = RegistroMetricas()
+    observadas: list[str] = []
+    metricas.suscribir(lambda nombre, etiquetas, valor: observadas.append(nombre))
+    analizador = AnalizadorConversacion(
+        LLMGuionado(), cache=CacheVeredictos(), metricas=metricas
+    )
+
+    asyncio.run(analizador.evaluar_conversacion(contexto))
+    asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    etiquetas = {"criterio": "empatia_y_tono"}
+    assert metricas.contador("llm_llamadas", etiquetas) == 1
+    assert metricas.contador("cache_fallos", etiquetas) == 1
+    assert metricas.contador("cache_aciertos", etiquetas) == 1
+    prompt = metricas.histograma("llm_prompt_caracteres", etiquetas)
+    assert prompt is not None and prompt.minimo > 100
+    respuesta = metricas.histograma("llm_respuesta_tokens", etiquetas)
+    assert respuesta is not None and respuesta.suma == 8
+    assert metricas.histograma(
+        "criterio_segundos", {**etiquetas, "origen": "cache"}
+    ).cantidad == 1
+    assert "llm_llamada_segundos" in observadas
+
+    exportado = metricas.exportar()
+    assert exportado["contadores"]['llm_llamadas{criterio="empatia_y_tono"}'] == 1
+    texto = metricas.exportar_prometheus()
+    assert 'llm_llamadas_total{criterio="empatia_y_tono"} 1' in texto
+    assert 'criterio_segundos_count{criterio="empatia_y_tono",origen="llm"} 1' in texto
+
+
+def test_errores_de_parseo_y_streaming(contexto) -> None:
+    metricas = RegistroMetricas()
+    analizador = AnalizadorConversacion(LLMGuionado("sin formato"), metricas=metricas)
+    with pytest.raises(ValueError):
+        asyncio.run(analizador.evaluar_conversacion(contexto))
+    assert metricas.contador("errores_parseo", {"criterio": "empatia_y_tono"}) == 1
+
+    metricas = RegistroMetricas()
+    llm = LLMDePruebaStreaming()
+    analizador = AnalizadorConversacion(llm, metricas=metricas)
+    asyncio.run(analizador.evaluar_conversacion(contexto))
+    respuesta = metricas.histograma(
+        "llm_respuesta_caracteres", {"criterio": "empatia_y_tono"}
+    )
+    assert respuesta is not None and respuesta.suma > 0
+
+
+def test_reintentos_del_lote_quedan_registrados(contexto) -> None:
+    metricas = RegistroMetricas()
+    llm = LLMGuionado()
+    llm.fallos_pendientes = 2
+    analizador = AnalizadorConversacion(llm, metricas=metricas)
+
+    async def consumir():
+        return [
+            resultado
+            async for resultado in evaluar_lote(
+                analizador, [contexto], espera_reintento=0
+            )
+        ]
+
+    assert len(asyncio.run(consumir())) == 1
+    assert metricas.contador("llm_reintentos") == 2
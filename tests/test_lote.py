@@ -0,0 +1,200 @@
+"""Pruebas de la evaluación masiva de sesiones."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+
+from autobot.evaluation import AnalizadorConversacion, ErrorTransitorioLLM
+from autobot.lote import ProgresoLote, evaluar_lote
+from autobot.models import (
+    CanalComunicacion,
+    ConfiguracionSimulacion,
+    ContextoConversacion,
+    MensajeConversacion,
+    PersonalidadCliente,
+)
+from autobot.scenarios import ESCENARIOS_OBRA
+
+
+class LLMInestable:
+    """Falla de forma transitoria en las primeras llamadas de cada sesión marcada."""
+
+    def __init__(self, fallos_por_prompt: int = 0, fatal: str | None = None) -> None:
+        self.fallos_por_prompt = fallos_por_prompt
+        self.fatal = fatal
+        self.intentos: dict[str, int] = {}
+        self.en_curso = 0
+        self.max_en_curso = 0
+
+    async def generate(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:  # noqa: D401
+        del temperature, max_tokens
+        self.en_curso += 1
+        self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        try:
+            await asyncio.sleep(0.005)
+            if self.fatal is not None and self.fatal in prompt:
+                raise ValueError("respuesta inválida")
+            intentos = self.intentos.get(prompt, 0)
+            self.intentos[prompt] = intentos + 1
+            if intentos < self.fallos_por_prompt:
+                raise ErrorTransitorioLLM("sobrecarga")
+            return "PUNTAJE: 4\nJUSTIFICACION: Bien."
+        finally:
+            self.en_curso -= 1
+
+
+class LLMInestableStreaming(LLMInestable):
+    """Emite la respuesta por palabras; puede cortar el flujo tras el primer token."""
+
+    def __init__(self, fallos_por_prompt: int = 0, corte: str | None = None) -> None:
+        super().__init__(fallos_por_prompt)
+        self.corte = corte
+
+    async def generate_stream(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ):  # noqa: D401
+        respuesta = await self.generate(
+            prompt, temperature=temperature, max_tokens=max_tokens
+        )
+        for indice, palabra in enumerate(respuesta.split(" ")):
+            if indice == 1 and self.corte is not None and self.corte in prompt:
+                raise ErrorTransitorioLLM("conexión cortada")
+            yield palabra + " "
+
+
+def _contextos(cantidad: int, generados: list[str] | None = None):
+    for indice in range(cantidad):
+        if generados is not None:
+            generados.append(f"s{indice}")
+        yield ContextoConversacion(
+            sesion_id=f"s{indice}",
+            configuracion=ConfiguracionSimulacion(
+                personalidad=PersonalidadCliente.ANSIOSO_DETALLISTA,
+                canal=CanalComunicacion.CHAT,
+                escenario=ESCENARIOS_OBRA[0],
+                timestamp_inicio=datetime.now(UTC),
+            ),
+            estado_actual="finalizado",
+            historial=[
+                MensajeConversacion(
+                    turno=1,
+                    rol="cliente",
+                    contenido=f"Consulta de la sesión s{indice}",
+                    timestamp=datetime.now(UTC),
+                )
+            ],
+        )
+
+
+async def _recolectar(iterador) -> list:
+    return [resultado async for resultado in iterador]
+
+
+def test_lote_respeta_limites_y_consume_perezosamente() -> None:
+    llm = LLMInestable()
+    generados: list[str] = []
+    maximo_pendiente = 0
+
+    def al_progresar(progreso: ProgresoLote) -> None:
+        nonlocal maximo_pendiente
+        maximo_pendiente = max(maximo_pendiente, progreso.en_curso)
+        assert len(generados) - progreso.completadas <= 3
+
+    resultados = asyncio.run(
+        _recolectar(
+            evaluar_lote(
+                AnalizadorConversacion(llm),
+                _contextos(20, generados),
+                max_sesiones=3,
+                max_llamadas_llm=4,
+                al_progresar=al_progresar,
+            )
+        )
+    )
+
+    assert sorted(r.sesion_id for r in resultados) == sorted(f"s{i}" for i in range(20))
+    assert llm.max_en_curso <= 4
+    assert maximo_pendiente == 3
+
+
+def test_lote_reintenta_errores_transitorios() -> None:
+    llm = LLMInestable(fallos_por_prompt=2)
+    progresos: list[int] = []
+
+    resultados = asyncio.run(
+        _recolectar(
+            evaluar_lote(
+                AnalizadorConversacion(llm),
+                _contextos(2),
+                espera_reintento=0.001,
+                al_progresar=lambda progreso: progresos.append(progreso.reintentos),
+            )
+        )
+    )
+
+    assert len(resultados) == 2
+    assert progresos[-1] == 2 * 3 * 2
+
+
+def test_lote_reintenta_flujos_antes_del_primer_fragmento() -> None:
+    llm = LLMInestableStreaming(fallos_por_prompt=2, corte="sesión s1")
+    progresos: list[int] = []
+    fallos: list[str] = []
+
+    resultados = asyncio.run(
+        _recolectar(
+            evaluar_lote(
+                AnalizadorConversacion(llm),
+                _contextos(2),
+                espera_reintento=0.001,
+                al_progresar=lambda progreso: progresos.append(progreso.reintentos),
+                al_fallar=lambda contexto, error: fallos.append(contexto.sesion_id),
+            )
+        )
+    )
+
+    assert [r.sesion_id for r in resultados] == ["s0"]
+    assert fallos == ["s1"]
+    # El primer criterio de s1 que agota sus intentos cancela a los demás, que
+    # pueden quedar en cualquier intento según el orden de planificación.
+    s0 = [n for prompt, n in llm.intentos.items() if "sesión s1" not in prompt]
+    s1 = [n for prompt, n in llm.intentos.items() if "sesión s1" in prompt]
+    assert s0 == [3, 3, 3]
+    assert max(s1) == 3 and all(intentos <= 3 for intentos in s1)
+    assert 3 * 2 + 2 <= progresos[-1] <= 2 * 3 * 2
+
+
+def test_lote_acepta_iterables_asincronos_y_aisla_fallos() -> None:
+    async def fuente():
+        for contexto in _contextos(3):
+            yield contexto
+
+    fallos = []
+    llm = LLMInestable(fatal="sesión s1")
+
+    resultados = asyncio.run(
+        _recolectar(
+            evaluar_lote(
+                AnalizadorConversacion(llm),
+                fuente(),
+                al_fallar=lambda contexto, error: fallos.append(contexto.sesion_id),
+            )
+        )
+    )
+
+    assert sorted(r.sesion_id for r in resultados) == ["s0", "s2"]
+    assert fallos == ["s1"]
+
+
+def test_lote_limites_invalidos() -> None:
+    with pytest.raises(ValueError):
+        asyncio.run(
+            _recolectar(
+                evaluar_lote(AnalizadorConversacion(LLMInestable()), [], max_sesiones=0)
+            )
+        )
@@ -0,0 +1,106 @@
+"""Pruebas del motor de métricas de conversación."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from autobot.demo import LLMDePrueba
+from autobot.evaluation import AnalizadorConversacion, RubricaEvaluacion
+from autobot.metricas import MotorMetricas, compilar_marcadores
+from autobot.models import PersonalidadCliente
+
+INICIO = datetime(2026, 1, 1, 9, 0, tzinfo=UTC)
+
+
+@pytest.fixture()
+def conversacion(crear_contexto, crear_mensaje):
+    """Contexto a partir de tuplas ``(rol, contenido, segundos desde el inicio)``."""
+
+    def construir(
+        mensajes: list[tuple[str, str, int]],
+        personalidad: PersonalidadCliente = PersonalidadCliente.ENOJADO_IMPACIENTE,
+    ):
+        historial = [
+            crear_mensaje(
+                indice, rol, contenido, timestamp=INICIO + timedelta(seconds=segundos)
+            )
+            for indice, (rol, contenido, segundos) in enumerate(mensajes, start=1)
+        ]
+        return crear_contexto(
+            "metricas",
+            historial,
+            personalidad=personalidad,
+            timestamp_inicio=INICIO,
+            estado_actual="finalizado",
+        )
+
+    return construir
+
+
+def test_metricas_en_una_pasada(conversacion) -> None:
+    contexto = conversacion(
+        [
+            ("cliente", "¿Dónde está mi pedido?", 0),
+            ("agente", "Estoy revisando el sistema.", 30),
+            ("cliente", "Necesito el acero hoy.", 40),
+            ("cliente", "¡Ya es la tercera vez!", 50),
+            ("agente", "Entiendo su frustración. ¿Entendí bien que es urgente?", 70),
+            ("cliente", "Sí.", 90),
+            ("agente", "Le propongo reprogramar la entrega para las 16:00.", 100),
+        ]
+    )
+
+    metricas = MotorMetricas(RubricaEvaluacion()).calcular(contexto)
+
+    assert metricas == {
+        "turnos_totales": 7,
+        "turnos_hasta_empatia": 5,
+        "turnos_hasta_solucion": 7,
+        "confirmaciones_entendimiento": 1,
+        "interrupciones": 1,
+        "tiempo_respuesta_promedio": 20.0,
+    }
+
+
+def test_palabras_calmantes_del_perfil_cuentan_como_empatia(conversacion) -> None:
+    mensajes = [
+        ("cliente", "Esto es el colmo.", 0),
+        ("agente", "Me haré cargo personalmente del pedido.", 5),
+    ]
+    motor = MotorMetricas(RubricaEvaluacion())
+
+    enojado = motor.calcular(conversacion(mensajes))
+    otro = motor.calcular(
+        conversacion(mensajes, PersonalidadCliente.ANSIOSO_DETALLISTA)
+    )
+
+    assert enojado["turnos_hasta_empatia"] == 2
+    assert otro["turnos_hasta_empatia"] is None
+
+
+def test_marcadores_se_buscan_como_prefijo_de_palabra() -> None:
+    detector = compilar_marcadores(["disculp", "  "])
+
+    assert detector.search("Le pido DISCULPAS")
+    assert not detector.search("indisculpable")
+    assert compilar_marcadores([]) is None
+
+
+def test_resultado_incluye_metricas_calculadas(conversacion) -> None:
+    contexto = conversacion(
+        [
+            ("cliente", "Hola", 0),
+            ("agente", "Lamento la demora, le enviaré el detalle.", 12),
+        ]
+    )
+
+    resultado = asyncio.run(
+        AnalizadorConversacion(LLMDePrueba()).evaluar_conversacion(contexto)
+    )
+
+    assert resultado.metricas["turnos_hasta_empatia"] == 2
+    assert resultado.metricas["turnos_hasta_solucion"] == 2
+    assert resultado.metricas["tiempo_respuesta_promedio"] == 12.0
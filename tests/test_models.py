@@ -1,20 +1,25 @@
 """Pruebas básicas para los modelos del sistema."""
 
 import asyncio
-from datetime import UTC, datetime
+import sys
+from dataclasses import asdict, replace
+from datetime import UTC, datetime, timedelta, timezone
 
 import pytest
 
+from autobot.codificacion import CodecBinario, CodecJSON, decodificar_mensaje
 from autobot.context import AlmacenamientoEnMemoria, GestorContexto
 from autobot.evaluation import AnalizadorConversacion, RubricaEvaluacion
 from autobot.models import (
     CanalComunicacion,
     ConfiguracionSimulacion,
     ContextoConversacion,
+    EvidenciaEvaluacion,
     MensajeConversacion,
     PersonalidadCliente,
 )
 from autobot.scenarios import ESCENARIOS_OBRA
+from autobot.serializacion import a_dict
 
 
 class DummyLLM:
@@ -91,3 +96,71 @@ def test_gestor_contexto(contexto: ContextoConversacion) -> None:
     contexto_recuperado = gestor.obtener_contexto(contexto.sesion_id)
     assert contexto_recuperado.datos_clave_mencionados["numero_pedido"]
     assert contexto_recuperado.datos_clave_mencionados["fecha_problema"]
+
+
+def test_modelos_con_slots_sin_dict(contexto: ContextoConversacion) -> None:
+    evidencia = EvidenciaEvaluacion("empatia", 1, "Lo siento", "positivo")
+
+    for objeto in (contexto, contexto.historial[0], evidencia):
+        assert not hasattr(objeto, "__dict__")
+    with pytest.raises(AttributeError):
+        contexto.historial[0].inexistente = 1
+
+
+def test_mensaje_interna_rol_y_crea_metadatos_a_demanda() -> None:
+    rol = "".join(["clie", "nte"])
+    mensaje = MensajeConversacion(1, rol, "Hola", datetime.now(UTC))
+
+    assert mensaje.rol is sys.intern("cliente")
+    assert mensaje.metadatos == {}
+    mensaje.metadatos["canal"] = "chat"
+    assert mensaje.metadatos == {"canal": "chat"}
+    assert asdict(mensaje)["metadatos"] == {"canal": "chat"}
+    assert replace(mensaje, turno=2).metadatos == {"canal": "chat"}
+
+
+def test_marca_compacta_conserva_el_instante() -> None:
+    zona = timezone(timedelta(hours=-3))
+    momento = datetime(2026, 5, 4, 9, 30, 15, 123456, tzinfo=zona)
+    completo = MensajeConversacion(1, "agente", "Hola", momento)
+    compacto = MensajeConversacion(1, "agente", "Hola", momento, marca_compacta=True)
+
+    assert compacto == completo
+    assert compacto.timestamp.tzinfo is timezone.utc
+    assert compacto.timestamp == momento
+    sin_zona = MensajeConversacion(
+        1, "agente", "Hola", datetime(2026, 5, 4, 12), marca_compacta=True
+    )
+    assert sin_zona.timestamp == datetime(2026, 5, 4, 12, tzinfo=UTC)
+
+
+def test_codificar_y_comparar_no_crean_metadatos(crear_contexto, crear_mensaje) -> None:
+    mensaje = crear_mensaje(1, "agente")
+    gestor = GestorContexto(AlmacenamientoEnMemoria(), codec=CodecBinario())
+    gestor.inicializar_contexto(crear_contexto("lazy"))
+    gestor.agregar_mensaje("lazy", mensaje)
+
+    for codec in (CodecJSON(), CodecBinario()):
+        decodificado = decodificar_mensaje(codec.codificar_mensaje(mensaje))
+        assert decodificado == mensaje and "metadatos={}" in repr(decodificado)
+        assert not decodificado._tiene_metadatos()
+    assert a_dict(mensaje)["metadatos"] == {}
+    assert not mensaje._tiene_metadatos()
+    mensaje.metadatos["canal"] = "chat"
+    assert a_dict(mensaje)["metadatos"] == {"canal": "chat"}
+    assert mensaje != replace(mensaje, metadatos=None)
+
+
+def test_decodificador_binario_guarda_marcas_utc_compactas(crear_mensaje) -> None:
+    codec = CodecBinario()
+    utc = crear_mensaje(1)
+    local = crear_mensaje(2, timestamp=datetime.now(timezone(timedelta(hours=-3))))
+
+    compacto, con_zona = (
+        decodificar_mensaje(codec.codificar_mensaje(mensaje))
+        for mensaje in (utc, local)
+    )
+
+    assert (compacto, con_zona) == (utc, local)
+    assert hasattr(compacto, "_marca") and not hasattr(con_zona, "_marca")
+    assert con_zona.timestamp.utcoffset() == timedelta(hours=-3)
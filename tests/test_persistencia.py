@@ -0,0 +1,332 @@
+"""Pruebas del almacenamiento durable en SQLite y del escalonado."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+
+from autobot.commands import construir_sistema_comandos
+from autobot.context import GestorContexto
+from autobot.demo import LLMDePrueba
+from autobot.models import (
+    CanalComunicacion,
+    PersonalidadCliente,
+    ResultadoEvaluacion,
+)
+from autobot.codificacion import CodecBinario
+from autobot.persistencia import AlmacenamientoEscalonado, AlmacenamientoSQLite
+from autobot.scenarios import ESCENARIOS_OBRA, RegistroEscenarios
+
+
+class Reloj:
+    def __init__(self) -> None:
+        self.ahora = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+
+def _resultado(
+    sesion_id: str, minuto: int, canal: CanalComunicacion
+) -> ResultadoEvaluacion:
+    return ResultadoEvaluacion(
+        sesion_id=sesion_id,
+        timestamp_evaluacion=datetime(2026, 6, 1, 11, minuto, tzinfo=UTC),
+        personalidad_cliente=PersonalidadCliente.RESIGNADO_CANSADO,
+        canal=canal,
+        escenario=ESCENARIOS_OBRA[minuto % 2],
+        criterios=[],
+        puntaje_global=50.0 + minuto,
+        fortalezas=["Paciencia"],
+        oportunidades_mejora=[],
+        recomendaciones=[],
+        metricas={"tiempo_respuesta": None},
+        resumen_ejecutivo="Correcto.",
+    )
+
+
+def test_operaciones_como_redis_y_ttl() -> None:
+    reloj = Reloj()
+    almacenamiento = AlmacenamientoSQLite(reloj=reloj)
+
+    almacenamiento.setex("contexto:a", 10, "cabecera")
+    almacenamiento.setex("binario:a", 10, b"\xab\x00")
+    assert almacenamiento.rpush("mensajes:a", "m1", "m2", "m3") == 3
+    assert almacenamiento.lrange("mensajes:a", -2, -1) == ["m2", "m3"]
+    assert almacenamiento.lrange("mensajes:a", 1, 99) == ["m2", "m3"]
+    assert almacenamiento.lrange("mensajes:a", -9, -4) == []
+    assert almacenamiento.get("binario:a") == b"\xab\x00"
+    assert [almacenamiento.incr("version:a") for _ in range(3)] == [1, 2, 3]
+    with pytest.raises(TypeError):
+        almacenamiento.get("mensajes:a")
+    with pytest.raises(TypeError):
+        almacenamiento.rpush("contexto:a", "x")
+
+    reloj.ahora += 11
+    assert almacenamiento.get("contexto:a") is None
+    assert almacenamiento.expire("contexto:a", 10) is False
+    assert almacenamiento.expire("mensajes:a", 5) is True
+    reloj.ahora += 6
+    assert almacenamiento.llen("mensajes:a") == 0
+    assert almacenamiento.barrer() == 2
+    assert [clave for clave, _ in almacenamiento.items()] == ["version:a"]
+    assert almacenamiento.estadisticas()["elementos"] == 0
+    assert almacenamiento.delete("version:a", "falta") == 1
+
+
+def test_transaccion_confirma_todo_o_nada() -> None:
+    almacenamiento = AlmacenamientoSQLite()
+
+    with pytest.raises(RuntimeError):
+        with almacenamiento.transaccion():
+            almacenamiento.rpush("mensajes:x", "m1")
+            with almacenamiento.transaccion():
+                almacenamiento.incr("version:x")
+            raise RuntimeError("fallo a mitad de camino")
+
+    assert almacenamiento.llen("mensajes:x") == 0
+    assert almacenamiento.get("version:x") is None
+
+
+def test_sesiones_sobreviven_al_reinicio(
+    tmp_path, crear_contexto, crear_reclamo
+) -> None:
+    ruta = tmp_path / "sesiones.db"
+    almacenamiento = AlmacenamientoSQLite(ruta)
+    gestor = GestorContexto(almacenamiento)
+    gestor.inicializar_contexto(crear_contexto("durable"))
+    for turno in range(1, 11):
+        gestor.agregar_mensaje("durable", crear_reclamo(turno))
+    esperado = gestor.obtener_contexto("durable")
+    almacenamiento.cerrar()
+
+    reabierto = AlmacenamientoSQLite(ruta)
+    (modo,) = reabierto._conexion.execute("PRAGMA journal_mode").fetchone()
+    contexto = GestorContexto(reabierto).obtener_contexto("durable")
+
+    assert modo == "wal"
+    assert contexto == esperado and len(contexto.historial) == 10
+    assert contexto.datos_clave_mencionados == {
+        "numero_pedido": True,
+        "fecha_problema": True,
+    }
+
+
+def test_cas_entre_conexiones_a_la_misma_base(tmp_path) -> None:
+    ruta = tmp_path / "compartida.db"
+    primera, segunda = AlmacenamientoSQLite(ruta), AlmacenamientoSQLite(ruta)
+
+    semilla = primera.cas("version:s", None, 60, {"contexto:s": "v1"}, {"m:s": ["a"]})
+    assert segunda.cas("version:s", None, 60, {"contexto:s": "v2"}) is None
+    assert segunda.cas("version:s", semilla, 60, {"contexto:s": "v2"}) == semilla + 1
+    assert primera.get("contexto:s") == "v2"
+    assert primera.lrange("m:s", 0, -1) == ["a"]
+
+
+def test_resultados_se_consultan_por_indices() -> None:
+    almacenamiento = AlmacenamientoSQLite()
+    resultados = [
+        _resultado(f"s{minuto}", minuto, canal)
+        for minuto, canal in enumerate(
+            [CanalComunicacion.CHAT, CanalComunicacion.EMAIL, CanalComunicacion.CHAT]
+        )
+    ]
+
+    assert almacenamiento.guardar_resultados(resultados) == 3
+    assert almacenamiento.obtener_resultados() == resultados
+    assert almacenamiento.obtener_resultados(sesion_id="s1") == [resultados[1]]
+    assert almacenamiento.obtener_resultados(canal="chat") == [
+        resultados[0],
+        resultados[2],
+    ]
+    assert almacenamiento.obtener_resultados(
+        escenario=ESCENARIOS_OBRA[0], personalidad="resignado_cansado"
+    ) == [resultados[0], resultados[2]]
+    desde = datetime(2026, 6, 1, 8, 1, tzinfo=timezone(timedelta(hours=-3)))
+    assert almacenamiento.obtener_resultados(desde=desde, limite=1) == [resultados[1]]
+    recuperado = almacenamiento.obtener_resultados(sesion_id="s0")[0]
+    assert recuperado.escenario is ESCENARIOS_OBRA[0]
+
+
+def test_finalizar_persiste_el_resultado(crear_reclamo) -> None:
+    async def escenario() -> None:
+        almacenamiento = AlmacenamientoSQLite()
+        gestor = GestorContexto(almacenamiento)
+        sistema = construir_sistema_comandos(
+            gestor, LLMDePrueba(), resultados=almacenamiento
+        )
+
+        await sistema.procesar("comenzar test", "s1")
+        for turno in range(1, 5):
+            gestor.agregar_mensaje("s1", crear_reclamo(turno))
+        informe = await sistema.procesar("/finalizar", "s1")
+
+        (guardado,) = almacenamiento.obtener_resultados(sesion_id="s1")
+        assert f"{guardado.puntaje_global:.1f}/100" in informe
+        assert gestor.obtener_contexto("s1").estado_actual == "finalizado"
+
+    asyncio.run(escenario())
+
+
+@pytest.fixture()
+def sesiones(crear_contexto, crear_reclamo):
+    """Inicializa sesiones de tres reclamos y devuelve sus contextos."""
+
+    def poblar(gestor: GestorContexto, *sesiones: str) -> dict:
+        for sesion_id in sesiones:
+            gestor.inicializar_contexto(crear_contexto(sesion_id))
+            for turno in range(1, 4):
+                gestor.agregar_mensaje(sesion_id, crear_reclamo(turno))
+        return {sesion_id: gestor.obtener_contexto(sesion_id) for sesion_id in sesiones}
+
+    return poblar
+
+
+def test_escalonado_degrada_por_capacidad_y_promueve_al_acceder(
+    sesiones, crear_reclamo
+) -> None:
+    almacenamiento = AlmacenamientoEscalonado(max_sesiones=2)
+    gestor = GestorContexto(almacenamiento, capacidad_cache=0, codec=CodecBinario())
+
+    # Leer a, b y c en orden con dos lugares promueve cada una y degrada otra.
+    esperados = sesiones(gestor, "a", "b", "c")
+    estadisticas = almacenamiento.estadisticas()
+
+    assert estadisticas["sesiones_calientes"] == 2
+    assert estadisticas["sesiones_frias"] == 1
+    assert estadisticas["degradaciones"] == 4 and estadisticas["promociones"] == 3
+    assert estadisticas["bytes_frios"] > 0
+    assert gestor.obtener_contexto("a") == esperados["a"]
+    gestor.agregar_mensaje("a", crear_reclamo(4))
+    assert gestor.contar_mensajes("a") == 4
+    estadisticas = almacenamiento.estadisticas()
+    assert estadisticas["degradaciones"] == 5 and estadisticas["promociones"] == 4
+    assert gestor.obtener_contexto("b") == esperados["b"]
+
+
+def test_escalonado_degrada_sesiones_inactivas_y_finalizadas(sesiones) -> None:
+    reloj = Reloj()
+    almacenamiento = AlmacenamientoEscalonado(inactividad=60, reloj=reloj)
+    gestor = GestorContexto(almacenamiento)
+    sesiones(gestor, "activa", "inactiva", "terminada")
+    gestor.actualizar(
+        "terminada", lambda contexto: replace(contexto, estado_actual="finalizado")
+    )
+    assert almacenamiento.estadisticas()["sesiones_frias"] == 1
+
+    reloj.ahora += 30
+    gestor.obtener_contexto("activa")
+    assert almacenamiento.barrer() == 0
+    assert almacenamiento.estadisticas()["sesiones_calientes"] == 2
+
+    reloj.ahora += 45
+    almacenamiento.barrer()
+    estadisticas = almacenamiento.estadisticas()
+    assert (estadisticas["sesiones_calientes"], estadisticas["sesiones_frias"]) == (
+        1,
+        2,
+    )
+    assert gestor.obtener_contexto("terminada").estado_actual == "finalizado"
+    almacenamiento.barrer()
+    assert almacenamiento.estadisticas()["sesiones_frias"] == 2
+
+
+def test_escalonado_degrada_finalizadas_con_registro_propio(crear_contexto) -> None:
+    propio = replace(ESCENARIOS_OBRA[0], id="ESC-900", titulo="Solo en este registro")
+    registro = RegistroEscenarios([propio])
+    almacenamiento = AlmacenamientoEscalonado(registro=registro)
+    gestor = GestorContexto(almacenamiento, codec=CodecBinario(registro))
+    gestor.inicializar_contexto(crear_contexto("propia", escenario=propio))
+    gestor.actualizar(
+        "propia", lambda contexto: replace(contexto, estado_actual="finalizado")
+    )
+
+    assert almacenamiento.estadisticas()["sesiones_frias"] == 1
+    assert gestor.obtener_contexto("propia").configuracion.escenario is propio
+
+def test_escalonado_bloquea_por_sesion(crear_contexto, crear_reclamo) -> None:
+    almacenamiento = AlmacenamientoEscalonado(max_sesiones=3)
+    ocupada = "s0"
+    libres = [
+        f"s{numero}"
+        for numero in range(1, 200)
+        if almacenamiento.bloqueo(f"s{numero}") is not almacenamiento.bloqueo(ocupada)
+    ][:8]
+    tomado, soltar = threading.Event(), threading.Event()
+
+    def retener() -> None:
+        with almacenamiento.bloqueo(ocupada):
+            tomado.set()
+            soltar.wait(5)
+
+    hilo = threading.Thread(target=retener)
+    hilo.start()
+    tomado.wait(5)
+
+    def escribir(sesion_id: str) -> None:
+        gestor = GestorContexto(almacenamiento, capacidad_cache=0)
+        gestor.inicializar_contexto(crear_contexto(sesion_id))
+        for turno in range(1, 6):
+            gestor.agregar_mensaje(sesion_id, crear_reclamo(turno))
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as ejecutor:
+            list(ejecutor.map(escribir, libres, timeout=10))
+    finally:
+        soltar.set()
+        hilo.join()
+
+    gestor = GestorContexto(almacenamiento)
+    assert all(gestor.contar_mensajes(sesion_id) == 5 for sesion_id in libres)
+    estadisticas = almacenamiento.estadisticas()
+    assert estadisticas["sesiones_calientes"] <= 3
+    assert estadisticas["sesiones_frias"] == len(libres) - 3
+
+
+def test_escalonado_respeta_ttl_en_el_nivel_frio() -> None:
+    reloj = Reloj()
+    almacenamiento = AlmacenamientoEscalonado(reloj=reloj)
+    almacenamiento.setex("contexto:x", 10, "cabecera")
+    almacenamiento.setex("binario:x", 100, b"\xab\x00")
+    almacenamiento.rpush("mensajes:x", "m1", "m2")
+    almacenamiento.incr("version:x")
+
+    assert almacenamiento.degradar("x") is True
+    assert almacenamiento.degradar("x") is False
+    reloj.ahora += 20
+    assert almacenamiento.get("contexto:x") is None
+    assert almacenamiento.get("binario:x") == b"\xab\x00"
+    assert almacenamiento.lrange("mensajes:x", 0, -1) == ["m1", "m2"]
+    assert almacenamiento.incr("version:x") == 2
+    with pytest.raises(ValueError):
+        almacenamiento.cas("version:x", 2, 60, {"contexto:y": "otra"})
+
+    almacenamiento.degradar("x")
+    almacenamiento.setex("contexto:z", 5, "breve")
+    almacenamiento.degradar("z")
+    reloj.ahora += 10
+    assert almacenamiento.barrer() == 1
+    assert sorted(clave for clave, _ in almacenamiento.items()) == [
+        "binario:x",
+        "mensajes:x",
+        "version:x",
+    ]
+
+
+def test_escalonado_persiste_al_cerrar(tmp_path, sesiones) -> None:
+    ruta = tmp_path / "niveles.db"
+    almacenamiento = AlmacenamientoEscalonado(ruta)
+    esperados = sesiones(GestorContexto(almacenamiento), "uno", "dos")
+    almacenamiento.cerrar()
+
+    reabierto = AlmacenamientoEscalonado(ruta)
+    gestor = GestorContexto(reabierto)
+
+    assert reabierto.estadisticas()["sesiones_frias"] == 2
+    assert gestor.obtener_contexto("dos") == esperados["dos"]
+    assert reabierto.estadisticas()["sesiones_calientes"] == 1
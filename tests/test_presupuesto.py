@@ -0,0 +1,92 @@
+"""Pruebas del ensamblado de transcripciones con presupuesto de tokens."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime
+
+from autobot.evaluation import AnalizadorConversacion, RubricaEvaluacion
+from autobot.models import MensajeConversacion
+from autobot.presupuesto import EnsambladorTranscripcion, estimar_tokens
+
+
+def _historial(cantidad: int) -> list[MensajeConversacion]:
+    return [
+        MensajeConversacion(
+            turno=turno,
+            rol="cliente" if turno % 2 else "agente",
+            contenido=f"Mensaje número {turno} " + "con bastante detalle " * 10,
+            timestamp=datetime.now(UTC),
+        )
+        for turno in range(1, cantidad + 1)
+    ]
+
+
+def test_sin_exceso_devuelve_la_transcripcion_completa() -> None:
+    historial = _historial(3)
+    texto = EnsambladorTranscripcion(10_000).ensamblar(historial)
+
+    assert texto.splitlines() == [
+        f"Turno {mensaje.turno} ({mensaje.rol}): {mensaje.contenido}"
+        for mensaje in historial
+    ]
+
+
+def test_respeta_presupuesto_y_conserva_numeros_de_turno() -> None:
+    historial = _historial(40)
+    texto = EnsambladorTranscripcion(600).ensamblar(historial, turnos_relevantes=[5])
+
+    assert estimar_tokens(texto) <= 600
+    lineas = texto.splitlines()
+    assert lineas[-1].startswith("Turno 40 (agente): Mensaje número 40")
+    assert any(linea.startswith("Turno 5 (cliente): ") for linea in lineas)
+    assert any("mensajes omitidos" in linea for linea in lineas)
+    assert lineas[0].startswith("Turnos 1-")
+
+
+def test_turnos_relevantes_no_exceden_el_presupuesto() -> None:
+    historial = _historial(60)
+    texto = EnsambladorTranscripcion(500).ensamblar(
+        historial, turnos_relevantes=[mensaje.turno for mensaje in historial]
+    )
+
+    lineas = texto.splitlines()
+    assert estimar_tokens(texto) <= 500
+    assert lineas[-1].startswith("Turno 60 (agente")
+    assert lineas[0].startswith("Turnos 1-")
+    turnos = [int(linea.split()[1].split("-")[-1].rstrip(":")) for linea in lineas]
+    assert turnos == sorted(turnos)
+
+
+def test_presupuesto_minimo_conserva_el_resumen() -> None:
+    historial = _historial(10)
+    texto = EnsambladorTranscripcion(20).ensamblar(
+        historial, turnos_relevantes=range(1, 11)
+    )
+
+    assert estimar_tokens(texto) <= 20
+    assert texto.startswith("Turnos 1-")
+
+
+def test_usa_extractos_antes_de_omitir() -> None:
+    historial = _historial(8)
+    texto = EnsambladorTranscripcion(380, turnos_recientes=2).ensamblar(historial)
+
+    assert "(agente, extracto)" in texto or "(cliente, extracto)" in texto
+
+
+def test_presupuesto_configurable_por_criterio(crear_contexto, llm_registro) -> None:
+    rubrica = RubricaEvaluacion()
+    rubrica.obtener("claridad_y_comunicacion").presupuesto_tokens = 400
+    historial = _historial(30)
+    historial[2].contenido = "Mi pedido #CM-2024-8847 sigue sin cemento"
+    contexto = crear_contexto("larga", historial)
+    analizador = AnalizadorConversacion(llm_registro, rubrica)
+
+    asyncio.run(analizador.evaluar_conversacion(contexto))
+
+    acotado = next(p for p in llm_registro.prompts if "claridad_y_comunicacion" in p)
+    completo = next(p for p in llm_registro.prompts if "empatia_y_tono" in p)
+    assert len(acotado) < len(completo) / 2
+    assert "Turno 3 (cliente): Mi pedido #CM-2024-8847" in acotado
+    assert "Turno 30 (agente)" in acotado
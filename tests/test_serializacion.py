@@ -0,0 +1,119 @@
+"""Pruebas de los serializadores generados para los modelos."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import pytest
+
+from autobot.models import (
+    CanalComunicacion,
+    ContextoConversacion,
+    CriterioEvaluacion,
+    EvidenciaEvaluacion,
+    PersonalidadCliente,
+    ResultadoEvaluacion,
+)
+from autobot.scenarios import ESCENARIOS_OBRA
+from autobot.serializacion import a_dict, desde_dict, serializador
+
+
+@pytest.fixture()
+def contexto(crear_contexto, crear_mensaje) -> ContextoConversacion:
+    return crear_contexto(
+        "serie",
+        [
+            crear_mensaje(
+                1,
+                contenido="¿Cuándo llega el hormigón?",
+                metadatos={"canal": "whatsapp"},
+            ),
+            crear_mensaje(2, contenido="Mañana temprano"),
+        ],
+        personalidad=PersonalidadCliente.ANSIOSO_DETALLISTA,
+        canal=CanalComunicacion.WHATSAPP,
+        escenario=ESCENARIOS_OBRA[1],
+        estado_actual="resolviendo",
+        datos_clave_mencionados={"numero_pedido": True},
+        emociones_cliente=["ansiedad"],
+    )
+
+
+@pytest.fixture()
+def resultado() -> ResultadoEvaluacion:
+    return ResultadoEvaluacion(
+        sesion_id="serie",
+        timestamp_evaluacion=datetime(2026, 3, 2, 9, 0, tzinfo=UTC),
+        personalidad_cliente=PersonalidadCliente.ANSIOSO_DETALLISTA,
+        canal=CanalComunicacion.WHATSAPP,
+        escenario=ESCENARIOS_OBRA[1],
+        criterios=[
+            CriterioEvaluacion(
+                nombre="empatia",
+                puntaje=4,
+                peso=0.3,
+                justificacion="Reconoce la preocupación",
+                evidencias=[
+                    EvidenciaEvaluacion("empatia", 2, "Mañana temprano", "positivo")
+                ],
+                origen="heuristica",
+            )
+        ],
+        puntaje_global=78.5,
+        fortalezas=["Claridad"],
+        oportunidades_mejora=[],
+        recomendaciones=["Confirmar horario"],
+        metricas={"turnos_hasta_empatia": 2.0, "tiempo_respuesta": None},
+        resumen_ejecutivo="Buen manejo general.",
+    )
+
+
+@pytest.mark.parametrize("fabrica", ["contexto", "resultado"])
+def test_mismo_json_que_asdict_e_ida_y_vuelta(
+    request, fabrica, json_asdict
+) -> None:
+    objeto = request.getfixturevalue(fabrica)
+
+    texto = json.dumps(a_dict(objeto))
+
+    assert texto == json_asdict(objeto)
+    assert desde_dict(type(objeto), json.loads(texto)) == objeto
+
+
+def test_campos_con_valor_por_omision_pueden_faltar(contexto) -> None:
+    datos = a_dict(contexto)
+    for clave in ("historial", "datos_clave_mencionados", "emociones_cliente"):
+        del datos[clave]
+    del datos["configuracion"]["duracion_maxima"]
+
+    contexto = desde_dict(ContextoConversacion, datos)
+
+    assert contexto.historial == [] and contexto.emociones_cliente == []
+    assert contexto.configuracion.duracion_maxima == 20
+    with pytest.raises(KeyError):
+        desde_dict(ContextoConversacion, {"sesion_id": "incompleta"})
+
+
+def test_excluir_campos_e_instancias_ya_decodificadas(contexto) -> None:
+    cabecera = serializador(ContextoConversacion, excluir=("historial",))(contexto)
+    cabecera["configuracion"]["escenario"] = ESCENARIOS_OBRA[1]
+
+    assert "historial" not in cabecera
+    reconstruido = desde_dict(ContextoConversacion, cabecera)
+    assert reconstruido.configuracion.escenario is ESCENARIOS_OBRA[1]
+    assert serializador(ContextoConversacion, ("historial",)) is serializador(
+        ContextoConversacion, excluir=["historial"]
+    )
+
+
+def test_tipos_no_soportados() -> None:
+    @dataclass
+    class ConConjunto:
+        valores: set
+
+    with pytest.raises(TypeError, match="no soportado"):
+        a_dict(ConConjunto({1}))
+    with pytest.raises(TypeError, match="no es una dataclass"):
+        a_dict(object())